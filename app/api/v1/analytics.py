@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Query
+from ...services.servicenow_client import get_client, ServiceNowClient
+from ...schemas.analytics import IncidentAnalytics
+from typing import Optional
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/incidents", response_model=IncidentAnalytics)
+async def incident_analytics(
+    q: Optional[str] = Query(None, description="Encoded query narrowing the incidents analysed"),
+    window_days: int = Query(30, ge=1, le=365, description="MTTR window: incidents resolved in the last N days"),
+    top_groups: int = Query(20, ge=1, le=500, description="Assignment groups returned in backlog_by_group"),
+    client: ServiceNowClient = Depends(get_client),
+):
+    """Aging buckets of open incidents, MTTR over the window and backlog by assignment group."""
+    data = await client.incident_analytics(query=q, window_days=window_days)
+    # Cached per (q, window_days); trimming happens here so top_groups doesn't fragment the cache.
+    return {**data, 'backlog_by_group': data['backlog_by_group'][:top_groups]}
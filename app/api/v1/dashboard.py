@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from ...services.servicenow_client import get_client, ServiceNowClient
+from ...services.dashboard import build_dashboard
+from ...schemas.incident import Dashboard
+from ...core.config import get_settings
+from typing import Optional
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+@router.get("", response_model=Dashboard)
+async def get_dashboard(
+    limit: int = Query(20, le=100, description="Rows per incident list section"),
+    assignee: Optional[str] = Query(None, description="User sys_id or user_name for the 'mine' section"),
+    section_timeout: Optional[float] = Query(None, gt=0, le=30, description="Per-section deadline in seconds"),
+    client: ServiceNowClient = Depends(get_client),
+):
+    """First-paint dashboard: counts, P1, unassigned and my incidents, each with its own status and timing."""
+    timeout = section_timeout or get_settings().dashboard_section_timeout
+    return await build_dashboard(client, limit=limit, assignee=assignee, timeout=timeout)
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from ...services.servicenow_client import get_client, ServiceNowClient
+from ...services.resolution_cache import get_incident_sys_id_cache, get_assignee_cache
 from ...schemas.incident import IncidentList, Incident, IncidentCreate, IncidentUpdate, AssigneeUpdate
 from ...schemas.search import User
 from ...schemas.common import Message
 from typing import Optional
+import asyncio
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
@@ -30,44 +32,78 @@ async def update_incident(sys_id: str, payload: IncidentUpdate, client: ServiceN
     res = await client.update_incident(sys_id, payload.model_dump(exclude_none=True))
     return res
 
+def _is_sys_id(value: str) -> bool:
+    return len(value) == 32 and all(c in '0123456789abcdef' for c in value.lower())
+
+def _choose_assignee(term: str, candidates: list[dict]) -> tuple[dict, bool]:
+    """Pick the user for term; returns (user, exact) where exact marks a cacheable exact match."""
+    # Prioritize exact match on name, then exact on user_name, else if single result just use it, else ambiguous.
+    lower_term = term.lower()
+    exact_name = [u for u in candidates if (u.get('name') or '').lower() == lower_term]
+    exact_uname = [u for u in candidates if (u.get('user_name') or '').lower() == lower_term]
+    if len(exact_name) == 1:
+        return exact_name[0], True
+    if len(exact_uname) == 1 and not exact_name:
+        return exact_uname[0], True
+    if len(candidates) == 1:
+        return candidates[0], False
+    # Ambiguous: return 409 with minimal suggestions
+    suggestions = [
+        {k: v for k, v in u.items() if k in {'sys_id','name','user_name','email'}} for u in candidates[:5]
+    ]
+    raise HTTPException(status_code=409, detail={"message": "Ambiguous name; refine search", "suggestions": suggestions})
+
 @router.put("/{sys_id}/assignee", response_model=Incident)
-async def set_incident_assignee(sys_id: str, body: AssigneeUpdate, client: ServiceNowClient = Depends(get_client)):
+async def set_incident_assignee(sys_id: str, body: AssigneeUpdate, response: Response, client: ServiceNowClient = Depends(get_client)):
+    """Resolve incident + assignee (concurrently, or from local caches) then PATCH once.
+
+    The X-Served-Locally response header lists which resolution steps skipped ServiceNow
+    (`incident_sys_id`, `assignee`), or `none`.
+    """
     term = body.assigned_to.strip()
-    # Detect if path param is an incident number (e.g., starts with INC and not 32 hex chars) and resolve to sys_id
-    if not (len(sys_id) == 32 and all(c in '0123456789abcdef' for c in sys_id.lower())):
-        # treat as number
+    sys_id_cache = get_incident_sys_id_cache()
+    assignee_cache = get_assignee_cache()
+    served_locally: list[str] = []
+
+    async def resolve_incident() -> str:
+        # Path param may be an incident number (e.g., INC0012345) rather than a 32 hex sys_id
+        if _is_sys_id(sys_id):
+            return sys_id
+        cached = sys_id_cache.get(sys_id)
+        if cached:
+            served_locally.append('incident_sys_id')
+            return cached
         incident = await client.get_incident(sys_id, fields=['sys_id'])  # here sys_id is actually number
         if not incident or not incident.get('sys_id'):
             raise HTTPException(status_code=404, detail="Incident number not found")
-        real_sys_id = incident['sys_id']
-    else:
-        real_sys_id = sys_id
-    # Always treat input as a (partial) human name or user_name. We perform a limited search and then choose.
-    try:
-        candidates = await client.search_users(term=term, limit=25, fields=['sys_id','name','user_name','email'])
-    except Exception:
-        raise HTTPException(status_code=400, detail="Unable to search for assignee name")
+        sys_id_cache.put(sys_id, incident['sys_id'])
+        return incident['sys_id']
 
-    if not candidates:
-        raise HTTPException(status_code=404, detail="No user found matching term")
+    async def resolve_assignee() -> dict:
+        cached = assignee_cache.get(term)
+        if cached:
+            served_locally.append('assignee')
+            return cached
+        # Always treat input as a (partial) human name or user_name. We perform a limited search and then choose.
+        try:
+            candidates = await client.search_users(term=term, limit=25, fields=['sys_id','name','user_name','email'])
+        except HTTPException:
+            raise  # upstream 502 / deadline 504 keep their status
+        except Exception:
+            raise HTTPException(status_code=400, detail="Unable to search for assignee name")
+        if not candidates:
+            raise HTTPException(status_code=404, detail="No user found matching term")
+        chosen, exact = _choose_assignee(term, candidates)
+        if exact:
+            assignee_cache.put(term, chosen)
+        return chosen
 
-    # Prioritize exact match on name, then exact on user_name, else if single result just use it, else ambiguous.
-    lower_term = term.lower()
-    exact_name = [u for u in candidates if (u.get('name') or '').lower() == lower_term]
-    exact_uname = [u for u in candidates if (u.get('user_name') or '').lower() == lower_term]
-    chosen = None
-    if len(exact_name) == 1:
-        chosen = exact_name[0]
-    elif len(exact_uname) == 1 and not exact_name:
-        chosen = exact_uname[0]
-    elif len(candidates) == 1:
-        chosen = candidates[0]
-    else:
-        # Ambiguous: return 409 with minimal suggestions
-        suggestions = [
-            {k: v for k, v in u.items() if k in {'sys_id','name','user_name','email'}} for u in candidates[:5]
-        ]
-        raise HTTPException(status_code=409, detail={"message": "Ambiguous name; refine search", "suggestions": suggestions})
+    incident_res, assignee_res = await asyncio.gather(resolve_incident(), resolve_assignee(), return_exceptions=True)
+    # Surface errors in the same precedence as the former sequential flow: incident first.
+    for outcome in (incident_res, assignee_res):
+        if isinstance(outcome, BaseException):
+            raise outcome
+    real_sys_id, chosen = incident_res, assignee_res
 
     sys_id_target = chosen.get('sys_id')
     if not sys_id_target:
@@ -76,6 +112,7 @@ async def set_incident_assignee(sys_id: str, body: AssigneeUpdate, client: Servi
     res = await client.update_incident(real_sys_id, {"assigned_to": sys_id_target})
     if not res:
         raise HTTPException(status_code=404, detail="Incident not found or update failed")
+    response.headers['X-Served-Locally'] = ','.join(sorted(served_locally)) or 'none'
     return res
 
 @router.get("/{number}/affected-users", response_model=list[User])
@@ -83,7 +120,7 @@ async def get_affected_users(
     number: str,
     user_fields: Optional[str] = Query(
         None,
-        description="Comma-separated sys_user fields to return. Use * or omit for all.") ,
+        description="Comma-separated sys_user fields to return. Omit for the model fields; use * for all.") ,
     client: ServiceNowClient = Depends(get_client)
 ):
     field_list: Optional[list[str]] = None
@@ -1,6 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from ...services.servicenow_client import get_client, ServiceNowClient
+from ...services.payload import payload_stats
+from ...core.compression import compression_stats
+from ...services.history import get_history
+from ...services.hedging import get_hedger
+from ...services.scheduler import get_scheduler
+from ...services.concurrency import get_limiter, probe_state
+from ...services.traffic import traffic_stats
 from ...schemas.incident import DashboardCounts
+from ...schemas.metrics import UpstreamPayloadStats, CompressionMetrics, CounterHistoryResult, HedgeMetrics, SchedulerMetrics, ConcurrencyMetrics, TrafficMetrics
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 
@@ -8,3 +16,53 @@ router = APIRouter(prefix="/metrics", tags=["metrics"])
 async def get_counts(client: ServiceNowClient = Depends(get_client)):
     counts = await client.get_dashboard_counts()
     return counts
+
+@router.get("/history", response_model=CounterHistoryResult)
+async def get_counter_history(
+    counter: str = Query(..., description="Dashboard counter name, e.g. open_p1"),
+    window: int = Query(3600, ge=1, description="Seconds of history to return"),
+    step: int = Query(60, ge=1, description="Bucket size in seconds (min/max/avg per bucket)"),
+):
+    history = get_history()
+    if counter not in history.counters:
+        raise HTTPException(status_code=400, detail={"message": "Unknown counter", "counters": history.counters})
+    if window // step > 10000:
+        raise HTTPException(status_code=400, detail="window/step yields too many buckets (max 10000)")
+    return {"counter": counter, "window": window, "step": step, "points": history.query(counter, window, step)}
+
+@router.get("/upstream-payload", response_model=UpstreamPayloadStats)
+async def get_upstream_payload():
+    """Bytes received from ServiceNow per upstream endpoint: on the wire vs after decompression."""
+    return {"endpoints": payload_stats.snapshot()}
+
+@router.get("/compression", response_model=CompressionMetrics)
+async def get_compression():
+    """Response compression totals per coding: bytes in/out, ratio and CPU time spent."""
+    return compression_stats.snapshot()
+
+@router.get("/hedging", response_model=HedgeMetrics)
+async def get_hedging():
+    """Hedged read activity: hedge rate, hedge wins, budget denials and per-endpoint latency/delay."""
+    return get_hedger().snapshot()
+
+@router.get("/scheduler", response_model=SchedulerMetrics)
+async def get_scheduler_metrics():
+    """Upstream scheduler: shared limit, in-flight calls, and per priority class queue waits and preemptions."""
+    return get_scheduler().snapshot()
+
+@router.get("/concurrency", response_model=ConcurrencyMetrics)
+async def get_concurrency():
+    """Adaptive upstream limit: current limit, RTT estimates (short/long EWMA), gradient and the last probe."""
+    scheduler = get_scheduler()
+    return {
+        **get_limiter().snapshot(),
+        'adaptive': scheduler.limiter is not None,
+        'limit': scheduler.limit,
+        'in_flight': scheduler.in_flight,
+        'probe': probe_state.as_dict(),
+    }
+
+@router.get("/traffic", response_model=TrafficMetrics)
+async def get_traffic():
+    """Upstream capture/replay: mode, archive paths, and calls recorded, replayed, repeated or unmatched per endpoint."""
+    return traffic_stats.snapshot()
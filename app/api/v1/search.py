@@ -7,7 +7,7 @@ router = APIRouter(prefix="/search", tags=["search"])
 
 
 @router.get("/users", response_model=UserSearchResults)
-async def search_users(q: str = Query(..., min_length=1, description="Search term"), limit: int = Query(20, le=100), fields: Optional[str] = Query(None, description="Comma separated list of fields to return. Use * for all."), client: ServiceNowClient = Depends(get_client)):
+async def search_users(q: str = Query(..., min_length=1, description="Search term"), limit: int = Query(20, le=100), fields: Optional[str] = Query(None, description="Comma separated list of fields to return. Omit for the model fields; use * for all."), client: ServiceNowClient = Depends(get_client)):
     field_list: Optional[List[str]] = None
     if fields is not None:
         parsed = [f.strip() for f in fields.split(',') if f.strip()]
@@ -17,7 +17,7 @@ async def search_users(q: str = Query(..., min_length=1, description="Search ter
 
 
 @router.get("/locations", response_model=LocationSearchResults)
-async def search_locations(q: str = Query(..., min_length=1, description="Search term"), limit: int = Query(20, le=100), fields: Optional[str] = Query(None, description="Comma separated list of fields to return. Use * for all."), client: ServiceNowClient = Depends(get_client)):
+async def search_locations(q: str = Query(..., min_length=1, description="Search term"), limit: int = Query(20, le=100), fields: Optional[str] = Query(None, description="Comma separated list of fields to return. Omit for the model fields; use * for all."), client: ServiceNowClient = Depends(get_client)):
     field_list: Optional[List[str]] = None
     if fields is not None:
         parsed = [f.strip() for f in fields.split(',') if f.strip()]
@@ -27,10 +27,11 @@ async def search_locations(q: str = Query(..., min_length=1, description="Search
 
 @router.get("/assignees", response_model=UserSearchResults)
 async def search_assignees(
-    q: Optional[str] = Query(None, min_length=1, description="Search term (name/user_name)"),
+    # Pushed into every group-member chunk query: bounded so the sys_id lists keep their room.
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Search term (name/user_name)"),
     assignment_group: Optional[str] = Query(None, description="Restrict to members of this group sys_id"),
     limit: int = Query(20, le=100),
-    fields: Optional[str] = Query(None, description="Comma separated list of user fields to return. Use * for all."),
+    fields: Optional[str] = Query(None, description="Comma separated list of user fields to return. Omit for the model fields; use * for all."),
     client: ServiceNowClient = Depends(get_client)
 ):
     field_list: Optional[List[str]] = None
@@ -0,0 +1,274 @@
+"""Response compression middleware with zstd / brotli / gzip negotiation.
+
+* The best coding the client accepts is chosen (server preference zstd > br > gzip);
+  zstd and brotli are used only when the `zstandard` / `brotli` packages are installed;
+  they are located at startup but imported on the first response that uses them.
+* Bodies smaller than `minimum_size` are sent as-is: below ~1 KB the framing overhead
+  and CPU cost outweigh the savings.
+* Compression level comes from a per-route-prefix profile (longest prefix wins).
+* Streaming responses (more_body=True) are compressed incrementally and flushed per
+  chunk so clients keep receiving data as it is produced.
+* CPU time (thread CPU clock) and bytes in/out per coding are recorded in
+  `compression_stats` so the ratio/CPU trade-off can be checked under load.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import importlib
+import importlib.util
+import threading
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Optional codec modules per coding, in server preference order.
+_OPTIONAL_CODECS = {'zstd': 'zstandard', 'br': 'brotli'}
+
+# Compression level profiles per coding.
+FAST = {'zstd': 1, 'br': 1, 'gzip': 1}
+BALANCED = {'zstd': 3, 'br': 4, 'gzip': 6}
+DENSE = {'zstd': 9, 'br': 6, 'gzip': 9}
+
+_COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml', 'application/x-ndjson')
+
+
+@lru_cache
+def available_codings() -> List[str]:
+    """Codings this process can produce, in server preference order (found, not yet imported)."""
+    codings = [coding for coding, module in _OPTIONAL_CODECS.items() if importlib.util.find_spec(module) is not None]
+    codings.append('gzip')
+    return codings
+
+
+@lru_cache
+def _codec(coding: str) -> Any:
+    return importlib.import_module(_OPTIONAL_CODECS[coding])
+
+
+def negotiate(accept_encoding: str, codings: List[str]) -> Optional[str]:
+    """Pick the first coding from codings the Accept-Encoding header allows (q > 0)."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    wildcard = accepted.get('*')
+    for coding in codings:
+        q = accepted.get(coding, wildcard if wildcard is not None else 0.0)
+        if q > 0:
+            return coding
+    return None
+
+
+class _Encoder:
+    def __init__(self, coding: str, level: int):
+        self.coding = coding
+        if coding == 'zstd':
+            self._obj = _codec('zstd').ZstdCompressor(level=level).compressobj()
+        elif coding == 'br':
+            self._obj = _codec('br').Compressor(quality=level)
+        else:
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 -> gzip container
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        """Compress data; flush=True pushes buffered output so a streamed chunk is decodable now."""
+        if self.coding == 'zstd':
+            out = self._obj.compress(data)
+            if flush:
+                out += self._obj.flush(_codec('zstd').COMPRESSOBJ_FLUSH_BLOCK)
+            return out
+        if self.coding == 'br':
+            out = self._obj.process(data)
+            if flush:
+                out += self._obj.flush()
+            return out
+        out = self._obj.compress(data)
+        if flush:
+            out += self._obj.flush(zlib.Z_SYNC_FLUSH)
+        return out
+
+    def finish(self) -> bytes:
+        if self.coding == 'zstd':
+            return self._obj.flush()
+        if self.coding == 'br':
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+class CompressionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_coding: Dict[str, Dict[str, float]] = {}
+        self.skipped = 0
+
+    def record(self, coding: str, bytes_in: int, bytes_out: int, cpu_seconds: float, streamed: bool):
+        with self._lock:
+            entry = self._by_coding.setdefault(
+                coding, {'responses': 0, 'streamed': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0}
+            )
+            entry['responses'] += 1
+            entry['streamed'] += int(streamed)
+            entry['bytes_in'] += bytes_in
+            entry['bytes_out'] += bytes_out
+            entry['cpu_seconds'] += cpu_seconds
+
+    def record_skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            codings = {}
+            for coding, e in self._by_coding.items():
+                codings[coding] = {
+                    **e,
+                    'cpu_seconds': round(e['cpu_seconds'], 6),
+                    'ratio': round(e['bytes_in'] / e['bytes_out'], 2) if e['bytes_out'] else None,
+                    'cpu_ms_per_mb': round(e['cpu_seconds'] * 1000 / (e['bytes_in'] / 1_000_000), 2) if e['bytes_in'] else None,
+                }
+            return {'codings': codings, 'skipped': self.skipped, 'available': available_codings()}
+
+    def reset(self):
+        with self._lock:
+            self._by_coding.clear()
+            self.skipped = 0
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        default_levels: Optional[Dict[str, int]] = None,
+        route_levels: Optional[Dict[str, Dict[str, int]]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.default_levels = default_levels or BALANCED
+        # Longest prefix first so /api/v1/search/users beats /api/v1
+        self.route_levels: List[Tuple[str, Dict[str, int]]] = sorted(
+            (route_levels or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.codings = available_codings()
+
+    def _levels_for(self, path: str) -> Dict[str, int]:
+        for prefix, levels in self.route_levels:
+            if path.startswith(prefix):
+                return levels
+        return self.default_levels
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope.get('method') == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get('accept-encoding', ''), self.codings)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, send, coding, self._levels_for(scope.get('path', '')).get(coding, 6))
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, send: Send, coding: str, level: int):
+        self.middleware = middleware
+        self.send = send
+        self.coding = coding
+        self.level = level
+        self.start: Optional[Message] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu = 0.0
+
+    async def __call__(self, message: Message):
+        if message['type'] == 'http.response.start':
+            self.start = message
+            headers = Headers(raw=message['headers'])
+            content_type = headers.get('content-type', '')
+            if (
+                'content-encoding' in headers
+                or message['status'] in (204, 304)
+                or not content_type.startswith(_COMPRESSIBLE_TYPES)
+            ):
+                self.passthrough = True
+            return
+        if message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+        if self.passthrough:
+            if self.start is not None:
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more = message.get('more_body', False)
+        if self.encoder is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if more and self.buffered < self.middleware.minimum_size:
+                return  # keep buffering until the size decision can be made
+            body, self.buffer = b''.join(self.buffer), []
+            if not more:
+                await self._send_whole(body)
+                return
+            await self._begin_stream()
+        await self._emit(body, more)
+
+    def _encoding_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start['headers'])
+        headers['Content-Encoding'] = self.coding
+        headers.add_vary_header('Accept-Encoding')
+        return headers
+
+    async def _send_whole(self, body: bytes):
+        if len(body) < self.middleware.minimum_size:
+            compression_stats.record_skip()
+            await self.send(self.start)
+            await self.send({'type': 'http.response.body', 'body': body, 'more_body': False})
+            return
+        encoder = _Encoder(self.coding, self.level)
+        started = time.thread_time()
+        out = encoder.compress(body, flush=False) + encoder.finish()
+        cpu = time.thread_time() - started
+        self._encoding_headers()['Content-Length'] = str(len(out))
+        await self.send(self.start)
+        await self.send({'type': 'http.response.body', 'body': out, 'more_body': False})
+        compression_stats.record(self.coding, len(body), len(out), cpu, streamed=False)
+
+    async def _begin_stream(self):
+        self.encoder = _Encoder(self.coding, self.level)
+        headers = self._encoding_headers()
+        if 'content-length' in headers:
+            del headers['content-length']
+        await self.send(self.start)
+
+    async def _emit(self, body: bytes, more: bool):
+        started = time.thread_time()
+        out = self.encoder.compress(body, flush=more)
+        if not more:
+            out += self.encoder.finish()
+        self.cpu += time.thread_time() - started
+        self.bytes_in += len(body)
+        self.bytes_out += len(out)
+        await self.send({'type': 'http.response.body', 'body': out, 'more_body': more})
+        if not more:
+            compression_stats.record(self.coding, self.bytes_in, self.bytes_out, self.cpu, streamed=True)
@@ -3,6 +3,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyHttpUrl, Field
 from typing import List
 import os
+import tempfile
 
 class Settings(BaseSettings):
     servicENow_instance: str = Field(alias="SERVICENOW_INSTANCE")
@@ -11,8 +12,73 @@ class Settings(BaseSettings):
     servicENow_api_version: str = Field(default="now", alias="SERVICENOW_API_VERSION")
     servicENow_timeout: int = Field(default=30000, alias="SERVICENOW_TIMEOUT")  # ms
     log_level: str = Field(default="info", alias="LOG_LEVEL")
+    # Logging pipeline: output format (json/text), queue bound, per-template rate limit, DEBUG sampling, body truncation
+    log_format: str = Field(default="json", alias="LOG_FORMAT")
+    log_queue_size: int = Field(default=10000, alias="LOG_QUEUE_SIZE")
+    log_rate_limit: int = Field(default=20, alias="LOG_RATE_LIMIT")  # lines per template per window (0 disables)
+    log_rate_window: float = Field(default=10.0, alias="LOG_RATE_WINDOW")  # seconds
+    log_debug_sample_rate: float = Field(default=1.0, alias="LOG_DEBUG_SAMPLE_RATE")
+    log_body_max_chars: int = Field(default=500, alias="LOG_BODY_MAX_CHARS")
     incident_fields: str | None = Field(default=None, alias="SERVICENOW_INCIDENT_FIELDS")
     servicENow_api_base_path: str = Field(default="/api", alias="SERVICENOW_API_BASE_PATH")
+    incident_sys_id_cache_size: int = Field(default=10000, alias="INCIDENT_SYS_ID_CACHE_SIZE")
+    assignee_cache_ttl: int = Field(default=3600, alias="ASSIGNEE_CACHE_TTL")  # seconds
+    # Read cache: "memory" (per worker) or "sqlite" (memory + tier shared by all workers on the host)
+    cache_backend: str = Field(default="memory", alias="CACHE_BACKEND")
+    cache_sqlite_path: str = Field(default=os.path.join(tempfile.gettempdir(), "snow_dashboard_cache.sqlite3"), alias="CACHE_SQLITE_PATH")
+    cache_memory_max_entries: int = Field(default=2048, alias="CACHE_MEMORY_MAX_ENTRIES")
+    cache_fill_lease: float = Field(default=10.0, alias="CACHE_FILL_LEASE")  # seconds
+    # Per-area TTLs in seconds (0 disables caching for that area)
+    cache_ttl_incidents: int = Field(default=15, alias="CACHE_TTL_INCIDENTS")
+    cache_ttl_counts: int = Field(default=30, alias="CACHE_TTL_COUNTS")
+    cache_ttl_directory: int = Field(default=300, alias="CACHE_TTL_DIRECTORY")
+    cache_ttl_negative: int = Field(default=10, alias="CACHE_TTL_NEGATIVE")  # not-found incidents / empty searches
+    cache_ttl_analytics: int = Field(default=300, alias="CACHE_TTL_ANALYTICS")
+    # Startup warm-up: pre-opened upstream connections and optional cache preloads (comma list of counts,locations,groups)
+    startup_warm_connections: int = Field(default=4, alias="STARTUP_WARM_CONNECTIONS")
+    startup_preload: str = Field(default="", alias="STARTUP_PRELOAD")
+    startup_warmup_timeout: float = Field(default=20.0, alias="STARTUP_WARMUP_TIMEOUT")  # seconds
+    # Response compression (zstd/br need the optional zstandard/brotli packages; gzip always available)
+    compression_enabled: bool = Field(default=True, alias="COMPRESSION_ENABLED")
+    compression_min_size: int = Field(default=1024, alias="COMPRESSION_MIN_SIZE")  # bytes
+    # Hedged reads: resend a slow idempotent GET after the given latency percentile (clamped), within a budget
+    hedge_enabled: bool = Field(default=False, alias="HEDGE_ENABLED")
+    hedge_percentile: float = Field(default=0.95, alias="HEDGE_PERCENTILE")
+    hedge_min_delay_ms: int = Field(default=50, alias="HEDGE_MIN_DELAY_MS")
+    hedge_max_delay_ms: int = Field(default=1500, alias="HEDGE_MAX_DELAY_MS")
+    hedge_min_samples: int = Field(default=20, alias="HEDGE_MIN_SAMPLES")
+    hedge_budget_ratio: float = Field(default=0.1, alias="HEDGE_BUDGET_RATIO")  # hedges per request
+    # Upstream scheduler: shared in-flight limit, weighted fair queuing weights per priority class, preemption
+    upstream_concurrency: int = Field(default=20, alias="UPSTREAM_CONCURRENCY")
+    scheduler_weight_interactive: float = Field(default=8.0, alias="SCHEDULER_WEIGHT_INTERACTIVE")
+    scheduler_weight_background: float = Field(default=2.0, alias="SCHEDULER_WEIGHT_BACKGROUND")
+    scheduler_weight_bulk: float = Field(default=1.0, alias="SCHEDULER_WEIGHT_BULK")
+    scheduler_preemption: bool = Field(default=True, alias="SCHEDULER_PREEMPTION")
+    scheduler_max_preemptions: int = Field(default=2, alias="SCHEDULER_MAX_PREEMPTIONS")  # per call, then it runs to completion
+    # Adaptive limit: UPSTREAM_CONCURRENCY is the starting point, resized from RTT/errors within [min, max]
+    concurrency_adaptive: bool = Field(default=True, alias="CONCURRENCY_ADAPTIVE")
+    concurrency_min_limit: int = Field(default=2, alias="CONCURRENCY_MIN_LIMIT")
+    concurrency_max_limit: int = Field(default=50, alias="CONCURRENCY_MAX_LIMIT")
+    concurrency_rtt_tolerance: float = Field(default=1.5, alias="CONCURRENCY_RTT_TOLERANCE")  # RTT growth tolerated before shrinking
+    health_probe_interval: float = Field(default=5.0, alias="HEALTH_PROBE_INTERVAL")  # seconds (0 disables the prober)
+    # Upstream traffic capture/replay at the httpx transport (gzip JSONL archive; empty path = off)
+    upstream_record_path: str = Field(default="", alias="UPSTREAM_RECORD_PATH")
+    upstream_replay_path: str = Field(default="", alias="UPSTREAM_REPLAY_PATH")
+    upstream_replay_latency_scale: float = Field(default=1.0, alias="UPSTREAM_REPLAY_LATENCY_SCALE")  # 1 = recorded, 0 = instant
+    # Bulk sys_id fetches: max encoded query length per chunk and concurrent chunk requests
+    fetch_ids_max_query_chars: int = Field(default=2000, alias="FETCH_IDS_MAX_QUERY_CHARS")
+    fetch_ids_concurrency: int = Field(default=4, alias="FETCH_IDS_CONCURRENCY")
+    # End-to-end request deadline (seconds): default budget, and the cap on a client's X-Request-Timeout
+    request_timeout: float = Field(default=30.0, alias="REQUEST_TIMEOUT")
+    request_timeout_max: float = Field(default=120.0, alias="REQUEST_TIMEOUT_MAX")
+    # Incident analytics scan: rows per keyset page and the cap on incidents loaded (bounds memory)
+    analytics_page_size: int = Field(default=2000, alias="ANALYTICS_PAGE_SIZE")
+    analytics_max_incidents: int = Field(default=250000, alias="ANALYTICS_MAX_INCIDENTS")
+    dashboard_section_timeout: float = Field(default=5.0, alias="DASHBOARD_SECTION_TIMEOUT")  # seconds, per section
+    # Dashboard counter history: sample interval (0 disables), ring size, optional mmap file for persistence
+    history_sample_interval: int = Field(default=60, alias="HISTORY_SAMPLE_INTERVAL")  # seconds
+    history_capacity: int = Field(default=10080, alias="HISTORY_CAPACITY")  # samples (7 days at 60 s)
+    history_path: str = Field(default="", alias="HISTORY_PATH")
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -34,6 +100,9 @@ class Settings(BaseSettings):
             "assignment_group","assigned_to","category","subcategory","caller_id"
         ]
 
+    def get_startup_preload(self) -> List[str]:
+        return [p.strip().lower() for p in self.startup_preload.split(',') if p.strip()]
+
 @lru_cache
 def get_settings() -> Settings:
     return Settings()  # type: ignore
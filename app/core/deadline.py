@@ -0,0 +1,128 @@
+"""Per-request deadlines propagated to every upstream ServiceNow call.
+
+`DeadlineMiddleware` gives each HTTP request a budget: the client's `X-Request-Timeout`
+header (seconds, capped at REQUEST_TIMEOUT_MAX), else the longest matching route
+prefix default, else REQUEST_TIMEOUT. The absolute deadline is stored in a context
+variable, so `ServiceNowClient` sizes each upstream timeout to the *remaining*
+budget instead of a flat per-call value. The request is cancelled as soon as the
+deadline passes (504 if no response has started) or the client disconnects.
+"""
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = 'x-request-timeout'
+
+_deadline: ContextVar[Optional[float]] = ContextVar('request_deadline', default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget (None outside a request)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def bounded_timeout(default: float, reserve: float = 0.0) -> float:
+    """default, shortened to the remaining request budget (less `reserve` seconds) when one applies."""
+    left = remaining()
+    if left is None:
+        return default
+    return max(0.0, min(default, left - reserve))
+
+
+def set_deadline(seconds: float):
+    """Start a budget of `seconds` for the current context; returns the token for reset."""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token):
+    _deadline.reset(token)
+
+
+class DeadlineMiddleware:
+    def __init__(self, app: ASGIApp, default: float = 30.0, maximum: float = 120.0,
+                 route_defaults: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.default = default
+        self.maximum = maximum
+        self.route_defaults: List[Tuple[str, float]] = sorted(
+            (route_defaults or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def budget_for(self, scope: Scope) -> float:
+        header = Headers(scope=scope).get(DEADLINE_HEADER)
+        if header:
+            try:
+                requested = float(header)
+                if requested > 0:
+                    return min(requested, self.maximum)
+            except ValueError:
+                pass
+        path = scope.get('path', '')
+        for prefix, seconds in self.route_defaults:
+            if path.startswith(prefix):
+                return seconds
+        return self.default
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        budget = self.budget_for(scope)
+        token = set_deadline(budget)
+        started = False
+        inbox: asyncio.Queue = asyncio.Queue()
+
+        async def tracked_send(message: Message):
+            nonlocal started
+            if message['type'] == 'http.response.start':
+                started = True
+            await send(message)
+
+        async def pump():
+            # Forward request messages to the app; returning means the client went away.
+            while True:
+                message = await receive()
+                await inbox.put(message)
+                if message['type'] == 'http.disconnect':
+                    return
+
+        app_task = asyncio.ensure_future(self.app(scope, inbox.get, tracked_send))
+        pump_task = asyncio.ensure_future(pump())
+        try:
+            done, _ = await asyncio.wait({app_task, pump_task}, timeout=budget, return_when=asyncio.FIRST_COMPLETED)
+            if app_task in done:
+                app_task.result()
+                return
+            app_task.cancel()
+            await asyncio.gather(app_task, return_exceptions=True)
+            if pump_task in done:
+                logger.info("Client disconnected; cancelled %s %s", scope.get('method'), scope.get('path'))
+                return
+            logger.warning("Request deadline of %gs exceeded: %s %s", budget, scope.get('method'), scope.get('path'))
+            if not started:
+                response = JSONResponse(
+                    status_code=504,
+                    content={"detail": {"error": "DeadlineExceeded", "message": f"Request exceeded its {budget:g}s deadline"}},
+                )
+                await response(scope, inbox.get, send)
+        finally:
+            for task in (app_task, pump_task):
+                if not task.done():
+                    task.cancel()
+            reset_deadline(token)
@@ -1,4 +1,31 @@
-import logging, sys
+"""Logging setup: records are queued on the caller's thread and written by a listener thread.
+
+* The event loop only filters and enqueues a record; the `%`-style message, the JSON
+  (LOG_FORMAT=json, default) or text line and the stdout write all happen on the
+  listener thread. Log with `logger.x("... %s", value)`, not f-strings, so formatting
+  stays lazy and the rate limiter can group lines by their template.
+* The queue is bounded (LOG_QUEUE_SIZE). When stdout cannot keep up, new records are
+  dropped and counted instead of blocking or growing memory; the count is reported
+  on the next line that gets through.
+* `RateLimitFilter` lets LOG_RATE_LIMIT lines per template through per LOG_RATE_WINDOW
+  seconds (every level below CRITICAL) and samples DEBUG at LOG_DEBUG_SAMPLE_RATE,
+  so an upstream outage logging the same error per request cannot flood the output.
+* `body_preview(response)` logs at most LOG_BODY_MAX_CHARS of an upstream body, decoded
+  only if the line is actually emitted.
+"""
+from typing import Any, Dict, Optional, Tuple
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+
+import orjson
+
 from .config import get_settings
 
 LEVEL_MAP = {
@@ -9,17 +36,142 @@ LEVEL_MAP = {
     'critical': logging.CRITICAL,
 }
 
+TEXT_FORMAT = '%(asctime)s | %(levelname)s | %(name)s | %(message)s'
+
+# LogRecord attributes that are not user-supplied `extra` fields.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
 _configured = False
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class body_preview:
+    """Lazily rendered, truncated view of an httpx response body for log arguments."""
+
+    __slots__ = ('response', 'limit')
+
+    def __init__(self, response: Any, limit: Optional[int] = None):
+        self.response = response
+        self.limit = limit if limit is not None else get_settings().log_body_max_chars
+
+    def __str__(self) -> str:
+        try:
+            content: bytes = self.response.content
+        except Exception:  # body not read (streamed response)
+            return '<body not read>'
+        if len(content) <= self.limit:
+            return content.decode('utf-8', errors='replace')
+        return content[:self.limit].decode('utf-8', errors='replace') + f'... [{len(content)} bytes]'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, any `extra` fields and exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class RateLimitFilter(logging.Filter):
+    """Per (logger, level, template) cap of `limit` lines per `window` seconds; DEBUG is sampled.
+
+    CRITICAL is never limited. The number of suppressed lines is attached to the next
+    line let through for that template as `suppressed`.
+    """
+
+    def __init__(self, limit: int, window: float, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.debug_sample_rate = debug_sample_rate
+        self._windows: Dict[Tuple[str, int, str], list] = {}  # key -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.CRITICAL:
+            return True
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1.0 and random.random() >= self.debug_sample_rate:
+            return False
+        if self.limit <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self._windows) > 10000:
+                    self._windows.clear()  # unbounded distinct templates: start over rather than grow
+                suppressed = state[2] if state else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if state[1] < self.limit:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller and leaves message formatting to the listener."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() merges args into the message here, on the event loop.
+        # Only tracebacks are rendered now, while their frames are still meaningful.
+        record = copy.copy(record)  # other handlers on the logger still see the original
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        if self.dropped:
+            record.dropped = self.dropped
+            self.dropped = 0
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread (registered with atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def configure_logging():
-    global _configured
+    global _configured, _listener
     if _configured:
         return
     settings = get_settings()
     level = LEVEL_MAP.get(settings.log_level.lower(), logging.INFO)
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s | %(levelname)s | %(name)s | %(message)s',
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.log_format.lower() == 'json' else logging.Formatter(TEXT_FORMAT))
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter(settings.log_rate_limit, settings.log_rate_window, settings.log_debug_sample_rate))
+    logging.basicConfig(level=level, handlers=[handler])
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
     _configured = True
@@ -1,12 +1,26 @@
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+import asyncio
 import logging
 import httpx
 from .core.logging_config import configure_logging
 from .api.v1.incidents import router as incidents_router
 from .api.v1.metrics import router as metrics_router
 from .api.v1.search import router as search_router
+from .api.v1.dashboard import router as dashboard_router
+from .api.v1.analytics import router as analytics_router
 from .core.config import get_settings
+from .core.compression import CompressionMiddleware, FAST, BALANCED, DENSE
+from .core.deadline import DeadlineMiddleware
+from .services.warmup import readiness, run_warmup
+from .services.history import get_history, run_sampler
+from .services.servicenow_client import get_client
+from .services.concurrency import probe_once, probe_state, run_prober
+from .services.traffic import RouteRecordMiddleware
 
 configure_logging()
 settings = get_settings()
@@ -14,15 +28,61 @@ settings = get_settings()
 app = FastAPI(title="ServiceNow Dashboard API", version="0.1.0")
 logger = logging.getLogger(__name__)
 
+_warmup_task: asyncio.Task | None = None
+_sampler_task: asyncio.Task | None = None
+_prober_task: asyncio.Task | None = None
+
 @app.on_event("startup")
 async def validate_settings():
     if settings.servicENow_instance.startswith("yourinstance"):
         logger.warning("SERVICENOW_INSTANCE appears to be placeholder; update .env to enable real connectivity.")
 
+@app.on_event("startup")
+async def start_warmup():
+    # Run in the background so the server accepts connections (and answers /health) while warming;
+    # /ready flips once the pipeline completes.
+    global _warmup_task
+    _warmup_task = asyncio.create_task(run_warmup())
+
+@app.on_event("startup")
+async def start_history_sampler():
+    global _sampler_task
+    if settings.history_sample_interval > 0 and not settings.servicENow_instance.startswith("yourinstance"):
+        _sampler_task = asyncio.create_task(run_sampler(get_client))
+
+@app.on_event("startup")
+async def start_prober():
+    global _prober_task
+    if settings.health_probe_interval > 0 and not settings.servicENow_instance.startswith("yourinstance"):
+        _prober_task = asyncio.create_task(run_prober(get_client))
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in (_warmup_task, _sampler_task, _prober_task):
+        if task is not None and not task.done():
+            task.cancel()
+    if _sampler_task is not None:
+        get_history().close()
+
 
 app.include_router(incidents_router, prefix="/api/v1")
 app.include_router(metrics_router, prefix="/api/v1")
 app.include_router(search_router, prefix="/api/v1")
+app.include_router(dashboard_router, prefix="/api/v1")
+app.include_router(analytics_router, prefix="/api/v1")
+
+# Per-request deadline shared by every upstream call the request makes (added before CORS so a
+# 504 still carries CORS headers). Typeahead search should fail fast rather than queue up.
+app.add_middleware(
+    DeadlineMiddleware,
+    default=settings.request_timeout,
+    maximum=settings.request_timeout_max,
+    route_defaults={
+        "/api/v1/search": min(5.0, settings.request_timeout),
+        # Full keyset scans page sequentially; give them the longest budget allowed.
+        "/api/v1/analytics": settings.request_timeout_max,
+    },
+)
 
 # Enable permissive CORS so the API is accessible from any origin.
 # If you want to restrict access, replace `allow_origins=["*"]` with a list
@@ -35,19 +95,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses for dashboards on slow links. Typeahead search favours latency (FAST);
+# large incident lists favour ratio (DENSE); everything else uses BALANCED.
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        default_levels=BALANCED,
+        route_levels={
+            "/api/v1/search": FAST,
+            "/api/v1/incidents": DENSE,
+        },
+    )
+
+# Outermost, so recorded route durations cover the whole stack (deadline, compression, CORS).
+if settings.upstream_record_path:
+    app.add_middleware(
+        RouteRecordMiddleware,
+        path=settings.upstream_record_path,
+        base_path=httpx.URL(settings.base_url).path,
+    )
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness: 503 until the startup warm-up pipeline has finished."""
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=readiness.as_dict())
+
 @app.get("/health/servicenow")
 async def health_servicenow():
     if settings.servicENow_instance.startswith("yourinstance"):
         return {"status": "placeholder", "detail": "Update SERVICENOW_INSTANCE for real check"}
-    # Perform a lightweight HEAD request to instance root to verify DNS & TLS
-    url = f"https://{settings.servicENow_instance}"
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(url)
-        return {"status": "reachable", "code": resp.status_code}
-    except httpx.RequestError as e:
-        return {"status": "unreachable", "error": str(e)}
+    # Served from the background prober (same pooled connection and latency model as real traffic);
+    # probe on demand only when it has not run yet or is disabled.
+    if probe_state.checked_at is None:
+        await probe_once(await get_client())
+    return probe_state.as_dict()
+
+logger.info("Startup phase import took %.1f ms", (time.perf_counter() - _import_started) * 1000)
@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class AgingBucket(BaseModel):
+    bucket: str
+    count: int
+    by_priority: Dict[str, int] = {}
+
+
+class MTTR(BaseModel):
+    resolved: int
+    mean_hours: Optional[float] = None
+    median_hours: Optional[float] = None
+    p90_hours: Optional[float] = None
+    by_priority: Dict[str, float] = {}
+
+
+class GroupBacklog(BaseModel):
+    group: str
+    open: int
+    p1: int
+    mean_age_days: float
+    oldest_age_days: float
+
+
+class IncidentAnalytics(BaseModel):
+    window_days: int
+    generated_at: str
+    incidents_scanned: int
+    truncated: bool
+    open: int
+    aging: List[AgingBucket]
+    mttr: MTTR
+    backlog_by_group: List[GroupBacklog]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 class IncidentBase(BaseModel):
     short_description: Optional[str] = None
@@ -35,3 +35,21 @@ class DashboardCounts(BaseModel):
     not_updated_24h: int = 0
     sla_at_risk: int = 0
     unassigned: int = 0
+
+class DashboardSection(BaseModel):
+    status: Literal['ok', 'partial', 'error', 'timeout', 'skipped']
+    elapsed_ms: float
+    error: Optional[str] = None
+
+class DashboardCountsSection(DashboardSection):
+    data: Optional[DashboardCounts] = None
+
+class DashboardIncidentsSection(DashboardSection):
+    data: Optional[List[Incident]] = None
+    total: Optional[int] = None
+
+class Dashboard(BaseModel):
+    counts: DashboardCountsSection
+    p1: DashboardIncidentsSection
+    unassigned: DashboardIncidentsSection
+    mine: DashboardIncidentsSection
@@ -0,0 +1,121 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class EndpointPayloadStats(BaseModel):
+    requests: int
+    wire_bytes: int
+    decoded_bytes: int
+    saved_bytes: int
+    compression_ratio: Optional[float] = None
+
+
+class UpstreamPayloadStats(BaseModel):
+    endpoints: Dict[str, EndpointPayloadStats]
+
+
+class CodingCompressionStats(BaseModel):
+    responses: int
+    streamed: int
+    bytes_in: int
+    bytes_out: int
+    cpu_seconds: float
+    ratio: Optional[float] = None
+    cpu_ms_per_mb: Optional[float] = None
+
+
+class CompressionMetrics(BaseModel):
+    codings: Dict[str, CodingCompressionStats]
+    skipped: int
+    available: List[str]
+
+
+class HistoryPoint(BaseModel):
+    ts: float
+    min: float
+    max: float
+    avg: float
+    samples: int
+
+
+class CounterHistoryResult(BaseModel):
+    counter: str
+    window: int
+    step: int
+    points: List[HistoryPoint]
+
+
+class HedgeEndpointStats(BaseModel):
+    samples: int
+    p50_ms: float
+    p99_ms: float
+    hedge_delay_ms: float
+
+
+class HedgeMetrics(BaseModel):
+    enabled: bool
+    requests: int
+    hedged: int
+    hedge_wins: int
+    budget_denied: int
+    hedge_rate: float
+    win_rate: float
+    endpoints: Dict[str, HedgeEndpointStats]
+
+
+class SchedulerClassStats(BaseModel):
+    weight: float
+    queued_now: int
+    in_flight: int
+    requests: int
+    queued: int
+    preempted: int
+    wait_p50_ms: float
+    wait_p95_ms: float
+    wait_max_ms: float
+
+
+class SchedulerMetrics(BaseModel):
+    limit: int
+    in_flight: int
+    queued: int
+    preemptions: int
+    classes: Dict[str, SchedulerClassStats]
+
+
+class ProbeStatus(BaseModel):
+    status: str
+    code: Optional[int] = None
+    rtt_ms: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: Optional[float] = None
+    age_s: Optional[float] = None
+    consecutive_failures: int = 0
+
+
+class ConcurrencyMetrics(BaseModel):
+    adaptive: bool
+    limit: int
+    in_flight: int
+    min_limit: int
+    max_limit: int
+    gradient: float
+    rtt_short_ms: Optional[float] = None
+    rtt_long_ms: Optional[float] = None
+    samples: int
+    errors: int
+    decreases: int
+    probes: int
+    probe: ProbeStatus
+
+
+class TrafficMetrics(BaseModel):
+    mode: str  # off | record | replay | record+replay
+    record_path: Optional[str] = None
+    replay_path: Optional[str] = None
+    recorded: int
+    dropped: int
+    replayed: int
+    repeated: int
+    misses: int
+    endpoints: Dict[str, int]
@@ -0,0 +1,175 @@
+"""Columnar incident analytics: aging buckets, MTTR and backlog by assignment group.
+
+Only the columns the aggregates need are pulled from ServiceNow, page by page with
+keyset paging on sys_id (`ServiceNowClient.iter_incident_pages`). Each page is turned
+into typed numpy arrays before the next one is requested, so the raw JSON never
+accumulates: resident memory is ~22 bytes per incident (two datetime64, active,
+priority, int32 group code) plus one page. ANALYTICS_MAX_INCIDENTS caps the rows
+loaded; past it the result is flagged `truncated`. All aggregates are vectorized
+(searchsorted / bincount / percentile) rather than looping over rows in Python.
+
+The scanned set is every open incident (any age, for aging and backlog) plus those
+resolved within the window (for MTTR).
+"""
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+ANALYTICS_FIELDS = ['sys_id', 'opened_at', 'resolved_at', 'active', 'priority', 'assignment_group.name']
+
+AGE_BUCKETS = ['<1d', '1-3d', '3-7d', '7-30d', '>30d']
+_AGE_EDGES_DAYS = np.array([1, 3, 7, 30], dtype=np.float64)
+_PRIORITIES = 6  # 0 = unknown, 1..5 = ServiceNow priorities
+UNASSIGNED_GROUP = '(unassigned)'
+_DTYPES = {'opened': 'datetime64[s]', 'resolved': 'datetime64[s]', 'active': np.bool_, 'priority': np.int8, 'group': np.int32}
+
+
+def window_query(query: Optional[str], window_days: int) -> str:
+    """Open incidents OR incidents resolved in the last window_days, with query ANDed onto both branches."""
+    base = f'{query}^' if query else ''
+    return f'{base}active=true^NQ{base}resolved_at>=javascript:gs.daysAgoStart({window_days})'
+
+
+def _priority(value: Any) -> int:
+    try:
+        p = int(value)
+    except (TypeError, ValueError):
+        return 0
+    return p if 0 < p < _PRIORITIES else 0
+
+
+class IncidentColumns:
+    """Typed per-incident columns, appended page by page; group names are dictionary-encoded."""
+
+    def __init__(self):
+        self.group_names: List[str] = []
+        self._group_codes: Dict[str, int] = {}
+        self._chunks: Dict[str, List[np.ndarray]] = {name: [] for name in _DTYPES}
+        self._rows = 0
+        self.truncated = False
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def _code(self, name: Optional[str]) -> int:
+        name = name or UNASSIGNED_GROUP
+        code = self._group_codes.get(name)
+        if code is None:
+            code = self._group_codes[name] = len(self.group_names)
+            self.group_names.append(name)
+        return code
+
+    def add_page(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        # numpy parses ServiceNow's 'YYYY-MM-DD HH:MM:SS' (UTC for raw values); '' becomes NaT.
+        self._chunks['opened'].append(np.array([r.get('opened_at') or '' for r in rows], dtype=_DTYPES['opened']))
+        self._chunks['resolved'].append(np.array([r.get('resolved_at') or '' for r in rows], dtype=_DTYPES['resolved']))
+        self._chunks['active'].append(np.array([r.get('active') == 'true' for r in rows], dtype=_DTYPES['active']))
+        self._chunks['priority'].append(np.array([_priority(r.get('priority')) for r in rows], dtype=_DTYPES['priority']))
+        self._chunks['group'].append(np.array([self._code(r.get('assignment_group.name')) for r in rows], dtype=_DTYPES['group']))
+        self._rows += len(rows)
+
+    def column(self, name: str) -> np.ndarray:
+        """Concatenate a column's pages once and keep only the merged array."""
+        chunks = self._chunks[name]
+        if len(chunks) != 1:
+            chunks[:] = [np.concatenate(chunks) if chunks else np.empty(0, dtype=_DTYPES[name])]
+        return chunks[0]
+
+
+async def load_columns(pages: AsyncIterator[List[Dict[str, Any]]], max_rows: int) -> IncidentColumns:
+    columns = IncidentColumns()
+    async for page in pages:
+        room = max_rows - len(columns)
+        if len(page) > room:
+            # Over the cap: rows cut from this page (or a page arriving once full) are left out.
+            if room:
+                columns.add_page(page[:room])
+            columns.truncated = True
+            break
+        columns.add_page(page)
+    return columns
+
+
+def _hours(value: float) -> Optional[float]:
+    return round(float(value), 2) if np.isfinite(value) else None
+
+
+def summarize(columns: IncidentColumns, window_days: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.now(timezone.utc)
+    now64 = np.datetime64(now.replace(tzinfo=None), 's')
+    opened = columns.column('opened')
+    resolved = columns.column('resolved')
+    active = columns.column('active')
+    priority = columns.column('priority')
+    group = columns.column('group')
+    n_groups = len(columns.group_names)
+
+    # Aging: open (active and not yet resolved) incidents by days since opened.
+    open_mask = active & np.isnat(resolved) & ~np.isnat(opened)
+    ages = (now64 - opened[open_mask]) / np.timedelta64(1, 'D')
+    bucket = np.searchsorted(_AGE_EDGES_DAYS, ages, side='right')
+    open_priority = priority[open_mask]
+    by_bucket_priority = np.bincount(bucket * _PRIORITIES + open_priority, minlength=len(AGE_BUCKETS) * _PRIORITIES)
+    by_bucket_priority = by_bucket_priority.reshape(len(AGE_BUCKETS), _PRIORITIES)
+    aging = [
+        {
+            'bucket': label,
+            'count': int(row.sum()),
+            'by_priority': {str(p): int(row[p]) for p in range(1, _PRIORITIES) if row[p]},
+        }
+        for label, row in zip(AGE_BUCKETS, by_bucket_priority)
+    ]
+
+    # MTTR: incidents resolved inside the window, opened -> resolved in hours.
+    window_start = now64 - np.timedelta64(window_days, 'D')
+    resolved_mask = ~np.isnat(resolved) & ~np.isnat(opened) & (resolved >= window_start)
+    durations = (resolved[resolved_mask] - opened[resolved_mask]) / np.timedelta64(1, 'h')
+    valid = durations >= 0  # bad data (resolved before opened) would drag the mean down
+    durations = durations[valid]
+    resolved_priority = priority[resolved_mask][valid]
+    sums = np.bincount(resolved_priority, weights=durations, minlength=_PRIORITIES)
+    counts = np.bincount(resolved_priority, minlength=_PRIORITIES)
+    if durations.size:
+        median, p90 = np.percentile(durations, [50, 90])
+        mttr = {
+            'resolved': int(durations.size),
+            'mean_hours': _hours(durations.mean()),
+            'median_hours': _hours(median),
+            'p90_hours': _hours(p90),
+        }
+    else:
+        mttr = {'resolved': 0, 'mean_hours': None, 'median_hours': None, 'p90_hours': None}
+    mttr['by_priority'] = {str(p): round(float(sums[p] / counts[p]), 2) for p in range(1, _PRIORITIES) if counts[p]}
+
+    # Backlog: open incidents per assignment group, largest first.
+    open_group = group[open_mask]
+    backlog = np.bincount(open_group, minlength=n_groups)
+    p1 = np.bincount(open_group[open_priority == 1], minlength=n_groups)
+    age_sums = np.bincount(open_group, weights=ages, minlength=n_groups)
+    oldest = np.zeros(n_groups)
+    np.maximum.at(oldest, open_group, ages)
+    order = np.argsort(-backlog, kind='stable')
+    backlog_by_group = [
+        {
+            'group': columns.group_names[g],
+            'open': int(backlog[g]),
+            'p1': int(p1[g]),
+            'mean_age_days': round(float(age_sums[g] / backlog[g]), 2),
+            'oldest_age_days': round(float(oldest[g]), 2),
+        }
+        for g in order if backlog[g]
+    ]
+
+    return {
+        'window_days': window_days,
+        'generated_at': now.isoformat(),
+        'incidents_scanned': len(columns),
+        'truncated': columns.truncated,
+        'open': int(open_mask.sum()),
+        'aging': aging,
+        'mttr': mttr,
+        'backlog_by_group': backlog_by_group,
+    }
@@ -0,0 +1,388 @@
+"""Pluggable read-through cache shared by the ServiceNow client.
+
+Two backends implement `CacheBackend`:
+
+* `MemoryCache`  - per-process LRU with TTL (always the first tier).
+* `SQLiteCache`  - on-host tier in a WAL-mode SQLite file that every uvicorn
+  worker opens, so one worker's fetch warms all the others.
+
+`TieredCache.get_or_set` reads tiers in order and fills misses through a loader.
+Concurrent misses for the same key are collapsed twice: coroutines inside a
+worker share one in-flight task, and workers coordinate through a fill lease
+row in the shared tier so only one of them calls ServiceNow while the rest
+poll for the value. The shared load runs under the first caller's request
+deadline; if that deadline runs out, waiters with budget left load it again.
+
+Cached values are shared between callers and must be treated as read-only.
+
+Backends are synchronous; `TieredCache` goes through `CacheBackend.call`, which
+`SQLiteCache` routes to its own single worker thread so a busy shared file (lock
+waits under write contention) never blocks the event loop.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import orjson
+
+from ..core import deadline
+from ..core.config import get_settings
+from ..utils.exceptions import is_deadline_exceeded
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Minimal key/value contract a cache tier must provide."""
+
+    name = "backend"
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return the cached value or MISSING."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    def acquire_fill_lock(self, key: str, lease: float) -> bool:
+        """Claim the right to fill key across processes. Local tiers always grant it."""
+        return True
+
+    def release_fill_lock(self, key: str):
+        pass
+
+    def clear(self):
+        pass
+
+    async def call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Run one of this tier's methods from the event loop. In-process tiers run inline."""
+        return method(*args)
+
+
+class MemoryCache(CacheBackend):
+    name = "memory"
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """Host-local cache shared by all worker processes through one SQLite file.
+
+    Values are stored as orjson bytes with a wall-clock expiry (workers do not
+    share a monotonic clock). Fill leases live in a second table keyed by the
+    cache key; a lease past its expiry is considered abandoned and reclaimed.
+    Every call runs on one dedicated thread (see `call`).
+    """
+
+    name = "sqlite"
+    _PURGE_EVERY = 256
+
+    def __init__(self, path: str):
+        self.path = path
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-sqlite")
+        self._conn = sqlite3.connect(path, timeout=2.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fill_locks (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return MISSING
+        return orjson.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        payload = orjson.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", (key, payload, now + ttl)
+            )
+            self._writes += 1
+            if self._writes % self._PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def acquire_fill_lock(self, key: str, lease: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM fill_locks WHERE key = ? AND expires_at < ?", (key, now))
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO fill_locks (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self.owner, now + lease),
+            )
+            return cur.rowcount == 1
+
+    def release_fill_lock(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM fill_locks WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.execute("DELETE FROM fill_locks")
+
+    async def call(self, method: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, method, *args)
+
+
+class TieredCache:
+    """Read-through facade over an ordered list of tiers (fastest first)."""
+
+    def __init__(self, tiers: List[CacheBackend], namespace: str = "", fill_lease: float = 10.0, poll_interval: float = 0.05,
+                 generation_ttl: float = 1.0):
+        self.tiers = tiers
+        # With a shared tier, faster tiers may only hold a generation this long: the shared tier
+        # owns it, so a bump made by another worker is seen within generation_ttl seconds.
+        self.generation_ttl = generation_ttl
+        self.namespace = namespace
+        self.fill_lease = fill_lease
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "fills": 0, "waits": 0}
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    async def get(self, key: str, local_ttl: Optional[float] = None) -> Any:
+        full = self._key(key)
+        for i, tier in enumerate(self.tiers):
+            value = await tier.call(tier.get, full)
+            if value is not MISSING:
+                await self._promote(full, value, upto=i, local_ttl=local_ttl)
+                return value
+        return MISSING
+
+    async def set(self, key: str, value: Any, ttl: float, local_ttl: Optional[float] = None):
+        """Store in every tier; local_ttl caps the expiry in all but the last (shared) tier."""
+        full = self._key(key)
+        last = len(self.tiers) - 1
+        for i, tier in enumerate(self.tiers):
+            await tier.call(tier.set, full, value, min(ttl, local_ttl) if local_ttl is not None and i < last else ttl)
+
+    async def delete(self, key: str):
+        full = self._key(key)
+        for tier in self.tiers:
+            await tier.call(tier.delete, full)
+
+    async def clear(self):
+        for tier in self.tiers:
+            await tier.call(tier.clear)
+
+    async def generation(self, namespace: str) -> int:
+        """Current generation of a key namespace; part of every key so bumping it invalidates them all."""
+        value = await self.get(f"gen:{namespace}", local_ttl=self.generation_ttl)
+        return 0 if value is MISSING else value
+
+    async def bump_generation(self, namespace: str):
+        # A timestamp rather than read-modify-write so concurrent bumps from several workers cannot collide.
+        await self.set(f"gen:{namespace}", time.time_ns(), ttl=86400, local_ttl=self.generation_ttl)
+
+    async def _promote(self, full: str, value: Any, upto: int, local_ttl: Optional[float] = None):
+        # Values found in a slower tier are copied into faster ones for a short while;
+        # the slower tier still owns the authoritative expiry.
+        ttl = min(self.fill_lease, 5.0) if local_ttl is None else min(self.fill_lease, 5.0, local_ttl)
+        for tier in self.tiers[:upto]:
+            await tier.call(tier.set, full, value, ttl)
+
+    async def get_or_set(
+        self,
+        key: str,
+        ttl: float,
+        loader: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+        negative_ttl: float = 0,
+        fill_lease: Optional[float] = None,
+    ) -> Any:
+        """Cached value for key, or load it once (per worker and across workers) and store it.
+
+        fill_lease overrides the lease (and how long other workers wait) for loads known
+        to run longer than the default, such as full analytics scans.
+        """
+        value = await self.get(key)
+        if value is not MISSING:
+            self.stats["hits"] += 1
+            return value
+        self.stats["misses"] += 1
+        full = self._key(key)
+        pending = self._inflight.get(full)
+        if pending is not None:
+            self.stats["waits"] += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The filling request was cancelled (e.g. client went away); fill it ourselves.
+                if pending.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.get_or_set(key, ttl, loader, should_cache, negative_ttl, fill_lease)
+                raise
+            except Exception as e:
+                # The filling request ran out of its own deadline (a short X-Request-Timeout);
+                # that says nothing about ours, so fill it ourselves while we have budget left.
+                if is_deadline_exceeded(e) and not deadline.expired():
+                    return await self.get_or_set(key, ttl, loader, should_cache, negative_ttl, fill_lease)
+                raise
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[full] = fut
+        try:
+            value = await self._fill(full, key, ttl, loader, should_cache, negative_ttl, fill_lease or self.fill_lease)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            # Mark retrieved so an unobserved failure does not log "exception never retrieved".
+            fut.exception()
+            raise
+        else:
+            fut.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(full, None)
+
+    async def _fill(self, full: str, key: str, ttl: float, loader, should_cache, negative_ttl: float, lease: float) -> Any:
+        shared = self.tiers[-1]
+        lease_ends = time.monotonic() + lease
+        while not await shared.call(shared.acquire_fill_lock, full, lease):
+            # Another worker is filling this key; wait for its value rather than stampeding upstream.
+            self.stats["waits"] += 1
+            await asyncio.sleep(self.poll_interval)
+            value = await self.get(key)
+            if value is not MISSING:
+                return value
+            if time.monotonic() >= lease_ends:
+                break
+        try:
+            value = await loader()
+            self.stats["fills"] += 1
+            if should_cache(value):
+                await self.set(key, value, ttl)
+            elif negative_ttl > 0 and is_not_found(value):
+                await self.set(key, value, negative_ttl)
+            return value
+        finally:
+            await shared.call(shared.release_fill_lock, full)
+
+
+def is_not_found(value: Any) -> bool:
+    """An empty record or result list: a valid "nothing matched" answer (unlike None, a failure)."""
+    return isinstance(value, (dict, list)) and not value
+
+
+def _build_cache() -> TieredCache:
+    settings = get_settings()
+    tiers: List[CacheBackend] = [MemoryCache(max_entries=settings.cache_memory_max_entries)]
+    backend = settings.cache_backend.lower()
+    if backend == "sqlite":
+        try:
+            tiers.append(SQLiteCache(settings.cache_sqlite_path))
+        except sqlite3.Error as e:
+            logger.warning("Shared cache at %s unavailable (%s); falling back to in-process cache only", settings.cache_sqlite_path, e)
+    elif backend != "memory":
+        logger.warning("Unknown CACHE_BACKEND %r; using in-process cache only", settings.cache_backend)
+    return TieredCache(tiers, namespace=settings.servicENow_instance, fill_lease=settings.cache_fill_lease)
+
+
+_cache_instance: TieredCache | None = None
+
+
+def get_cache() -> TieredCache:
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = _build_cache()
+    return _cache_instance
+
+
+def cached_read(namespace: str, ttl_setting: str, should_cache: Callable[[Any], bool] = bool, negative: bool = False,
+                lease_setting: Optional[str] = None):
+    """Cache a ServiceNowClient coroutine method keyed on its bound arguments.
+
+    ttl_setting names the Settings attribute holding the TTL in seconds; a TTL of 0
+    disables caching for that method. Results failing should_cache (by default: empty
+    ones) are returned but not stored, unless negative=True: then a not-found result
+    (empty record / list) is kept for the shorter CACHE_TTL_NEGATIVE so repeated misses
+    stay off the upstream. Keys embed the namespace generation, so
+    `TieredCache.bump_generation(namespace)` invalidates them. lease_setting names the
+    Settings attribute bounding one load, for methods that outlast CACHE_FILL_LEASE.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            ttl = getattr(self.settings, ttl_setting)
+            if ttl <= 0:
+                return await func(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(list(bound.arguments.items())[1:])
+            generation = await self._cache.generation(namespace)
+            key = f"{namespace}:{generation}:{func.__name__}:{orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS).decode()}"
+            negative_ttl = min(ttl, self.settings.cache_ttl_negative) if negative else 0
+            lease = getattr(self.settings, lease_setting) if lease_setting else None
+            return await self._cache.get_or_set(
+                key, ttl, lambda: func(self, *args, **kwargs), should_cache=should_cache, negative_ttl=negative_ttl,
+                fill_lease=lease,
+            )
+        return wrapper
+    return decorator
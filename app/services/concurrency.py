@@ -0,0 +1,183 @@
+"""Adaptive upstream concurrency limit and the background ServiceNow prober.
+
+`AdaptiveLimiter` sets the scheduler's shared in-flight limit from observed round-trip
+times, gradient style:
+
+* `rtt_short` is a fast EWMA of recent call RTTs and `rtt_long` a slow EWMA baseline.
+* gradient = clamp(tolerance * rtt_long / rtt_short, 0.5, 1). While latency stays near
+  its baseline the gradient is 1 and the limit grows by ~sqrt(limit) per sample
+  (smoothed). When calls start queueing upstream, RTT rises and the limit shrinks.
+* A timeout, transport error, 429 or 5xx cuts the limit multiplicatively (AIMD
+  backoff), at most once per second so one burst of failures counts as one signal.
+* The limit only grows while at least half of it is in use; an idle client says
+  nothing about how much the upstream can take.
+* After a sustained slowdown the baseline drifts toward the new normal, so the limit
+  does not stay pinned at the minimum forever.
+
+The prober (`run_prober`) sends one cheap authenticated read every HEALTH_PROBE_INTERVAL
+through the client's pool. It feeds the baseline while traffic is quiet and backs
+`/health/servicenow`, replacing a fresh AsyncClient (new DNS + TLS) per health check.
+"""
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import math
+import threading
+import time
+
+import httpx
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def is_overload(result: Any, error: Optional[BaseException]) -> bool:
+    """Whether an upstream outcome signals overload rather than a normal answer."""
+    if error is not None:
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+    status = getattr(result, 'status_code', 200)
+    return status == 429 or status >= 500
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int, min_limit: int, max_limit: int, tolerance: float = 1.5,
+                 smoothing: float = 0.2, backoff: float = 0.7):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.rtt_short: Optional[float] = None
+        self.rtt_long: Optional[float] = None
+        self.gradient = 1.0
+        self.stats: Dict[str, int] = {'samples': 0, 'errors': 0, 'decreases': 0, 'probes': 0}
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ewma(current: Optional[float], sample: float, alpha: float) -> float:
+        return sample if current is None else current + alpha * (sample - current)
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease >= 1.0:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self.stats['decreases'] += 1
+            self._last_decrease = now
+
+    def observe(self, rtt: float, in_flight: int, overload: bool = False) -> int:
+        """Record one completed call; returns the (integer) limit to apply."""
+        with self._lock:
+            self.stats['samples'] += 1
+            if overload:
+                self.stats['errors'] += 1
+                self._decrease()
+                return int(self.limit)
+            self.rtt_short = self._ewma(self.rtt_short, rtt, 0.1)
+            self.rtt_long = self._ewma(self.rtt_long, rtt, 0.01)
+            if self.rtt_long > 2 * self.rtt_short:
+                # Recovered from a slowdown: let the baseline come back down quickly.
+                self.rtt_long *= 0.95
+            self.gradient = max(0.5, min(1.0, self.tolerance * self.rtt_long / self.rtt_short))
+            target = self.limit * self.gradient + math.sqrt(self.limit)
+            if target > self.limit and in_flight < self.limit / 2:
+                return int(self.limit)  # app-limited: no evidence the upstream can take more
+            target = self.limit * (1 - self.smoothing) + target * self.smoothing
+            self.limit = min(self.max_limit, max(self.min_limit, target))
+            return int(self.limit)
+
+    def observe_probe(self, rtt: float, overload: bool = False):
+        """A probe measures near no-load latency: it refreshes the baseline only."""
+        with self._lock:
+            self.stats['probes'] += 1
+            if overload:
+                self.stats['errors'] += 1
+                self._decrease()
+                return
+            self.rtt_long = self._ewma(self.rtt_long, rtt, 0.05)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'limit': int(self.limit),
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'gradient': round(self.gradient, 3),
+            'rtt_short_ms': round(self.rtt_short * 1000, 1) if self.rtt_short is not None else None,
+            'rtt_long_ms': round(self.rtt_long * 1000, 1) if self.rtt_long is not None else None,
+            **self.stats,
+        }
+
+
+class ProbeState:
+    def __init__(self):
+        self.status = 'unknown'
+        self.code: Optional[int] = None
+        self.error: Optional[str] = None
+        self.rtt_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None  # epoch seconds
+        self.consecutive_failures = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {'status': self.status, 'code': self.code, 'rtt_ms': self.rtt_ms}
+        if self.error:
+            result['error'] = self.error
+        if self.checked_at is not None:
+            result['checked_at'] = self.checked_at
+            result['age_s'] = round(time.time() - self.checked_at, 1)
+        result['consecutive_failures'] = self.consecutive_failures
+        return result
+
+
+probe_state = ProbeState()
+
+
+async def probe_once(client) -> ProbeState:
+    """Probe ServiceNow through client's pool and feed the result into the limiter."""
+    started = time.perf_counter()
+    try:
+        resp = await client.probe()
+    except httpx.RequestError as e:
+        rtt = time.perf_counter() - started
+        probe_state.status, probe_state.code, probe_state.error = 'unreachable', None, str(e) or e.__class__.__name__
+        probe_state.consecutive_failures += 1
+        get_limiter().observe_probe(rtt, overload=True)
+    else:
+        rtt = time.perf_counter() - started
+        probe_state.status, probe_state.code, probe_state.error = 'reachable', resp.status_code, None
+        probe_state.consecutive_failures = 0
+        get_limiter().observe_probe(rtt, overload=is_overload(resp, None))
+    probe_state.rtt_ms = round(rtt * 1000, 1)
+    probe_state.checked_at = time.time()
+    return probe_state
+
+
+async def run_prober(get_client):
+    """Probe every HEALTH_PROBE_INTERVAL seconds until cancelled."""
+    interval = get_settings().health_probe_interval
+    while True:
+        started = time.monotonic()
+        try:
+            await probe_once(await get_client())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("ServiceNow probe failed: %s", e)
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+_limiter: AdaptiveLimiter | None = None
+
+
+def get_limiter() -> AdaptiveLimiter:
+    global _limiter
+    if _limiter is None:
+        settings = get_settings()
+        _limiter = AdaptiveLimiter(
+            initial=settings.upstream_concurrency,
+            min_limit=settings.concurrency_min_limit,
+            max_limit=settings.concurrency_max_limit,
+            tolerance=settings.concurrency_rtt_tolerance,
+        )
+    return _limiter
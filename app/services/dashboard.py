@@ -0,0 +1,128 @@
+"""Composite dashboard document: counts plus P1 / unassigned / "my" incident lists in one call.
+
+All sections start at once. Underlying ServiceNow calls are registered by signature
+so overlapping work runs once: the P1 and unassigned lists are fetched with their
+total count, and the counts section reuses those totals instead of issuing the same
+count queries again (falling back to a count query if the list fails or has not
+answered within half the section deadline).
+
+Each section waits under its own deadline, shortened so the document is still returned
+(with late sections marked as timed out) before the request's overall deadline. A section that times out or fails is
+reported with that status while the others are still returned; upstream work left
+running when the document is complete is cancelled.
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import logging
+import time
+
+from fastapi import HTTPException
+
+from ..core import deadline
+from .servicenow_client import ServiceNowClient
+
+logger = logging.getLogger(__name__)
+
+_ORDER = '^ORDERBYDESCsys_updated_on'
+
+
+def assignee_query(assignee: str) -> str:
+    """Encoded query for incidents assigned to a user sys_id or user_name (open only)."""
+    if len(assignee) == 32 and all(c in '0123456789abcdef' for c in assignee.lower()):
+        return f'assigned_to={assignee}^stateNOT IN6,7'
+    return f"assigned_to.user_name={assignee.replace('^', '')}^stateNOT IN6,7"
+
+
+class _SharedCalls:
+    """Run each distinct upstream call once per dashboard build."""
+
+    def __init__(self):
+        self.tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def get(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self.tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.tasks[key] = task
+        return task
+
+    def cancel_pending(self):
+        for task in self.tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # mark retrieved; failures were already reported per section
+
+
+async def _run_section(factory: Callable[[], Awaitable[Dict[str, Any]]], timeout: float) -> Dict[str, Any]:
+    started = time.perf_counter()
+    section: Dict[str, Any] = {'status': 'ok', 'data': None, 'error': None}
+    try:
+        section.update(await asyncio.wait_for(factory(), timeout=timeout))
+    except asyncio.TimeoutError:
+        section.update(status='timeout', error=f'No answer within {timeout:g}s')
+    except HTTPException as e:
+        detail = e.detail.get('message') if isinstance(e.detail, dict) else e.detail
+        section.update(status='error', error=str(detail))
+    except Exception as e:
+        logger.warning("Dashboard section failed: %s", e)
+        section.update(status='error', error=str(e) or e.__class__.__name__)
+    section['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return section
+
+
+async def build_dashboard(client: ServiceNowClient, limit: int, assignee: Optional[str], timeout: float) -> Dict[str, Any]:
+    queries = ServiceNowClient.DASHBOARD_COUNT_QUERIES
+    # Leave a little of the request budget to assemble and send the partial document.
+    timeout = deadline.bounded_timeout(timeout, reserve=0.1)
+    shared = _SharedCalls()
+    list_queries = {'p1': queries['open_p1'], 'unassigned': queries['unassigned']}
+    if assignee:
+        list_queries['mine'] = assignee_query(assignee)
+
+    def incident_list(name: str) -> asyncio.Task:
+        query = list_queries[name]
+        return shared.get(('list', query), lambda: client.list_incidents(limit=limit, query=query + _ORDER, with_total=True))
+
+    def list_section(name: str):
+        async def section():
+            data = await asyncio.shield(incident_list(name))
+            return {'data': data['result'], 'total': data.get('total')}
+        return section
+
+    # Counts whose query is identical to a list section's query come from that list's total.
+    reuse_totals = {'open_p1': 'p1', 'unassigned': 'unassigned'}
+
+    async def count(key: str) -> Optional[int]:
+        if key in reuse_totals:
+            # Give the list half the section budget; a slow list must not drag the counts down with it.
+            task = incident_list(reuse_totals[key])
+            done, _ = await asyncio.wait({task}, timeout=timeout / 2)
+            if done and not task.cancelled() and task.exception() is None:
+                return task.result().get('total')
+            # list failed or is slow: fall back to the plain count query
+        return await asyncio.shield(shared.get(('count', queries[key]), lambda: client.count_incidents(key, queries[key])))
+
+    async def counts_section():
+        values = await asyncio.gather(*(count(key) for key in queries), return_exceptions=True)
+        counts: Dict[str, int] = {}
+        failed = []
+        for key, value in zip(queries, values):
+            if isinstance(value, BaseException) or value is None:
+                failed.append(key)
+                value = 0
+            counts[key] = value
+        if failed:
+            return {'status': 'partial', 'data': counts, 'error': f"Counts unavailable: {', '.join(failed)}"}
+        return {'data': counts}
+
+    async def skipped():
+        return {'status': 'skipped', 'error': 'Pass assignee to load "my incidents"'}
+
+    names = ['counts', 'p1', 'unassigned', 'mine']
+    factories = [counts_section, list_section('p1'), list_section('unassigned'), list_section('mine') if assignee else skipped]
+    try:
+        sections = await asyncio.gather(*(_run_section(f, timeout) for f in factories))
+    finally:
+        shared.cancel_pending()
+    return dict(zip(names, sections))
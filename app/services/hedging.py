@@ -0,0 +1,183 @@
+"""Hedged requests for idempotent ServiceNow reads.
+
+If the first attempt has not answered within an adaptive delay (a high percentile of
+recent latencies for that endpoint), a second identical attempt is sent; whichever
+returns first wins and the other is cancelled. Hedges are capped by a token budget
+(HEDGE_BUDGET_RATIO hedges per request, with a small burst) so a slow upstream does
+not get twice the load exactly when it is struggling.
+
+Latency is tracked even while hedging is disabled so the delay is already calibrated
+when it is switched on. Both the hedge delay and the latency samples run from when
+the first attempt is dispatched (granted an upstream scheduler slot), so time spent
+queueing locally is neither learned nor hedged against.
+"""
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import threading
+import time
+
+from ..core.config import get_settings
+
+
+class LatencyWindow:
+    """Most recent latencies (seconds) for one endpoint."""
+
+    def __init__(self, size: int = 200):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget:
+    """Token bucket: each request earns `ratio` tokens (capped at `burst`); a hedge spends one."""
+
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+class Hedger:
+    def __init__(self, enabled: bool, percentile: float, min_delay: float, max_delay: float,
+                 min_samples: int, budget_ratio: float):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.budget = HedgeBudget(budget_ratio)
+        self.windows: Dict[str, LatencyWindow] = {}
+        self.stats: Dict[str, int] = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'budget_denied': 0}
+
+    def _window(self, key: str) -> LatencyWindow:
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = LatencyWindow()
+        return window
+
+    def delay_for(self, key: str) -> float:
+        """Hedge delay for key: the configured percentile of recent latencies, clamped to [min, max].
+
+        Until enough samples exist the max delay is used, so cold endpoints hedge rarely.
+        """
+        window = self._window(key)
+        if len(window.samples) < self.min_samples:
+            return self.max_delay
+        return min(self.max_delay, max(self.min_delay, window.percentile(self.percentile)))
+
+    async def run(self, key: str, send: Callable[[Callable[[], None]], Awaitable[Any]]) -> Any:
+        """Run send(on_dispatch), hedged when enabled.
+
+        send calls on_dispatch() when its request actually goes out; an attempt still
+        waiting for a local slot is never hedged.
+        """
+        self.stats['requests'] += 1
+        self.budget.earn()
+        dispatched = asyncio.Event()
+        started: Optional[float] = None
+
+        def on_dispatch():
+            nonlocal started
+            if started is None:
+                started = time.perf_counter()
+                dispatched.set()
+
+        def record():
+            if started is not None:
+                self._window(key).add(time.perf_counter() - started)
+
+        if not self.enabled:
+            result = await send(on_dispatch)
+            record()
+            return result
+
+        first = asyncio.ensure_future(send(on_dispatch))
+        attempts = [first]
+        waiting = asyncio.ensure_future(dispatched.wait())
+        try:
+            await asyncio.wait({first, waiting}, return_when=asyncio.FIRST_COMPLETED)
+            if not first.done():
+                done, _ = await asyncio.wait({first}, timeout=self.delay_for(key))
+                if not done:
+                    if self.budget.try_spend():
+                        self.stats['hedged'] += 1
+                        attempts.append(asyncio.ensure_future(send(lambda: None)))
+                    else:
+                        self.stats['budget_denied'] += 1
+            winner = await self._first_success(attempts)
+            if winner is not first:
+                self.stats['hedge_wins'] += 1
+            record()
+            return winner.result()
+        finally:
+            waiting.cancel()
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    @staticmethod
+    async def _first_success(attempts) -> asyncio.Future:
+        """First attempt to finish without error; if all fail, the first one (its error is raised)."""
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt
+        return attempts[0]
+
+    def snapshot(self) -> Dict[str, Any]:
+        requests = self.stats['requests']
+        return {
+            'enabled': self.enabled,
+            **self.stats,
+            'hedge_rate': round(self.stats['hedged'] / requests, 4) if requests else 0.0,
+            'win_rate': round(self.stats['hedge_wins'] / self.stats['hedged'], 4) if self.stats['hedged'] else 0.0,
+            'endpoints': {
+                key: {
+                    'samples': len(window.samples),
+                    'p50_ms': round((window.percentile(0.5) or 0) * 1000, 1),
+                    'p99_ms': round((window.percentile(0.99) or 0) * 1000, 1),
+                    'hedge_delay_ms': round(self.delay_for(key) * 1000, 1),
+                }
+                for key, window in self.windows.items()
+            },
+        }
+
+
+_hedger: Hedger | None = None
+
+
+def get_hedger() -> Hedger:
+    global _hedger
+    if _hedger is None:
+        settings = get_settings()
+        _hedger = Hedger(
+            enabled=settings.hedge_enabled,
+            percentile=settings.hedge_percentile,
+            min_delay=settings.hedge_min_delay_ms / 1000.0,
+            max_delay=settings.hedge_max_delay_ms / 1000.0,
+            min_samples=settings.hedge_min_samples,
+            budget_ratio=settings.hedge_budget_ratio,
+        )
+    return _hedger
@@ -0,0 +1,225 @@
+"""Fixed-memory time-series history for the dashboard counters.
+
+Samples live in one flat buffer laid out as
+
+    [header 512 B][timestamps float64 x capacity][values float64 x capacity x counters]
+
+viewed through typed memoryviews (no per-sample Python objects). The buffer is a
+bytearray by default or, when HISTORY_PATH is set, a memory-mapped file so history
+survives restarts. With several uvicorn workers sharing the file, the one holding an
+exclusive flock samples and writes; the others map it read-only and serve queries
+from the same pages (empty until the owner has sized the file; they never wait for it).
+Failed count queries are stored as NaN, not 0. Samples are read past the count cache,
+so every point is a fresh upstream count.
+"""
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+
+from ..core.config import get_settings
+from .scheduler import BACKGROUND, priority
+from .servicenow_client import ServiceNowClient
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so run a single worker when HISTORY_PATH is set
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'SNHIST01'
+_HEADER = struct.Struct('<8sIIQQ256s')  # magic, capacity, n_counters, head, count, counter names
+_HEADER_SIZE = 512
+
+
+class CounterHistory:
+    def __init__(self, counters: List[str], capacity: int, path: Optional[str] = None):
+        self.counters = list(counters)
+        self.capacity = capacity
+        self.path = path
+        self.writable = True
+        self._file = None
+        self._index = {name: i for i, name in enumerate(self.counters)}
+        self._size = _HEADER_SIZE + 8 * capacity * (1 + len(self.counters))
+        self._buf = None
+        if path:
+            buf = self._open_mapped(path, self._size)
+        else:
+            buf = bytearray(self._size)
+        if buf is not None:
+            self._attach(buf)
+            if not path:
+                self._write_header(0, 0)
+
+    def _attach(self, buf):
+        capacity = self.capacity
+        self._buf = buf
+        view = memoryview(buf)
+        self._ts = view[_HEADER_SIZE:_HEADER_SIZE + 8 * capacity].cast('d')
+        values_start = _HEADER_SIZE + 8 * capacity
+        self._values = [
+            view[values_start + 8 * capacity * i: values_start + 8 * capacity * (i + 1)].cast('d')
+            for i in range(len(self.counters))
+        ]
+
+    # ---- storage ----
+    def _names(self) -> bytes:
+        return ','.join(self.counters).encode()[:256]
+
+    def _open_mapped(self, path: str, size: int):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._file = fd
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.writable = False
+        if not self.writable:
+            # Another worker owns the file and may not have sized it yet: map later, on first use.
+            return self._map_readonly()
+        compatible = False
+        if os.fstat(fd).st_size == size:
+            os.lseek(fd, 0, os.SEEK_SET)
+            existing = os.read(fd, _HEADER.size)
+            magic, capacity, n_counters, _, _, names = _HEADER.unpack(existing)
+            compatible = magic == _MAGIC and capacity == self.capacity and names.rstrip(b'\0') == self._names()
+        if not compatible:
+            if os.fstat(fd).st_size:
+                logger.warning("History file %s has a different layout; starting fresh", path)
+            os.ftruncate(fd, 0)
+            os.ftruncate(fd, size)
+        mm = mmap.mmap(fd, size)
+        if not compatible:
+            _HEADER.pack_into(mm, 0, _MAGIC, self.capacity, len(self.counters), 0, 0, self._names())
+        return mm
+
+    def _map_readonly(self) -> Optional[mmap.mmap]:
+        try:
+            if os.fstat(self._file).st_size < self._size:
+                return None
+            return mmap.mmap(self._file, self._size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.warning("History file %s not mappable yet: %s", self.path, e)
+            return None
+
+    def _ready(self) -> bool:
+        """Whether the buffer is mapped; a read-only worker retries until the owner has sized the file."""
+        if self._buf is None and self._file is not None:
+            buf = self._map_readonly()
+            if buf is not None:
+                self._attach(buf)
+        return self._buf is not None
+
+    def _read_header(self) -> tuple[int, int]:
+        _, _, _, head, count, _ = _HEADER.unpack_from(self._buf, 0)
+        return head, count
+
+    def _write_header(self, head: int, count: int):
+        _HEADER.pack_into(self._buf, 0, _MAGIC, self.capacity, len(self.counters), head, count, self._names())
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._ts.release()
+            for v in self._values:
+                v.release()
+            if self.writable:
+                self._buf.flush()
+            self._buf.close()
+        if self._file is not None:
+            os.close(self._file)
+            self._file = None
+
+    # ---- API ----
+    def record(self, values: Dict[str, Optional[float]], ts: Optional[float] = None):
+        if not self.writable:
+            return
+        ts = time.time() if ts is None else ts
+        head, count = self._read_header()
+        for name, i in self._index.items():
+            value = values.get(name)
+            self._values[i][head] = math.nan if value is None else float(value)
+        # Timestamp and header last so a concurrent reader never sees a half-written slot as valid.
+        self._ts[head] = ts
+        self._write_header((head + 1) % self.capacity, min(count + 1, self.capacity))
+
+    def __len__(self) -> int:
+        return self._read_header()[1] if self._ready() else 0
+
+    def query(self, counter: str, window: float, step: float, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Downsample counter over the last `window` seconds into epoch-aligned `step` buckets.
+
+        Each non-empty bucket yields ts (bucket start), min, max, avg and samples; NaN samples are skipped.
+        """
+        if not self._ready():
+            return []
+        values = self._values[self._index[counter]]
+        now = time.time() if now is None else now
+        start = now - window
+        head, count = self._read_header()
+        first = (head - count) % self.capacity
+        buckets: Dict[int, List[float]] = {}
+        # Walk newest -> oldest and stop at the first sample outside the window.
+        for n in range(count):
+            slot = (first + count - 1 - n) % self.capacity
+            ts = self._ts[slot]
+            if ts < start:
+                break
+            value = values[slot]
+            if value != value:  # NaN: upstream failed for this sample
+                continue
+            bucket = int(ts // step)
+            agg = buckets.get(bucket)
+            if agg is None:
+                buckets[bucket] = [value, value, value, 1]
+            else:
+                if value < agg[0]:
+                    agg[0] = value
+                if value > agg[1]:
+                    agg[1] = value
+                agg[2] += value
+                agg[3] += 1
+        return [
+            {'ts': bucket * step, 'min': agg[0], 'max': agg[1], 'avg': agg[2] / agg[3], 'samples': int(agg[3])}
+            for bucket, agg in sorted(buckets.items())
+        ]
+
+
+_history: CounterHistory | None = None
+
+
+def get_history() -> CounterHistory:
+    global _history
+    if _history is None:
+        settings = get_settings()
+        _history = CounterHistory(
+            counters=list(ServiceNowClient.DASHBOARD_COUNT_QUERIES),
+            capacity=settings.history_capacity,
+            path=settings.history_path or None,
+        )
+    return _history
+
+
+async def run_sampler(get_client):
+    """Sample dashboard counters every HISTORY_SAMPLE_INTERVAL seconds until cancelled."""
+    settings = get_settings()
+    history = get_history()
+    if not history.writable:
+        logger.info("Counter history file owned by another worker; this worker only serves queries")
+        return
+    while True:
+        started = time.monotonic()
+        try:
+            client = await get_client()
+            with priority(BACKGROUND):
+                counts = await client.collect_dashboard_counts(fresh=True)
+            history.record(counts)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Counter history sample failed: %s", e)
+        await asyncio.sleep(max(0.0, settings.history_sample_interval - (time.monotonic() - started)))
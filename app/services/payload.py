@@ -0,0 +1,70 @@
+"""Upstream payload minimization helpers and per-endpoint wire statistics.
+
+`model_fields_for` derives the smallest `sysparm_fields` list that still satisfies a
+response model, so ServiceNow never serializes columns the API would discard.
+`PayloadStats` records bytes on the wire (compressed) versus decoded bytes for each
+upstream endpoint and is fed from an httpx response event hook.
+"""
+from typing import Any, Dict, List, Optional, Type
+import re
+import threading
+
+import httpx
+from pydantic import BaseModel
+
+_SYS_ID_SEGMENT = re.compile(r'/[0-9a-f]{32}(?=/|$)')
+
+
+def model_fields_for(model: Type[BaseModel], requested: Optional[List[str]] = None) -> Optional[List[str]]:
+    """Minimal sysparm_fields for model.
+
+    * requested is None/empty -> the fields the model declares.
+    * requested == ['*']      -> None (no restriction: every column).
+    * otherwise               -> requested plus the model's required fields (e.g. sys_id),
+                                 preserving the caller's order.
+    """
+    if requested and '*' in requested:
+        return None
+    if not requested:
+        return list(model.model_fields)
+    required = [name for name, info in model.model_fields.items() if info.is_required()]
+    return list(dict.fromkeys([*requested, *required]))
+
+
+def endpoint_label(request: httpx.Request, base_path: str) -> str:
+    path = request.url.path
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    return f"{request.method} {_SYS_ID_SEGMENT.sub('/{sys_id}', path)}"
+
+
+class PayloadStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_endpoint: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, wire_bytes: int, decoded_bytes: int):
+        with self._lock:
+            entry = self._by_endpoint.setdefault(endpoint, {'requests': 0, 'wire_bytes': 0, 'decoded_bytes': 0})
+            entry['requests'] += 1
+            entry['wire_bytes'] += wire_bytes
+            entry['decoded_bytes'] += decoded_bytes
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out: Dict[str, Dict[str, Any]] = {}
+            for endpoint, entry in self._by_endpoint.items():
+                saved = entry['decoded_bytes'] - entry['wire_bytes']
+                out[endpoint] = {
+                    **entry,
+                    'saved_bytes': saved,
+                    'compression_ratio': round(entry['decoded_bytes'] / entry['wire_bytes'], 2) if entry['wire_bytes'] else None,
+                }
+            return out
+
+    def reset(self):
+        with self._lock:
+            self._by_endpoint.clear()
+
+
+payload_stats = PayloadStats()
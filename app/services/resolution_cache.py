@@ -0,0 +1,104 @@
+"""Process-local caches used to resolve identifiers without a ServiceNow round trip.
+
+Incident numbers never change their sys_id once created, so number -> sys_id
+mappings are kept for the life of the process (bounded LRU). Assignee lookups
+only cache *exact* name / user_name matches and expire them after a TTL so a
+newly created namesake eventually turns the name ambiguous again.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import threading
+import time
+
+from ..core.config import get_settings
+
+
+class IncidentSysIdCache:
+    """Bounded LRU mapping incident number -> sys_id (entries never expire)."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, number: str) -> Optional[str]:
+        key = number.upper()
+        with self._lock:
+            sys_id = self._data.get(key)
+            if sys_id is not None:
+                self._data.move_to_end(key)
+            return sys_id
+
+    def put(self, number: str, sys_id: str):
+        if not number or not sys_id:
+            return
+        key = number.upper()
+        with self._lock:
+            self._data[key] = sys_id
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class AssigneeCache:
+    """Remembers which user an exact name / user_name term resolved to (TTL bound)."""
+
+    def __init__(self, ttl_seconds: float = 3600.0, max_size: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._data: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, term: str) -> Optional[Dict[str, Any]]:
+        key = term.strip().lower()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return dict(user)
+
+    def put(self, term: str, user: Dict[str, Any]):
+        """Remember that an exact match on term resolved to user.
+
+        Only the term itself is indexed: a unique user_name match says nothing
+        about whether the same person's display name is unique.
+        """
+        key = term.strip().lower()
+        if not key or not user.get('sys_id'):
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, dict(user))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_incident_sys_ids: IncidentSysIdCache | None = None
+_assignees: AssigneeCache | None = None
+
+
+def get_incident_sys_id_cache() -> IncidentSysIdCache:
+    global _incident_sys_ids
+    if _incident_sys_ids is None:
+        _incident_sys_ids = IncidentSysIdCache(max_size=get_settings().incident_sys_id_cache_size)
+    return _incident_sys_ids
+
+
+def get_assignee_cache() -> AssigneeCache:
+    global _assignees
+    if _assignees is None:
+        _assignees = AssigneeCache(ttl_seconds=get_settings().assignee_cache_ttl)
+    return _assignees
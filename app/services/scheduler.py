@@ -0,0 +1,273 @@
+"""Priority scheduling of upstream ServiceNow calls under one shared concurrency limit.
+
+Every call is tagged with a priority class taken from a context variable (default
+`interactive`; background jobs wrap their work in `with priority(BACKGROUND):`).
+While fewer than `limit` calls are in flight a call starts immediately. Otherwise it
+queues, and freed slots go to the classes by weighted fair queuing: each class has a
+virtual "pass" that advances by 1/weight per call served, and the backlogged class
+with the lowest pass goes next. Interactive therefore gets most of the capacity under
+contention, while background and bulk work still progresses. A class coming back from
+idle starts at the current virtual time, so it cannot bank credit while idle.
+
+Background and bulk *reads* are preemptible. If an interactive call has to queue, the
+most recently started preemptible call (bulk before background) is cancelled. Its slot
+goes straight to the interactive call, and the preempted read is re-queued and retried
+transparently, up to `max_preemptions` times per call.
+
+With CONCURRENCY_ADAPTIVE the limit itself is not fixed: every completed attempt's RTT
+and outcome go to the `AdaptiveLimiter` (services/concurrency.py), which resizes it.
+Bulk calls only report failures: their large pages are slow by size, not by load.
+Exceptions other than httpx transport errors (such as the 504 raised when the request
+deadline is already spent) never reached ServiceNow and are not reported at all.
+
+Per-class queue waits are tracked for `GET /api/v1/metrics/scheduler`.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+import asyncio
+import time
+
+import httpx
+
+from ..core.config import get_settings
+from .concurrency import AdaptiveLimiter, get_limiter, is_overload
+from .hedging import LatencyWindow
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+BULK = 'bulk'
+PRIORITY_CLASSES = (INTERACTIVE, BACKGROUND, BULK)
+
+_priority: ContextVar[str] = ContextVar('upstream_priority', default=INTERACTIVE)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def priority(cls: str):
+    """Tag upstream calls made inside the block (and tasks started from it) with cls."""
+    if cls not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class {cls!r}")
+    token = _priority.set(cls)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _ClassState:
+    def __init__(self, name: str, weight: float):
+        self.name = name
+        self.weight = weight
+        self.rank = PRIORITY_CLASSES.index(name)
+        self.queue: Deque[asyncio.Future] = deque()
+        self.pass_ = 0.0
+        self.in_flight = 0
+        self.waits = LatencyWindow(size=500)
+        self.stats: Dict[str, float] = {'requests': 0, 'queued': 0, 'preempted': 0, 'wait_max': 0.0}
+
+    def record_wait(self, seconds: float, queued: bool):
+        self.stats['requests'] += 1
+        self.stats['queued'] += int(queued)
+        self.stats['wait_max'] = max(self.stats['wait_max'], seconds)
+        self.waits.add(seconds)
+
+
+class _Slot:
+    __slots__ = ('state', 'task', 'preemptible', 'preempted', 'started')
+
+    def __init__(self, state: _ClassState, task: asyncio.Future, preemptible: bool):
+        self.state = state
+        self.task = task
+        self.preemptible = preemptible
+        self.preempted = False
+        self.started = time.monotonic()
+
+
+class UpstreamScheduler:
+    def __init__(self, limit: int, weights: Dict[str, float], preemption: bool = True, max_preemptions: int = 2,
+                 limiter: Optional[AdaptiveLimiter] = None):
+        self.limiter = limiter
+        self.limit = max(1, int(limiter.limit) if limiter else limit)
+        self.preemption = preemption
+        self.max_preemptions = max_preemptions
+        self.in_flight = 0
+        self.vtime = 0.0
+        self.preemptions = 0
+        self._classes = {name: _ClassState(name, max(weights.get(name, 1.0), 0.01)) for name in PRIORITY_CLASSES}
+        self._running: Set[_Slot] = set()
+
+    # ---- public API ----
+    async def run(self, cls: str, send: Callable[[], Awaitable[Any]], preemptible: bool = True,
+                  on_start: Optional[Callable[[], None]] = None) -> Any:
+        """Run send() once a slot is granted to cls; preempted attempts are retried.
+
+        on_start() is called each time a slot is granted, just before send().
+        """
+        state = self._classes[cls]
+        preempted = 0
+        while True:
+            queued_at = time.perf_counter()
+            queued = await self._acquire(state)
+            state.record_wait(time.perf_counter() - queued_at, queued)
+            if on_start is not None:
+                on_start()
+            slot = _Slot(
+                state, asyncio.ensure_future(send()),
+                self.preemption and preemptible and cls != INTERACTIVE and preempted < self.max_preemptions,
+            )
+            self._running.add(slot)
+            state.in_flight += 1
+            try:
+                result = await slot.task
+            except asyncio.CancelledError:
+                if not slot.preempted or asyncio.current_task().cancelling():
+                    raise
+                preempted += 1
+            except Exception as e:
+                self._observe(slot, None, e)
+                raise
+            else:
+                self._observe(slot, result, None)
+                return result
+            finally:
+                if not slot.task.done():
+                    slot.task.cancel()
+                self._running.discard(slot)
+                state.in_flight -= 1
+                self._release(handoff=slot.preempted)
+
+    def set_limit(self, limit: int):
+        """Change the shared limit; raising it admits queued calls immediately."""
+        self.limit = max(1, limit)
+        self._dispatch()
+
+    def _observe(self, slot: _Slot, result: Any, error: Optional[BaseException]):
+        # Cancelled attempts (preempted, lost hedges, gone clients) say nothing about upstream latency.
+        if self.limiter is None:
+            return
+        if error is not None and not isinstance(error, httpx.TransportError):
+            # Raised before or instead of an upstream exchange (an exhausted deadline's 504):
+            # its "RTT" is how fast we gave up. Transport errors, timeouts included, are overload.
+            return
+        overload = is_overload(result, error)
+        if slot.state.name == BULK and not overload:
+            # A 2000-row page is slow by size, not because the upstream is saturated; its RTT
+            # would drag the limit down for interactive traffic. Its failures still count.
+            return
+        limit = self.limiter.observe(time.monotonic() - slot.started, self.in_flight, overload)
+        if limit != self.limit:
+            self.set_limit(limit)
+
+    def queued(self) -> int:
+        return sum(len(state.queue) for state in self._classes.values())
+
+    # ---- internals ----
+    async def _acquire(self, state: _ClassState) -> bool:
+        """Take a slot for state; returns whether the call had to queue for it."""
+        if self.in_flight < self.limit and not self.queued():
+            self.in_flight += 1
+            return False
+        if state.name == INTERACTIVE:
+            self._preempt_one()
+        if not state.queue:
+            state.pass_ = max(state.pass_, self.vtime)
+        fut = asyncio.get_running_loop().create_future()
+        state.queue.append(fut)
+        try:
+            await fut
+            return True
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()  # granted just as we were cancelled: give the slot back
+            else:
+                try:
+                    state.queue.remove(fut)
+                except ValueError:
+                    pass
+            raise
+
+    def _preempt_one(self):
+        victims = [slot for slot in self._running if slot.preemptible and not slot.preempted and not slot.task.done()]
+        if not victims:
+            return
+        # Lowest class first (bulk, then background); within it the newest, which has the least work to lose.
+        victim = max(victims, key=lambda slot: (slot.state.rank, slot.started))
+        victim.preempted = True
+        victim.state.stats['preempted'] += 1
+        self.preemptions += 1
+        victim.task.cancel()
+
+    def _pick(self, prefer_interactive: bool) -> Optional[_ClassState]:
+        interactive = self._classes[INTERACTIVE]
+        if prefer_interactive and interactive.queue:
+            return interactive
+        backlogged = [state for state in self._classes.values() if state.queue]
+        if not backlogged:
+            return None
+        return min(backlogged, key=lambda state: (state.pass_, state.rank))
+
+    def _release(self, handoff: bool = False):
+        self.in_flight -= 1
+        self._dispatch(prefer_interactive=handoff)
+
+    def _dispatch(self, prefer_interactive: bool = False):
+        while self.in_flight < self.limit:
+            state = self._pick(prefer_interactive)
+            if state is None:
+                return
+            fut = state.queue.popleft()
+            if fut.done():  # waiter cancelled while queued
+                continue
+            self.vtime = state.pass_
+            state.pass_ += 1.0 / state.weight
+            self.in_flight += 1
+            fut.set_result(None)
+            prefer_interactive = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'queued': self.queued(),
+            'preemptions': self.preemptions,
+            'classes': {
+                name: {
+                    'weight': state.weight,
+                    'queued_now': len(state.queue),
+                    'in_flight': state.in_flight,
+                    'requests': int(state.stats['requests']),
+                    'queued': int(state.stats['queued']),
+                    'preempted': int(state.stats['preempted']),
+                    'wait_p50_ms': round((state.waits.percentile(0.5) or 0) * 1000, 2),
+                    'wait_p95_ms': round((state.waits.percentile(0.95) or 0) * 1000, 2),
+                    'wait_max_ms': round(state.stats['wait_max'] * 1000, 2),
+                }
+                for name, state in self._classes.items()
+            },
+        }
+
+
+_scheduler: UpstreamScheduler | None = None
+
+
+def get_scheduler() -> UpstreamScheduler:
+    global _scheduler
+    if _scheduler is None:
+        settings = get_settings()
+        _scheduler = UpstreamScheduler(
+            limit=settings.upstream_concurrency,
+            weights={
+                INTERACTIVE: settings.scheduler_weight_interactive,
+                BACKGROUND: settings.scheduler_weight_background,
+                BULK: settings.scheduler_weight_bulk,
+            },
+            preemption=settings.scheduler_preemption,
+            max_preemptions=settings.scheduler_max_preemptions,
+            limiter=get_limiter() if settings.concurrency_adaptive else None,
+        )
+    return _scheduler
@@ -0,0 +1,86 @@
+"""Answer narrower typeahead terms locally from a broader, complete search result.
+
+User searches are `nameLIKE<term>^ORuser_nameLIKE<term>` (case-insensitive contains).
+When a term returned fewer rows than its limit, that list is *every* match, so any
+longer term starting with it matches a subset that can be found by filtering those
+rows on name / user_name. "j" -> "jo" -> "joh" -> "john" then costs at most one
+upstream query as soon as a prefix comes back under the limit.
+
+Entries are scoped by search kind, assignment group and requested fields (a refined
+answer must carry the same columns), live for CACHE_TTL_DIRECTORY and are bounded LRU.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+import threading
+import time
+
+from ..core.config import get_settings
+
+MATCH_FIELDS = ('name', 'user_name')
+
+
+def can_refine(term: Optional[str], fields: Optional[Sequence[str]]) -> bool:
+    """Refinement needs a plain term and rows that carry the fields the LIKE matched on."""
+    if not term or '^' in term:
+        return False
+    return fields is None or all(f in fields for f in MATCH_FIELDS)
+
+
+class SearchRefinementCache:
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: "OrderedDict[tuple, tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'refined': 0, 'stored': 0}
+
+    def lookup(self, scope: Hashable, term: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Rows for term filtered from the longest cached complete prefix, or None."""
+        needle = term.casefold()
+        now = time.monotonic()
+        with self._lock:
+            for end in range(len(needle), 0, -1):
+                key = (scope, needle[:end])
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                expires_at, rows = entry
+                if expires_at < now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                break
+            else:
+                return None
+        self.stats['refined'] += 1
+        matches = [
+            row for row in rows
+            if any(needle in str(row.get(f) or '').casefold() for f in MATCH_FIELDS)
+        ]
+        return matches[:limit]
+
+    def store(self, scope: Hashable, term: str, rows: List[Dict[str, Any]], limit: int):
+        """Remember rows for term if they are the complete match set (fewer than limit)."""
+        if self.ttl_seconds <= 0 or len(rows) >= limit:
+            return
+        key = (scope, term.casefold())
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, rows)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        self.stats['stored'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_refinements: SearchRefinementCache | None = None
+
+
+def get_search_refinements() -> SearchRefinementCache:
+    global _refinements
+    if _refinements is None:
+        _refinements = SearchRefinementCache(ttl_seconds=get_settings().cache_ttl_directory)
+    return _refinements
@@ -1,20 +1,48 @@
 import httpx
-from typing import Any, Dict, List, Optional
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 from ..core.config import get_settings
 import logging
-from ..utils.exceptions import raise_gateway_error, ServiceNowConnectionError
+from ..core import deadline
+from ..core.logging_config import body_preview
+from ..utils.exceptions import raise_deadline_exceeded, raise_gateway_error, ServiceNowConnectionError
+from .cache import cached_read, get_cache
+from .payload import model_fields_for, endpoint_label, payload_stats
+from .hedging import get_hedger
+from .traffic import build_transport
+from .search_cache import can_refine, get_search_refinements
+from .scheduler import BULK, current_priority, get_scheduler, priority
+from ..schemas.incident import Incident
+from ..schemas.search import User, Location
 
 logger = logging.getLogger(__name__)
 
+# Added to every table read: drop reference `link` URLs and skip the total-count computation
+# (only the dashboard count queries need X-Total-Count).
+LEAN_READ_PARAMS = {'sysparm_exclude_reference_link': 'true', 'sysparm_no_count': 'true'}
+
+# Cheapest authenticated read: one sys_id, no count (warm-up and health probes).
+PROBE_PARAMS = {'sysparm_limit': '1', 'sysparm_fields': 'sys_id', 'sysparm_no_count': 'true'}
+
 class ServiceNowClient:
     def __init__(self):
         self.settings = get_settings()
         timeout_seconds = self.settings.servicENow_timeout / 1000.0
+        # Keep at least the warm-up connections alive in the pool once opened.
+        limits = httpx.Limits(max_keepalive_connections=max(20, self.settings.startup_warm_connections))
         self._client = httpx.AsyncClient(
             base_url=self.settings.base_url,
             timeout=timeout_seconds,
-            auth=(self.settings.servicENow_username, self.settings.servicENow_password)
+            auth=(self.settings.servicENow_username, self.settings.servicENow_password),
+            limits=limits,
+            # UPSTREAM_RECORD_PATH / UPSTREAM_REPLAY_PATH: capture or replay upstream traffic (services/traffic.py).
+            transport=build_transport(self.settings, limits),
+            event_hooks={'response': [self._record_payload]},
         )
+        self._cache = get_cache()
+        self._hedger = get_hedger()
+        self._scheduler = get_scheduler()
 
     def _handle_redirect(self, resp: httpx.Response, context: str):
         if resp.status_code in (301, 302, 303, 307, 308):
@@ -25,49 +53,133 @@ class ServiceNowClient:
             )
             raise_gateway_error(f"Unexpected redirect ({resp.status_code}). Check API base path or SSO settings.")
 
+    async def _get(self, path: str, params: Dict[str, Any], site: str) -> httpx.Response:
+        """GET for idempotent reads: latency-tracked, hedged when HEDGE_ENABLED, scheduled by priority class.
+
+        Latency (and so the hedge delay) is tracked per call site: a single-row read and a
+        200-row list on the same table have nothing in common. Bulk reads (large analytics
+        pages) are never hedged. Each attempt (including a hedge) takes its own scheduler
+        slot; background/bulk reads may be preempted. The hedge delay and latency sample
+        start once the first attempt has its slot, not while it queues locally.
+        """
+        cls = current_priority()
+
+        def send(on_dispatch=None):
+            return self._scheduler.run(
+                cls, lambda: self._client.get(path, params=params, timeout=self._request_timeout()), on_start=on_dispatch,
+            )
+
+        if cls == BULK:
+            return await send()
+        return await self._hedger.run(site, send)
+
+    def _request_timeout(self) -> float:
+        """SERVICENOW_TIMEOUT for one upstream call, shortened to what is left of the request deadline.
+
+        Evaluated per call, so sequential calls in one route share a single budget.
+        """
+        seconds = deadline.bounded_timeout(self.settings.servicENow_timeout / 1000.0)
+        if seconds <= 0:
+            raise_deadline_exceeded("Request deadline exceeded before calling ServiceNow")
+        return seconds
+
+    async def _record_payload(self, resp: httpx.Response):
+        # Body is read here (every caller reads it anyway) so wire vs decoded size is known.
+        await resp.aread()
+        base_path = httpx.URL(self.settings.base_url).path
+        payload_stats.record(endpoint_label(resp.request, base_path), resp.num_bytes_downloaded, len(resp.content))
+
+    def _incident_read_fields(self) -> List[str]:
+        """Columns the Incident response model needs, narrowed by SERVICENOW_INCIDENT_FIELDS when configured."""
+        if not self.settings.incident_fields:
+            return model_fields_for(Incident)
+        configured = set(self.settings.get_incident_fields())
+        return model_fields_for(Incident, [f for f in Incident.model_fields if f in configured])
+
     async def close(self):
         await self._client.aclose()
 
-    async def list_incidents(self, limit: int = 20, offset: int = 0, query: Optional[str] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    async def probe(self) -> httpx.Response:
+        """One cheap authenticated read over the pooled connection (health prober).
+
+        Sent outside the scheduler so it measures upstream latency, not our queue.
+        """
+        return await self._client.get('/table/incident', params=PROBE_PARAMS, timeout=5.0)
+
+    async def warm_up(self, connections: int) -> int:
+        """Open `connections` pooled keep-alive connections so DNS, TLS and auth are done before traffic.
+
+        Probes run concurrently (each holds its own connection). Returns how many got a 200;
+        failures are logged rather than raised so a flaky upstream never blocks startup.
+        """
+        async def probe() -> int:
+            resp = await self._client.get('/table/incident', params=PROBE_PARAMS)
+            return resp.status_code
+
+        outcomes = await asyncio.gather(*(probe() for _ in range(connections)), return_exceptions=True)
+        ok = 0
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                logger.warning("ServiceNow warm-up probe failed: %s", outcome)
+            elif outcome != 200:
+                logger.warning("ServiceNow warm-up probe returned status %s", outcome)
+            else:
+                ok += 1
+        return ok
+
+    @cached_read("incidents", "cache_ttl_incidents")
+    async def list_incidents(self, limit: int = 20, offset: int = 0, query: Optional[str] = None, fields: Optional[List[str]] = None, with_total: bool = False) -> Dict[str, Any]:
+        """List incidents; with_total=True also returns the full match count (X-Total-Count) as 'total'."""
         params = {
             'sysparm_limit': str(limit),
             'sysparm_offset': str(offset),
             'sysparm_display_value': 'true',
+            **LEAN_READ_PARAMS,
         }
         if fields is None:
-            fields = self.settings.get_incident_fields()
+            fields = self._incident_read_fields()
         params['sysparm_fields'] = ','.join(fields)
         if query:
             params['sysparm_query'] = query
+        if with_total:
+            del params['sysparm_no_count']
         url = f"/table/incident"
-        logger.debug(f"Fetching incidents with params {params}")
+        logger.debug("Fetching incidents with params %s", params)
         try:
-            resp = await self._client.get(url, params=params)
+            resp = await self._get(url, params, site='list incidents')
             self._handle_redirect(resp, "list incidents")
             resp.raise_for_status()
             data = resp.json()
             records = data.get('result', data)
             normalized = [self._normalize_record(r) for r in records]
+            if with_total:
+                try:
+                    total = int(resp.headers.get('X-Total-Count', len(normalized)))
+                except ValueError:
+                    total = len(normalized)
+                return {'result': normalized, 'total': total}
             return {'result': normalized}
         except httpx.RequestError as e:
-            logger.error(f"ServiceNow connection error listing incidents: {e}")
+            logger.error("ServiceNow connection error listing incidents: %s", e)
             raise_gateway_error("Unable to connect to ServiceNow (list incidents)")
         except httpx.HTTPStatusError as e:
-            logger.error(f"ServiceNow HTTP error listing incidents: {e.response.status_code} {e.response.text}")
+            logger.error("ServiceNow HTTP error listing incidents: %s %s", e.response.status_code, body_preview(e.response))
             raise_gateway_error(f"ServiceNow responded with status {e.response.status_code}")
 
+    @cached_read("incidents", "cache_ttl_incidents", negative=True)
     async def get_incident(self, number: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
         # number is the human readable. Need to query by number.
         if fields is None:
-            fields = self.settings.get_incident_fields()
+            fields = self._incident_read_fields()
         params = {
             'sysparm_query': f"number={number}",
             'sysparm_limit': '1',
             'sysparm_fields': ','.join(fields),
-            'sysparm_display_value': 'true'
+            'sysparm_display_value': 'true',
+            **LEAN_READ_PARAMS,
         }
         try:
-            resp = await self._client.get('/table/incident', params=params)
+            resp = await self._get('/table/incident', params, site='get incident')
             self._handle_redirect(resp, f"get incident {number}")
             resp.raise_for_status()
             res = resp.json().get('result', [])
@@ -75,23 +187,28 @@ class ServiceNowClient:
                 return {}
             return self._normalize_record(res[0])
         except httpx.RequestError as e:
-            logger.error(f"ServiceNow connection error get incident {number}: {e}")
+            logger.error("ServiceNow connection error get incident %s: %s", number, e)
             raise_gateway_error("Unable to connect to ServiceNow (get incident)")
         except httpx.HTTPStatusError as e:
-            logger.error(f"ServiceNow HTTP error get incident {number}: {e.response.status_code} {e.response.text}")
+            logger.error("ServiceNow HTTP error get incident %s: %s %s", number, e.response.status_code, body_preview(e.response))
             raise_gateway_error(f"ServiceNow responded with status {e.response.status_code}")
 
     async def create_incident(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            resp = await self._client.post('/table/incident', json=payload)
+            resp = await self._scheduler.run(
+                current_priority(),
+                lambda: self._client.post('/table/incident', json=payload, timeout=self._request_timeout()),
+                preemptible=False,
+            )
             self._handle_redirect(resp, "create incident")
             resp.raise_for_status()
+            await self._cache.bump_generation("incidents")
             return resp.json().get('result', {})
         except httpx.RequestError as e:
-            logger.error(f"ServiceNow connection error create incident: {e}")
+            logger.error("ServiceNow connection error create incident: %s", e)
             raise_gateway_error("Unable to connect to ServiceNow (create incident)")
         except httpx.HTTPStatusError as e:
-            logger.error(f"ServiceNow HTTP error create incident: {e.response.status_code} {e.response.text}")
+            logger.error("ServiceNow HTTP error create incident: %s %s", e.response.status_code, body_preview(e.response))
             raise_gateway_error(f"ServiceNow responded with status {e.response.status_code}")
 
     async def update_incident(self, sys_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -99,107 +216,147 @@ class ServiceNowClient:
             # Include display values so reference fields (assignment_group, assigned_to, etc.) come back as objects
             # then normalize them to plain strings expected by Pydantic schema.
             params = {
-                'sysparm_display_value': 'true'
+                'sysparm_display_value': 'true',
+                'sysparm_exclude_reference_link': 'true',
+                'sysparm_fields': ','.join(self._incident_read_fields()),
             }
-            resp = await self._client.patch(f'/table/incident/{sys_id}', params=params, json=payload)
+            resp = await self._scheduler.run(
+                current_priority(),
+                lambda: self._client.patch(f'/table/incident/{sys_id}', params=params, json=payload, timeout=self._request_timeout()),
+                preemptible=False,
+            )
             self._handle_redirect(resp, f"update incident {sys_id}")
             resp.raise_for_status()
+            await self._cache.bump_generation("incidents")
             raw = resp.json().get('result', {})
             if raw:
                 return self._normalize_record(raw)
             return raw
         except httpx.RequestError as e:
-            logger.error(f"ServiceNow connection error update incident {sys_id}: {e}")
+            logger.error("ServiceNow connection error update incident %s: %s", sys_id, e)
             raise_gateway_error("Unable to connect to ServiceNow (update incident)")
         except httpx.HTTPStatusError as e:
-            logger.error(f"ServiceNow HTTP error update incident {sys_id}: {e.response.status_code} {e.response.text}")
+            logger.error("ServiceNow HTTP error update incident %s: %s %s", sys_id, e.response.status_code, body_preview(e.response))
             raise_gateway_error(f"ServiceNow responded with status {e.response.status_code}")
 
+    # Example counts similar to screenshot: open P1, breached SLA, not updated 24h, incidents at risk, my incidents, unassigned
+    DASHBOARD_COUNT_QUERIES: Dict[str, str] = {
+        'open_p1': 'priority=1^stateNOT IN6,7',
+        'sla_breached': 'u_sla_breached=true',  # placeholder - adjust field names
+        'not_updated_24h': 'sys_updated_onRELATIVELE@dayofweek@ago@1',
+        'sla_at_risk': 'u_sla_at_risk=true',
+        'unassigned': 'assigned_toISEMPTY^stateNOT IN6,7',
+    }
+
     async def get_dashboard_counts(self) -> Dict[str, int]:
-        # Example counts similar to screenshot: open P1, breached SLA, not updated 24h, incidents at risk, my incidents, unassigned
+        counts = await self.collect_dashboard_counts()
+        return {key: count or 0 for key, count in counts.items()}
+
+    async def collect_dashboard_counts(self, fresh: bool = False) -> Dict[str, Optional[int]]:
+        """Dashboard counts with None for queries ServiceNow failed to answer (get_dashboard_counts reports those as 0).
+
+        fresh=True skips the count cache (history samples must not repeat a cached value).
+        """
+        count = self.count_incidents_uncached if fresh else self.count_incidents
         # This uses multiple queries; optimize later with parallel tasks.
-        queries = {
-            'open_p1': 'priority=1^stateNOT IN6,7',
-            'sla_breached': 'u_sla_breached=true',  # placeholder - adjust field names
-            'not_updated_24h': 'sys_updated_onRELATIVELE@dayofweek@ago@1',
-            'sla_at_risk': 'u_sla_at_risk=true',
-            'unassigned': 'assigned_toISEMPTY^stateNOT IN6,7',
-        }
-        results: Dict[str,int] = {}
-        for key, q in queries.items():
-            params = {'sysparm_query': q, 'sysparm_count': 'true'}
+        results: Dict[str, Optional[int]] = {}
+        for key, q in self.DASHBOARD_COUNT_QUERIES.items():
             try:
-                resp = await self._client.get('/table/incident', params=params)
-                self._handle_redirect(resp, f"count {key}")
-                if resp.status_code == 200:
-                    try:
-                        results[key] = int(resp.headers.get('X-Total-Count', '0'))
-                    except ValueError:
-                        results[key] = 0
-                else:
-                    results[key] = 0
+                results[key] = await count(key, q)
             except httpx.RequestError as e:
-                logger.error(f"ServiceNow connection error counts {key}: {e}")
-                results[key] = 0
-            except httpx.HTTPStatusError as e:
-                logger.error(f"ServiceNow HTTP error counts {key}: {e.response.status_code} {e.response.text}")
-                results[key] = 0
+                logger.error("ServiceNow connection error counts %s: %s", key, e)
+                results[key] = None
         return results
 
+    @cached_read("incidents", "cache_ttl_counts", should_cache=lambda count: count is not None)
+    async def count_incidents(self, key: str, query: str) -> Optional[int]:
+        """X-Total-Count for an encoded incident query; None when ServiceNow gave no usable answer (not cached)."""
+        return await self.count_incidents_uncached(key, query)
+
+    async def count_incidents_uncached(self, key: str, query: str) -> Optional[int]:
+        # Only the X-Total-Count header matters: ask for a single sys_id row.
+        params = {'sysparm_query': query, 'sysparm_count': 'true', 'sysparm_limit': '1', 'sysparm_fields': 'sys_id'}
+        resp = await self._get('/table/incident', params, site='count incidents')
+        self._handle_redirect(resp, f"count {key}")
+        if resp.status_code != 200:
+            return None
+        try:
+            return int(resp.headers.get('X-Total-Count', '0'))
+        except ValueError:
+            return None
+
     # ----------------- search endpoints -----------------
+    @cached_read("directory", "cache_ttl_directory", negative=True)
     async def search_users(self, term: str, limit: int = 20, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Search sys_user table by name or user id.
-        If fields is provided (and not ['*']), restrict output to those fields using sysparm_fields.
-        If fields is None or contains '*', all available fields will be returned.
+        If fields is provided, request those fields (plus sys_id) using sysparm_fields.
+        If fields is None, only the fields declared on the User model are requested.
+        If fields contains '*', all available fields will be returned.
         """
         query = f"nameLIKE{term}^ORuser_nameLIKE{term}"
         params: Dict[str, Any] = {
             'sysparm_query': query,
             'sysparm_limit': str(limit),
             'sysparm_display_value': 'true',
+            **LEAN_READ_PARAMS,
         }
-        if fields and not (len(fields) == 1 and fields[0] == '*'):
-            params['sysparm_fields'] = ','.join(fields)
+        sysparm_fields = model_fields_for(User, fields)
+        if sysparm_fields is not None:
+            params['sysparm_fields'] = ','.join(sysparm_fields)
+        refinements = get_search_refinements() if can_refine(term, sysparm_fields) else None
+        scope = ('users', tuple(sysparm_fields or ()))
+        if refinements is not None:
+            local = refinements.lookup(scope, term, limit)
+            if local is not None:
+                return local
         try:
-            resp = await self._client.get('/table/sys_user', params=params)
+            resp = await self._get('/table/sys_user', params, site='search users')
             self._handle_redirect(resp, 'search users')
             resp.raise_for_status()
             data = resp.json().get('result', [])
-            return [self._normalize_record(r) for r in data]
+            users = [self._normalize_record(r) for r in data]
+            if refinements is not None:
+                refinements.store(scope, term, users, limit)
+            return users
         except httpx.RequestError as e:
-            logger.error(f"ServiceNow connection error search users: {e}")
+            logger.error("ServiceNow connection error search users: %s", e)
             raise_gateway_error("Unable to connect to ServiceNow (search users)")
         except httpx.HTTPStatusError as e:
-            logger.error(f"ServiceNow HTTP error search users: {e.response.status_code} {e.response.text}")
+            logger.error("ServiceNow HTTP error search users: %s %s", e.response.status_code, body_preview(e.response))
             raise_gateway_error(f"ServiceNow responded with status {e.response.status_code}")
 
+    @cached_read("directory", "cache_ttl_directory", negative=True)
     async def search_locations(self, term: str, limit: int = 20, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Search cmn_location table by name.
-        If fields is provided (and not ['*']), restrict output to those fields.
-        If fields is None or contains '*', return all fields.
+        If fields is provided, restrict output to those fields (plus sys_id).
+        If fields is None, only the fields declared on the Location model are requested.
+        If fields contains '*', return all fields.
         """
         query = f"nameLIKE{term}"
         params: Dict[str, Any] = {
             'sysparm_query': query,
             'sysparm_limit': str(limit),
             'sysparm_display_value': 'true',
+            **LEAN_READ_PARAMS,
         }
-        if fields and not (len(fields) == 1 and fields[0] == '*'):
-            params['sysparm_fields'] = ','.join(fields)
+        sysparm_fields = model_fields_for(Location, fields)
+        if sysparm_fields is not None:
+            params['sysparm_fields'] = ','.join(sysparm_fields)
         try:
-            resp = await self._client.get('/table/cmn_location', params=params)
+            resp = await self._get('/table/cmn_location', params, site='search locations')
             self._handle_redirect(resp, 'search locations')
             resp.raise_for_status()
             data = resp.json().get('result', [])
             return [self._normalize_record(r) for r in data]
         except httpx.RequestError as e:
-            logger.error(f"ServiceNow connection error search locations: {e}")
+            logger.error("ServiceNow connection error search locations: %s", e)
             raise_gateway_error("Unable to connect to ServiceNow (search locations)")
         except httpx.HTTPStatusError as e:
-            logger.error(f"ServiceNow HTTP error search locations: {e.response.status_code} {e.response.text}")
+            logger.error("ServiceNow HTTP error search locations: %s %s", e.response.status_code, body_preview(e.response))
             raise_gateway_error(f"ServiceNow responded with status {e.response.status_code}")
 
     # ----------------- assignee suggestions -----------------
+    @cached_read("directory", "cache_ttl_directory", negative=True)
     async def search_assignable_users(
         self,
         term: Optional[str] = None,
@@ -212,117 +369,273 @@ class ServiceNowClient:
         If assignment_group (sys_id) supplied, restrict to members of that group using sys_user_grmember.
         Strategy:
           1. If group provided, fetch member user sys_ids (limit a reasonable number: 500) from membership table.
-          2. Build user query filtering to those ids AND optional name/user_name term.
+          2. Fetch those users with fetch_by_ids (chunked, concurrent), ANDing the optional name/user_name term
+             into every chunk, and return the first `limit` by name.
           3. If no group, fallback to simple name/user_name LIKE search (reuse search_users style).
 
         NOTE: For performance, if group has many members and term provided, we still fetch all member ids then filter.
         A more advanced optimization would push term into membership join via scripted API, omitted here for simplicity.
         """
+        sysparm_fields = model_fields_for(User, fields)
+        refinements = get_search_refinements() if can_refine(term, sysparm_fields) else None
+        scope = ('assignees', assignment_group, tuple(sysparm_fields or ()))
+        if refinements is not None:
+            local = refinements.lookup(scope, term, limit)
+            if local is not None:
+                return local
+
         member_ids: Optional[set[str]] = None
         if assignment_group:
             mem_params = {
                 'sysparm_query': f'group={assignment_group}',
                 'sysparm_fields': 'user',
                 'sysparm_limit': '500',
-                'sysparm_display_value': 'false'
+                'sysparm_display_value': 'false',
+                **LEAN_READ_PARAMS,
             }
             try:
-                mem_resp = await self._client.get('/table/sys_user_grmember', params=mem_params)
+                mem_resp = await self._get('/table/sys_user_grmember', mem_params, site='group members')
                 self._handle_redirect(mem_resp, 'fetch group members')
                 mem_resp.raise_for_status()
                 rows = mem_resp.json().get('result', [])
                 ids: set[str] = set()
                 for r in rows:
                     u = r.get('user')
-                    if isinstance(u, dict):
-                        val = u.get('value')
-                        if val:
-                            ids.add(val)
+                    # Plain sys_id string when reference links are excluded; {"value": ...} otherwise.
+                    val = u.get('value') if isinstance(u, dict) else u
+                    if val:
+                        ids.add(val)
                 member_ids = ids
                 if not member_ids:
                     return []
             except httpx.RequestError as e:
-                logger.error(f"ServiceNow connection error group members: {e}")
+                logger.error("ServiceNow connection error group members: %s", e)
                 raise_gateway_error('Unable to connect to ServiceNow (group members)')
             except httpx.HTTPStatusError as e:
-                logger.error(f"ServiceNow HTTP error group members: {e.response.status_code} {e.response.text}")
+                logger.error("ServiceNow HTTP error group members: %s %s", e.response.status_code, body_preview(e.response))
                 raise_gateway_error(f'ServiceNow responded with status {e.response.status_code}')
 
-        # Build user query
-        query_parts: List[str] = []
-        if member_ids:
-            # chunk if too many (SN limit for IN list ~ 1024 chars; simplistic split at 100)
-            ids_list = sorted(member_ids)
-            if len(ids_list) > 100:
-                # naive chunk OR chain
-                chunks = [ids_list[i:i+100] for i in range(0, len(ids_list), 100)]
-                or_queries = [ 'sys_idIN' + ','.join(chunk) for chunk in chunks ]
-                # join with ^NQ so both halves accepted
-                first = True
-                combined = ''
-                for oq in or_queries:
-                    if first:
-                        combined = oq
-                        first = False
-                    else:
-                        combined += '^NQ' + oq
-                query_parts.append(combined)
-            else:
-                query_parts.append('sys_idIN' + ','.join(ids_list))
-        if term:
-            safe = term.replace('^','')
-            query_parts.append(f'nameLIKE{safe}^ORuser_nameLIKE{safe}')
+        safe = term.replace('^', '') if term else None
+        term_query = f'nameLIKE{safe}^ORuser_nameLIKE{safe}' if safe else None
 
-        user_query = '^'.join(q for q in query_parts if q)
-        if not user_query and not term:
-            # default broad search limited to 20
-            user_query = 'active=true'
+        if member_ids:
+            # Group members: fetch by id in URL-safe chunks (term pushed into each chunk). Each chunk
+            # returns its first `limit` by name, so merging and sorting yields the overall first `limit`;
+            # sorted ids keep the chunks (and the result) identical across processes.
+            users: List[Dict[str, Any]] = []
+            async with aclosing(self.fetch_by_ids('sys_user', sorted(member_ids), fields=sysparm_fields, query=term_query,
+                                                  limit_per_chunk=limit, order_by='name',
+                                                  context='assignable users')) as rows:
+                async for row in rows:
+                    users.append(row)
+            users.sort(key=lambda u: (u.get('name') or '').lower())
+            if refinements is not None:
+                # Every chunk answered under limit_per_chunk, so fewer than limit overall is the full set.
+                refinements.store(scope, term, users, limit)
+            return users[:limit]
 
         params: Dict[str, Any] = {
-            'sysparm_query': user_query,
+            # default broad search limited to `limit`
+            'sysparm_query': term_query or 'active=true',
             'sysparm_limit': str(limit),
-            'sysparm_display_value': 'true'
+            'sysparm_display_value': 'true',
+            **LEAN_READ_PARAMS,
         }
-        if fields and not (len(fields) == 1 and fields[0] == '*'):
-            params['sysparm_fields'] = ','.join(fields)
+        if sysparm_fields is not None:
+            params['sysparm_fields'] = ','.join(sysparm_fields)
 
         try:
-            resp = await self._client.get('/table/sys_user', params=params)
+            resp = await self._get('/table/sys_user', params, site='search assignable users')
             self._handle_redirect(resp, 'search assignable users')
             resp.raise_for_status()
             data = resp.json().get('result', [])
-            return [self._normalize_record(u) for u in data]
+            users = [self._normalize_record(u) for u in data]
+            if refinements is not None:
+                refinements.store(scope, term, users, limit)
+            return users
         except httpx.RequestError as e:
-            logger.error(f"ServiceNow connection error assignable users: {e}")
+            logger.error("ServiceNow connection error assignable users: %s", e)
             raise_gateway_error('Unable to connect to ServiceNow (assignable users)')
         except httpx.HTTPStatusError as e:
-            logger.error(f"ServiceNow HTTP error assignable users: {e.response.status_code} {e.response.text}")
+            logger.error("ServiceNow HTTP error assignable users: %s %s", e.response.status_code, body_preview(e.response))
             raise_gateway_error(f'ServiceNow responded with status {e.response.status_code}')
 
-        inc_list = resp.json().get('result', [])
-        if not inc_list:
-            return []
-        incident = inc_list[0]
+    # ----------------- bulk fetch by sys_id -----------------
+    async def fetch_by_ids(
+        self,
+        table: str,
+        ids: Iterable[str],
+        fields: Optional[List[str]] = None,
+        query: Optional[str] = None,
+        limit_per_chunk: Optional[int] = None,
+        order_by: Optional[str] = None,
+        context: str = 'fetch by ids',
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream normalized rows of `table` whose sys_id is in ids.
+
+        Ids are de-duplicated and split into chunks whose whole encoded query (`sys_idIN`
+        clause, `query` and ORDERBY) stays within FETCH_IDS_MAX_QUERY_CHARS, fetched concurrently (at most FETCH_IDS_CONCURRENCY in
+        flight) and yielded as each chunk completes, de-duplicated by sys_id. `query` is an
+        extra encoded condition ANDed into every chunk. With limit_per_chunk, pass order_by
+        so each chunk returns its first rows in that order rather than arbitrary ones.
+        Remaining chunk requests are cancelled if the consumer stops early (use contextlib.aclosing).
+        """
+        unique = list(dict.fromkeys(i for i in ids if i))
+        if not unique:
+            return
+        if fields is not None and 'sys_id' not in fields:
+            fields = [*fields, 'sys_id']
+        semaphore = asyncio.Semaphore(self.settings.fetch_ids_concurrency)
+
+        async def fetch(chunk: List[str]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self._fetch_id_chunk(table, chunk, fields, query, limit_per_chunk, order_by, context)
+
+        suffix = (len('^' + query) if query else 0) + (len('^ORDERBY' + order_by) if order_by else 0)
+        tasks = [asyncio.ensure_future(fetch(chunk)) for chunk in self._id_chunks(unique, suffix)]
+        seen: set[str] = set()
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for row in await next_done:
+                    sys_id = row.get('sys_id')
+                    if sys_id in seen:
+                        continue
+                    if sys_id:
+                        seen.add(sys_id)
+                    yield row
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _id_chunks(self, ids: List[str], reserved: int = 0) -> List[List[str]]:
+        """Split ids so 'sys_idIN<ids>' plus `reserved` chars (the ANDed query and ORDERBY) fit the budget."""
+        budget = self.settings.fetch_ids_max_query_chars - len('sys_idIN') - reserved
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        used = 0
+        for sys_id in ids:
+            cost = len(sys_id) + (1 if current else 0)  # comma separator
+            if current and used + cost > budget:
+                chunks.append(current)
+                current, used, cost = [], 0, len(sys_id)
+            current.append(sys_id)
+            used += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _fetch_id_chunk(
+        self, table: str, chunk: List[str], fields: Optional[List[str]], query: Optional[str],
+        limit_per_chunk: Optional[int], order_by: Optional[str], context: str,
+    ) -> List[Dict[str, Any]]:
+        encoded = 'sys_idIN' + ','.join(chunk)
+        if query:
+            encoded += '^' + query
+        if order_by:
+            encoded += '^ORDERBY' + order_by
+        params: Dict[str, Any] = {
+            'sysparm_query': encoded,
+            'sysparm_limit': str(min(len(chunk), limit_per_chunk or len(chunk))),
+            'sysparm_display_value': 'true',
+            **LEAN_READ_PARAMS,
+        }
+        if fields is not None:
+            params['sysparm_fields'] = ','.join(fields)
+        try:
+            resp = await self._get(f'/table/{table}', params, site=f'{table} by ids')
+            self._handle_redirect(resp, context)
+            resp.raise_for_status()
+            return [self._normalize_record(r) for r in resp.json().get('result', [])]
+        except httpx.RequestError as e:
+            logger.error("ServiceNow connection error %s: %s", context, e)
+            raise_gateway_error(f'Unable to connect to ServiceNow ({context})')
+        except httpx.HTTPStatusError as e:
+            logger.error("ServiceNow HTTP error %s: %s %s", context, e.response.status_code, body_preview(e.response))
+            raise_gateway_error(f'ServiceNow responded with status {e.response.status_code}')
 
-        user_ids: set[str] = set()
+    # ----------------- analytics (keyset-paged scans) -----------------
+    async def iter_incident_pages(self, query: Optional[str], fields: List[str], page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield raw (non display-value) incident rows page by page, keyset-paged on sys_id.
 
-        def add_value(val: Any):
-            if not val:
+        Every page asks for `sys_id > last seen` (added to each ^NQ branch of query) ordered by
+        sys_id, so page 50 costs the instance the same as page 1, unlike sysparm_offset.
+        """
+        if 'sys_id' not in fields:
+            fields = ['sys_id', *fields]
+        branches = query.split('^NQ') if query else ['']
+        last = ''
+        while True:
+            keyset = f'sys_id>{last}' if last else ''
+            encoded = '^NQ'.join('^'.join(part for part in (branch, keyset) if part) for branch in branches)
+            params: Dict[str, Any] = {
+                'sysparm_query': f'{encoded}^ORDERBYsys_id' if encoded else 'ORDERBYsys_id',
+                'sysparm_limit': str(page_size),
+                'sysparm_fields': ','.join(fields),
+                **LEAN_READ_PARAMS,
+            }
+            try:
+                resp = await self._get('/table/incident', params, site='incident analytics page')
+                self._handle_redirect(resp, "incident analytics")
+                resp.raise_for_status()
+                rows = resp.json().get('result', [])
+            except httpx.RequestError as e:
+                logger.error("ServiceNow connection error incident analytics: %s", e)
+                raise_gateway_error("Unable to connect to ServiceNow (incident analytics)")
+            except httpx.HTTPStatusError as e:
+                logger.error("ServiceNow HTTP error incident analytics: %s %s", e.response.status_code, body_preview(e.response))
+                raise_gateway_error(f"ServiceNow responded with status {e.response.status_code}")
+            if rows:
+                yield rows
+            if len(rows) < page_size:
                 return
-            if isinstance(val, dict):
-                vid = val.get('value')
-                if vid:
-                    user_ids.add(vid)
-            elif isinstance(val, str):
-                if ',' in val:
-                    for part in val.split(','):
-                        p = part.strip()
-                        if p:
-                            user_ids.add(p)
-                else:
-                    # heuristic: sys_ids are 32 char hex normally
-                    if len(val) >= 32:
-                        user_ids.add(val)
+            last = rows[-1]['sys_id']
+
+    # A full scan can take far longer than CACHE_FILL_LEASE; it is bounded by the route's deadline instead.
+    @cached_read("analytics", "cache_ttl_analytics", lease_setting="request_timeout_max")
+    async def incident_analytics(self, query: Optional[str] = None, window_days: int = 30) -> Dict[str, Any]:
+        """Aging buckets, MTTR and backlog by group over open + recently resolved incidents."""
+        from . import analytics  # numpy is loaded on first use, not at startup
+
+        pages = self.iter_incident_pages(
+            analytics.window_query(query, window_days), analytics.ANALYTICS_FIELDS, self.settings.analytics_page_size
+        )
+        # A full scan is many sequential pages: yield to interactive traffic page by page.
+        with priority(BULK):
+            async with aclosing(pages):
+                columns = await analytics.load_columns(pages, self.settings.analytics_max_incidents)
+        return analytics.summarize(columns, window_days)
+
+    # ----------------- reference lists (startup preload) -----------------
+    @cached_read("directory", "cache_ttl_directory")
+    async def list_locations(self, limit: int = 500, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """List cmn_location rows ordered by name (defaults to sys_id,name)."""
+        return await self._list_table('cmn_location', 'list locations', limit, fields or ['sys_id', 'name'])
+
+    @cached_read("directory", "cache_ttl_directory")
+    async def list_groups(self, limit: int = 500, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """List active sys_user_group rows ordered by name (defaults to sys_id,name)."""
+        return await self._list_table('sys_user_group', 'list groups', limit, fields or ['sys_id', 'name'], query='active=true')
+
+    async def _list_table(self, table: str, context: str, limit: int, fields: List[str], query: str = '') -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {
+            'sysparm_query': f'{query}^ORDERBYname' if query else 'ORDERBYname',
+            'sysparm_limit': str(limit),
+            'sysparm_fields': ','.join(fields),
+            'sysparm_display_value': 'true',
+            **LEAN_READ_PARAMS,
+        }
+        try:
+            resp = await self._get(f'/table/{table}', params, site=f'list {table}')
+            self._handle_redirect(resp, context)
+            resp.raise_for_status()
+            return [self._normalize_record(r) for r in resp.json().get('result', [])]
+        except httpx.RequestError as e:
+            logger.error("ServiceNow connection error %s: %s", context, e)
+            raise_gateway_error(f"Unable to connect to ServiceNow ({context})")
+        except httpx.HTTPStatusError as e:
+            logger.error("ServiceNow HTTP error %s: %s %s", context, e.response.status_code, body_preview(e.response))
+            raise_gateway_error(f"ServiceNow responded with status {e.response.status_code}")
 
     # ----------------- internal helpers -----------------
     def _normalize_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
@@ -351,6 +664,7 @@ class ServiceNowClient:
         return flattened
 
     # ----------------- affected users (pattern 1) -----------------
+    @cached_read("incidents", "cache_ttl_incidents")
     async def get_incident_affected_users(
         self,
         number: str,
@@ -364,7 +678,8 @@ class ServiceNowClient:
         2. Collect sys_ids from predefined fields (single reference or comma-separated multi lists)
         3. Query sys_user for those sys_ids (optionally restricted by user_fields)
 
-        If user_fields is None or ['*'] -> no sysparm_fields filter (all fields returned by instance defaults).
+        If user_fields is None -> only the User model fields are requested.
+        If user_fields is ['*'] -> no sysparm_fields filter (all fields returned by instance defaults).
         """
         incident_field_candidates = include_fields or [
             'sys_id',
@@ -383,10 +698,11 @@ class ServiceNowClient:
             'sysparm_query': f'number={number}',
             'sysparm_limit': '1',
             'sysparm_fields': ','.join(incident_field_candidates),
-            'sysparm_display_value': 'false'
+            'sysparm_display_value': 'false',
+            **LEAN_READ_PARAMS,
         }
         try:
-            resp = await self._client.get('/table/incident', params=params)
+            resp = await self._get('/table/incident', params, site='get incident')
             self._handle_redirect(resp, f'get incident (affected users) {number}')
             resp.raise_for_status()
         except httpx.RequestError:
@@ -431,23 +747,12 @@ class ServiceNowClient:
         if not user_ids:
             return []
 
-        user_params: Dict[str, Any] = {
-            'sysparm_query': 'sys_idIN' + ','.join(sorted(user_ids)),
-            'sysparm_display_value': 'true'
-        }
-        if user_fields and not (len(user_fields) == 1 and user_fields[0] == '*'):
-            user_params['sysparm_fields'] = ','.join(user_fields)
-
-        try:
-            u_resp = await self._client.get('/table/sys_user', params=user_params)
-            self._handle_redirect(u_resp, f'get affected users for {number}')
-            u_resp.raise_for_status()
-            user_data = u_resp.json().get('result', [])
-            return [self._normalize_record(u) for u in user_data]
-        except httpx.RequestError:
-            raise_gateway_error('Unable to connect to ServiceNow (affected users - user fetch)')
-        except httpx.HTTPStatusError as e:
-            raise_gateway_error(f'ServiceNow responded with status {e.response.status_code}')
+        by_id: Dict[str, Dict[str, Any]] = {}
+        async with aclosing(self.fetch_by_ids('sys_user', user_ids, fields=model_fields_for(User, user_fields), context=f'affected users for {number}')) as rows:
+            async for row in rows:
+                by_id[row.get('sys_id', '')] = row
+        # Stable output order regardless of which chunk answered first
+        return [by_id[k] for k in sorted(by_id)]
 
 # Dependency for FastAPI
 _client_instance: ServiceNowClient | None = None
@@ -0,0 +1,472 @@
+"""Upstream traffic capture and deterministic replay at the httpx transport layer.
+
+* `RecordingTransport` (UPSTREAM_RECORD_PATH) wraps the real transport. It writes every
+  ServiceNow request/response pair to a gzip JSON-lines archive, along with the offset
+  from the start of recording and the time until the body was fully received. Request
+  headers are never stored, query values of credential-looking parameters are masked,
+  and `Set-Cookie` and friends are dropped from responses. Bodies are stored decoded:
+  gzip over the whole archive compresses JSON far better than per-response codings.
+  Serialization and disk I/O happen on a writer thread.
+* `ReplayTransport` (UPSTREAM_REPLAY_PATH) answers from an archive without touching the
+  network. A request matches on method, path below the API base, sorted query and
+  body. Identical requests are served in recorded order, and the last one repeats once
+  they run out. Each answer is delayed by its recorded time × UPSTREAM_REPLAY_LATENCY_SCALE.
+  Recorded transport errors (timeouts, resets) are raised again. An unmatched request
+  raises `httpx.ConnectError`, like an unreachable upstream.
+
+* `RouteRecordMiddleware` (added with UPSTREAM_RECORD_PATH) writes one entry per inbound
+  API request to the same archive: the concrete request (method, path, query, body and
+  the headers that change its handling), its route template, status and duration. The
+  route latency is what shows a change in a new build: under replay, upstream timings
+  are only the injected sleeps.
+
+Only one process writes an archive: the first to take an exclusive flock on it. Other
+uvicorn workers sharing UPSTREAM_RECORD_PATH record nothing, so with N workers the
+archive holds one worker's share of the traffic (run a single worker for all of it).
+
+`python -m app.services.traffic drive ARCHIVE URL [SPEED]` re-sends the recorded API
+requests to a running build at their recorded offsets. Setting both paths records a
+replayed run. `python -m app.services.traffic a.jsonl.gz b.jsonl.gz` compares API route
+latency and upstream call counts between two archives.
+"""
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+import asyncio
+import atexit
+import base64
+import gzip
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+import httpx
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .payload import endpoint_label
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so run a single worker when UPSTREAM_RECORD_PATH is set
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = 'servicenow-traffic'
+ARCHIVE_VERSION = 1
+ROUTE = 'route'  # `kind` of inbound API request entries; upstream entries carry no kind
+
+# Response headers never written to an archive (credentials), or meaningless once the body is stored decoded.
+_DROPPED_HEADERS = frozenset({
+    'set-cookie', 'authorization', 'proxy-authorization', 'www-authenticate', 'x-usertoken',
+    'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive',
+})
+_SECRET_PARAM = re.compile(r'pass|secret|token|api_?key', re.IGNORECASE)
+# Inbound request headers kept on route entries: the ones that change how the API handles a request.
+_ROUTE_HEADERS = ('content-type', 'x-request-timeout')
+
+
+def _relative_path(request: httpx.Request, base_path: str) -> str:
+    path = request.url.path
+    return path[len(base_path):] if base_path and path.startswith(base_path) else path
+
+
+def _masked(params: List[Tuple[str, str]]) -> str:
+    return urlencode([(key, '***' if _SECRET_PARAM.search(key) else value) for key, value in params])
+
+
+def _query(request: httpx.Request) -> str:
+    return _masked(sorted(request.url.params.multi_items()))
+
+
+def request_key(method: str, path: str, query: str, body: Optional[str]) -> Tuple[str, str, str, str]:
+    return method, path, query, body or ''
+
+
+class TrafficStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.record_path: Optional[str] = None
+            self.replay_path: Optional[str] = None
+            self.counts: Dict[str, int] = {'recorded': 0, 'dropped': 0, 'replayed': 0, 'repeated': 0, 'misses': 0}
+            self.by_endpoint: Dict[str, int] = {}
+
+    def add(self, counter: str, endpoint: Optional[str] = None):
+        with self._lock:
+            self.counts[counter] += 1
+            if endpoint is not None:
+                self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            modes = [mode for mode, path in (('record', self.record_path), ('replay', self.replay_path)) if path]
+            return {
+                'mode': '+'.join(modes) or 'off',
+                'record_path': self.record_path,
+                'replay_path': self.replay_path,
+                **self.counts,
+                'endpoints': dict(self.by_endpoint),
+            }
+
+
+traffic_stats = TrafficStats()
+
+
+class ArchiveWriter:
+    """Append-only gzip JSONL archive written by a daemon thread; close() flushes (also at exit).
+
+    Raises OSError when another process holds the archive's lock.
+    """
+
+    def __init__(self, path: str, base_path: str):
+        self.path = path
+        self.started = time.monotonic()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = False
+        header = {'format': ARCHIVE_FORMAT, 'version': ARCHIVE_VERSION, 'base_path': base_path, 'started_at': time.time()}
+        # Lock before truncating, so a second worker cannot wipe the archive being written.
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                raise
+        os.ftruncate(fd, 0)
+        self._raw = os.fdopen(fd, 'wb')
+        self._file = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._file.write(orjson.dumps(header) + b'\n')
+        self._thread = threading.Thread(target=self._run, name='traffic-archive', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, entry: Dict[str, Any]):
+        if self._closed:
+            traffic_stats.add('dropped')
+            return
+        self._queue.put(entry)
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            self._file.write(orjson.dumps(entry) + b'\n')
+        self._file.close()
+        self._raw.close()  # releases the lock
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+
+_writers: Dict[str, Optional[ArchiveWriter]] = {}
+
+
+def get_archive_writer(path: str, base_path: str) -> Optional[ArchiveWriter]:
+    """The open writer for path, shared by the client transport and the route middleware.
+
+    None when another process (worker) is recording to path.
+    """
+    if path not in _writers:
+        try:
+            _writers[path] = ArchiveWriter(path, base_path)
+        except OSError:
+            logger.info("Traffic archive %s is being recorded by another worker; not recording here", path)
+            _writers[path] = None
+    return _writers[path]
+
+
+def read_archive(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Header and entries of an archive; a capture cut off by a crash reads up to the damage."""
+    fh = gzip.open(path, 'rb')
+    header = orjson.loads(fh.readline())
+    if header.get('format') != ARCHIVE_FORMAT:
+        fh.close()
+        raise ValueError(f"{path} is not a {ARCHIVE_FORMAT} archive")
+
+    def entries() -> Iterator[Dict[str, Any]]:
+        with fh:
+            try:
+                for line in fh:
+                    yield orjson.loads(line)
+            except (EOFError, gzip.BadGzipFile, orjson.JSONDecodeError):
+                return
+
+    return header, entries()
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, writer: ArchiveWriter, base_path: str):
+        self.inner = inner
+        self.writer = writer
+        self.base_path = base_path
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        entry: Dict[str, Any] = {
+            't': round(time.monotonic() - self.writer.started, 6),
+            'endpoint': endpoint_label(request, self.base_path),
+            'method': request.method,
+            'path': _relative_path(request, self.base_path),
+            'query': _query(request),
+            'request_body': body.decode('utf-8', errors='replace') if body else None,
+        }
+        started = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+            try:
+                # The transport-level stream holds the undecoded bytes (MockTransport hands back read responses).
+                raw = b''.join([chunk async for chunk in response.stream])
+            finally:
+                await response.aclose()
+        except httpx.TransportError as e:
+            entry.update(elapsed=round(time.perf_counter() - started, 6), error=e.__class__.__name__, message=str(e))
+            self._write(entry)
+            raise
+        entry['elapsed'] = round(time.perf_counter() - started, 6)
+        entry['status'] = response.status_code
+        entry['headers'] = [[k, v] for k, v in response.headers.multi_items() if k.lower() not in _DROPPED_HEADERS]
+        entry['wire_bytes'] = len(raw)
+        try:
+            decoded = httpx.Response(200, headers=response.headers, content=raw).content
+        except httpx.DecodingError:
+            decoded = raw
+            entry['headers'].append(['content-encoding', response.headers.get('content-encoding', '')])
+        try:
+            entry['body'] = decoded.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_b64'] = base64.b64encode(decoded).decode('ascii')
+        self._write(entry)
+        # The client gets the bytes as they came off the wire, so decoding and payload stats are unchanged.
+        return httpx.Response(response.status_code, headers=response.headers, content=raw, extensions=response.extensions)
+
+    def _write(self, entry: Dict[str, Any]):
+        self.writer.write(entry)
+        traffic_stats.add('recorded', entry['endpoint'])
+
+    async def aclose(self):
+        await self.inner.aclose()
+        self.writer.close()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, entries: List[Dict[str, Any]], base_path: str, latency_scale: float = 1.0):
+        self.base_path = base_path
+        self.latency_scale = max(0.0, latency_scale)
+        self._recorded: Dict[Tuple[str, str, str, str], Deque[Dict[str, Any]]] = defaultdict(deque)
+        for entry in entries:
+            if entry.get('kind') == ROUTE:
+                continue
+            key = request_key(entry['method'], entry['path'], entry['query'], entry.get('request_body'))
+            self._recorded[key].append(entry)
+
+    @classmethod
+    def from_archive(cls, path: str, base_path: str, latency_scale: float = 1.0) -> 'ReplayTransport':
+        _, entries = read_archive(path)
+        return cls(list(entries), base_path, latency_scale)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        key = request_key(
+            request.method, _relative_path(request, self.base_path), _query(request),
+            body.decode('utf-8', errors='replace') if body else None,
+        )
+        endpoint = endpoint_label(request, self.base_path)
+        recorded = self._recorded.get(key)
+        if not recorded:
+            traffic_stats.add('misses', endpoint)
+            raise httpx.ConnectError(f"No recorded response for {request.method} {request.url}", request=request)
+        if len(recorded) > 1:
+            entry = recorded.popleft()
+            traffic_stats.add('replayed', endpoint)
+        else:
+            entry = recorded[0]
+            traffic_stats.add('repeated', endpoint)
+        if self.latency_scale:
+            await asyncio.sleep(entry['elapsed'] * self.latency_scale)
+        if 'error' in entry:
+            error = getattr(httpx, entry['error'], None)
+            if not (isinstance(error, type) and issubclass(error, httpx.TransportError)):
+                error = httpx.TransportError
+            raise error(entry.get('message') or entry['error'], request=request)
+        content = base64.b64decode(entry['body_b64']) if 'body_b64' in entry else entry['body'].encode('utf-8')
+        return httpx.Response(entry['status'], headers=entry['headers'], content=content)
+
+
+def build_transport(settings, limits: httpx.Limits) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for ServiceNowClient per the UPSTREAM_RECORD/REPLAY settings (None = httpx default)."""
+    if not settings.upstream_record_path and not settings.upstream_replay_path:
+        return None
+    base_path = httpx.URL(settings.base_url).path
+    transport: Optional[httpx.AsyncBaseTransport] = None
+    if settings.upstream_replay_path:
+        transport = ReplayTransport.from_archive(settings.upstream_replay_path, base_path, settings.upstream_replay_latency_scale)
+        traffic_stats.replay_path = settings.upstream_replay_path
+    writer = get_archive_writer(settings.upstream_record_path, base_path) if settings.upstream_record_path else None
+    if writer is not None:
+        inner = transport or httpx.AsyncHTTPTransport(limits=limits)
+        transport = RecordingTransport(inner, writer, base_path)
+        traffic_stats.record_path = settings.upstream_record_path
+    return transport
+
+
+class RouteRecordMiddleware:
+    """Write every API request (concrete request, route template, status, duration) to the archive at path."""
+
+    def __init__(self, app: ASGIApp, path: str, base_path: str):
+        self.app = app
+        self.path = path
+        self.base_path = base_path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        writer = get_archive_writer(self.path, self.base_path) if scope['type'] == 'http' else None
+        if writer is None:
+            await self.app(scope, receive, send)
+            return
+        offset = time.monotonic() - writer.started
+        started = time.perf_counter()
+        status = 500
+        body = bytearray()
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message['type'] == 'http.request':
+                body.extend(message.get('body', b''))
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            route = scope.get('route')
+            headers = {key.decode('latin-1'): value.decode('latin-1') for key, value in scope['headers']}
+            writer.write({
+                'kind': ROUTE,
+                't': round(offset, 6),
+                'endpoint': f"{scope['method']} {getattr(route, 'path', scope['path'])}",
+                'method': scope['method'],
+                'path': scope['path'],
+                'query': _masked(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True)),
+                'request_body': body.decode('utf-8', errors='replace') if body else None,
+                'request_headers': {key: headers[key] for key in _ROUTE_HEADERS if key in headers},
+                'status': status,
+                'elapsed': round(time.perf_counter() - started, 6),
+            })
+
+
+async def drive(path: str, base_url: str, speed: float = 1.0,
+                transport: Optional[httpx.AsyncBaseTransport] = None) -> Dict[str, int]:
+    """Re-send an archive's recorded API requests to base_url; returns response counts by status.
+
+    Each request goes out at its recorded offset divided by speed (0 sends them all at
+    once), concurrently, as the original clients did.
+    """
+    _, entries = read_archive(path)
+    requests = sorted((entry for entry in entries if entry.get('kind') == ROUTE and 'method' in entry),
+                      key=lambda entry: entry['t'])
+    outcomes: Dict[str, int] = defaultdict(int)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, transport=transport) as client:
+        async def send(entry: Dict[str, Any]):
+            url = entry['path'] + (f"?{entry['query']}" if entry['query'] else '')
+            body = entry['request_body'].encode('utf-8') if entry['request_body'] is not None else None
+            try:
+                resp = await client.request(entry['method'], url, content=body, headers=entry['request_headers'])
+                outcomes[str(resp.status_code)] += 1
+            except httpx.HTTPError as e:
+                outcomes[e.__class__.__name__] += 1
+
+        started = time.monotonic()
+        tasks = []
+        for entry in requests:
+            if speed > 0:
+                await asyncio.sleep(max(0.0, entry['t'] / speed - (time.monotonic() - started)))
+            tasks.append(asyncio.ensure_future(send(entry)))
+        await asyncio.gather(*tasks)
+    return dict(outcomes)
+
+
+# ---- offline comparison ----
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize_archive(path: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Per API route and per upstream endpoint: calls, errors (5xx / transport) and p50/p95 duration."""
+    elapsed: Dict[str, Dict[str, List[float]]] = {ROUTE: defaultdict(list), 'upstream': defaultdict(list)}
+    errors: Dict[str, Dict[str, int]] = {ROUTE: defaultdict(int), 'upstream': defaultdict(int)}
+    _, entries = read_archive(path)
+    for entry in entries:
+        kind = ROUTE if entry.get('kind') == ROUTE else 'upstream'
+        elapsed[kind][entry['endpoint']].append(entry['elapsed'])
+        errors[kind][entry['endpoint']] += 'error' in entry or entry.get('status', 200) >= 500
+    return {
+        'routes' if kind == ROUTE else kind: {
+            endpoint: {
+                'calls': len(values),
+                'errors': errors[kind][endpoint],
+                'p50_ms': round(_percentile(values, 0.5) * 1000, 1),
+                'p95_ms': round(_percentile(values, 0.95) * 1000, 1),
+            }
+            for endpoint, values in sorted(by_endpoint.items())
+        }
+        for kind, by_endpoint in elapsed.items()
+    }
+
+
+def _print_table(title: str, summaries: List[Dict[str, Dict[str, Any]]]):
+    empty = {'calls': 0, 'errors': 0, 'p50_ms': None, 'p95_ms': None}
+    columns = ['calls', 'errors', 'p50_ms', 'p95_ms']
+    header = [title] + [f"{col}[{i}]" for i in range(len(summaries)) for col in columns]
+    if len(summaries) == 2:
+        header += ['calls_delta', 'p50_delta_ms', 'p95_delta_ms']
+    print('\t'.join(header))
+    for endpoint in sorted(set().union(*summaries)):
+        rows = [summary.get(endpoint, empty) for summary in summaries]
+        cells = [endpoint] + [str(row[col]) if row[col] is not None else '-' for row in rows for col in columns]
+        if len(rows) == 2:
+            cells.append(f"{rows[1]['calls'] - rows[0]['calls']:+d}")
+            for col in ('p50_ms', 'p95_ms'):
+                both = rows[0][col] is not None and rows[1][col] is not None
+                cells.append(f"{rows[1][col] - rows[0][col]:+.1f}" if both else '-')
+        print('\t'.join(cells))
+
+
+def main(argv: List[str]) -> int:
+    if argv[:1] == ['drive'] and len(argv) in (3, 4):
+        outcomes = asyncio.run(drive(argv[1], argv[2], float(argv[3]) if len(argv) == 4 else 1.0))
+        print('\t'.join(f"{outcome}={count}" for outcome, count in sorted(outcomes.items())))
+        return 0
+    if len(argv) not in (1, 2) or argv[0] == 'drive':
+        print("usage: python -m app.services.traffic ARCHIVE [OTHER_ARCHIVE]\n"
+              "       python -m app.services.traffic drive ARCHIVE URL [SPEED]", file=sys.stderr)
+        return 2
+    summaries = [summarize_archive(path) for path in argv]
+    _print_table('route', [summary['routes'] for summary in summaries])
+    print()
+    _print_table('upstream', [summary['upstream'] for summary in summaries])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,104 @@
+"""Startup warm-up pipeline and readiness state.
+
+`/health` is liveness only. `/ready` reports ready once `run_warmup` has built the
+ServiceNow client, opened the configured number of pooled connections and run any
+preloads (STARTUP_PRELOAD), so the first real requests after a deploy hit a warm
+pool and cache. Each phase is timed and logged.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from ..core.config import get_settings
+from .scheduler import BACKGROUND, priority
+from .servicenow_client import ServiceNowClient, get_client
+
+logger = logging.getLogger(__name__)
+
+# Preload targets selectable via STARTUP_PRELOAD
+PRELOADERS: Dict[str, Callable[[ServiceNowClient], Awaitable[Any]]] = {
+    'counts': lambda client: client.get_dashboard_counts(),
+    'locations': lambda client: client.list_locations(),
+    'groups': lambda client: client.list_groups(),
+}
+
+
+class ReadinessState:
+    def __init__(self):
+        self.ready = False
+        self.status = 'starting'
+        self.phases: Dict[str, float] = {}  # phase -> milliseconds
+        self.warm_connections = 0
+        self.errors: List[str] = []
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'ready': self.ready,
+            'phases_ms': self.phases,
+            'warm_connections': self.warm_connections,
+            'errors': self.errors,
+        }
+
+
+readiness = ReadinessState()
+
+
+async def _phase(name: str, func: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+    started = time.perf_counter()
+    try:
+        return await func()
+    except Exception as e:  # warm-up is best effort; record and carry on
+        readiness.errors.append(f"{name}: {e}")
+        logger.warning("Startup phase %s failed: %s", name, e)
+        return None
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        readiness.phases[name] = round(elapsed, 1)
+        logger.info("Startup phase %s took %.1f ms", name, elapsed)
+
+
+async def run_warmup():
+    """Warm the client, connection pool and caches, then flip readiness.
+
+    Readiness turns true even if upstream probes fail (status `degraded`): the app can
+    still serve, and blocking readiness on ServiceNow would take every replica out
+    of rotation during an upstream outage.
+    """
+    settings = get_settings()
+    started = time.perf_counter()
+    if settings.servicENow_instance.startswith("yourinstance"):
+        readiness.status, readiness.ready = 'ready', True
+        logger.info("Skipping ServiceNow warm-up: placeholder instance configured")
+        return
+
+    async def pipeline():
+        client = await _phase('client', get_client)
+        if client is None:
+            return
+        if settings.startup_warm_connections > 0:
+            warmed = await _phase('connections', lambda: client.warm_up(settings.startup_warm_connections))
+            readiness.warm_connections = warmed or 0
+            if readiness.warm_connections < settings.startup_warm_connections:
+                readiness.errors.append(
+                    f"connections: {readiness.warm_connections}/{settings.startup_warm_connections} probes succeeded"
+                )
+        preload = [p for p in settings.get_startup_preload() if p in PRELOADERS]
+        unknown = set(settings.get_startup_preload()) - set(PRELOADERS)
+        if unknown:
+            logger.warning("Ignoring unknown STARTUP_PRELOAD entries: %s", ', '.join(sorted(unknown)))
+        if preload:
+            # Preloads must not crowd out the first interactive requests arriving while they run.
+            with priority(BACKGROUND):
+                await asyncio.gather(*(_phase(f'preload_{name}', lambda name=name: PRELOADERS[name](client)) for name in preload))
+
+    try:
+        await asyncio.wait_for(pipeline(), timeout=settings.startup_warmup_timeout)
+    except asyncio.TimeoutError:
+        readiness.errors.append(f"warm-up exceeded {settings.startup_warmup_timeout}s")
+        logger.warning("Startup warm-up timed out after %.1f s; marking ready", settings.startup_warmup_timeout)
+    readiness.phases['total'] = round((time.perf_counter() - started) * 1000, 1)
+    readiness.status = 'degraded' if readiness.errors else 'ready'
+    readiness.ready = True
+    logger.info("Startup warm-up finished in %.1f ms (status=%s)", readiness.phases['total'], readiness.status)
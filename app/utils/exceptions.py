@@ -1,12 +1,28 @@
 from fastapi import HTTPException, status
 
+from ..core import deadline
+
 class ServiceNowConnectionError(Exception):
     """Raised when connection to ServiceNow fails (DNS, timeout, network)."""
     def __init__(self, message: str):
         super().__init__(message)
         self.message = message
 
+def raise_deadline_exceeded(msg: str):
+    raise HTTPException(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        detail={"error": "DeadlineExceeded", "message": msg}
+    )
+
+def is_deadline_exceeded(exc: BaseException) -> bool:
+    """True for the 504 raised by raise_deadline_exceeded (directly or via raise_gateway_error)."""
+    return (isinstance(exc, HTTPException) and exc.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+            and isinstance(exc.detail, dict) and exc.detail.get("error") == "DeadlineExceeded")
+
 def raise_gateway_error(msg: str):
+    # An upstream failure after the request's deadline has passed is a timeout, whatever httpx called it.
+    if deadline.expired():
+        raise_deadline_exceeded(f"Request deadline exceeded: {msg}")
     raise HTTPException(
         status_code=status.HTTP_502_BAD_GATEWAY,
         detail={"error": "ServiceNowConnection", "message": msg}
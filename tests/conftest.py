@@ -0,0 +1,40 @@
+import asyncio
+import httpx
+import pytest
+from app.services import servicenow_client
+from app.services.cache import MemoryCache, TieredCache
+from app.services.servicenow_client import ServiceNowClient
+from app.services.traffic import RecordingTransport
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    """Factory for a ServiceNowClient whose upstream is `handler` (an httpx.MockTransport handler).
+
+    The client is built normally (auth, headers, payload hook, scheduler, hedger) with only the
+    transport swapped, and gets a private memory cache. With UPSTREAM_RECORD_PATH set the
+    recording transport wraps the handler. Clients are closed at teardown.
+    """
+    build_transport = servicenow_client.build_transport
+    clients = []
+
+    def make(handler) -> ServiceNowClient:
+        mock = httpx.MockTransport(handler)
+
+        def transport(settings, limits):
+            built = build_transport(settings, limits)
+            if isinstance(built, RecordingTransport):
+                built.inner = mock
+                return built
+            return mock
+
+        monkeypatch.setattr(servicenow_client, 'build_transport', transport)
+        client = ServiceNowClient()
+        client._cache = TieredCache([MemoryCache()])
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        if not client._client.is_closed:
+            asyncio.run(client.close())
@@ -0,0 +1,122 @@
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+import httpx
+from app.services import analytics
+
+NOW = datetime(2024, 6, 30, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _ts(days_ago: float) -> str:
+    return (NOW - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _rows():
+    return [
+        # open incidents
+        {'opened_at': _ts(0.5), 'resolved_at': '', 'active': 'true', 'priority': '1', 'assignment_group.name': 'Network'},
+        {'opened_at': _ts(2), 'resolved_at': '', 'active': 'true', 'priority': '3', 'assignment_group.name': 'Network'},
+        {'opened_at': _ts(40), 'resolved_at': '', 'active': 'true', 'priority': '4', 'assignment_group.name': ''},
+        # resolved inside the window: 10 h and 30 h
+        {'opened_at': _ts(3), 'resolved_at': _ts(3 - 10 / 24), 'active': 'true', 'priority': '2', 'assignment_group.name': 'Service Desk'},
+        {'opened_at': _ts(6), 'resolved_at': _ts(6 - 30 / 24), 'active': 'false', 'priority': '2', 'assignment_group.name': 'Service Desk'},
+        # resolved before the window: ignored for MTTR
+        {'opened_at': _ts(90), 'resolved_at': _ts(80), 'active': 'false', 'priority': '2', 'assignment_group.name': 'Network'},
+    ]
+
+
+def test_summarize_aging_mttr_and_backlog():
+    columns = analytics.IncidentColumns()
+    rows = _rows()
+    columns.add_page(rows[:4])
+    columns.add_page(rows[4:])
+    result = analytics.summarize(columns, window_days=30, now=NOW)
+    assert result['incidents_scanned'] == 6 and result['open'] == 3
+    aging = {b['bucket']: b for b in result['aging']}
+    assert aging['<1d']['count'] == 1 and aging['<1d']['by_priority'] == {'1': 1}
+    assert aging['1-3d']['count'] == 1 and aging['>30d']['count'] == 1
+    assert result['mttr']['resolved'] == 2
+    assert result['mttr']['mean_hours'] == 20.0
+    assert result['mttr']['by_priority'] == {'2': 20.0}
+    backlog = result['backlog_by_group']
+    assert [g['group'] for g in backlog] == ['Network', analytics.UNASSIGNED_GROUP]
+    assert backlog[0]['open'] == 2 and backlog[0]['p1'] == 1 and backlog[0]['oldest_age_days'] == 2.0
+
+
+def test_empty_scan():
+    result = analytics.summarize(analytics.IncidentColumns(), window_days=7, now=NOW)
+    assert result['open'] == 0 and result['mttr']['mean_hours'] is None and result['backlog_by_group'] == []
+
+
+def _client(make_client, records, monkeypatch, page_size, max_incidents):
+    queries = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        query = request.url.params['sysparm_query']
+        queries.append(query)
+        limit = int(request.url.params['sysparm_limit'])
+        after = re.search(r'sys_id>(\w+)', query)
+        page = [r for r in records if not after or r['sys_id'] > after.group(1)][:limit]
+        return httpx.Response(200, json={'result': page})
+
+    client = make_client(handler)
+    monkeypatch.setattr(client.settings, 'analytics_page_size', page_size)
+    monkeypatch.setattr(client.settings, 'analytics_max_incidents', max_incidents)
+    return client, queries
+
+
+def test_keyset_scan_pages_through_all_incidents(make_client, monkeypatch):
+    records = [
+        {'sys_id': f'{i:032x}', 'opened_at': _ts(i % 45), 'resolved_at': '', 'active': 'true',
+         'priority': str(1 + i % 5), 'assignment_group.name': f'Group {i % 7}'}
+        for i in range(2500)
+    ]
+    client, queries = _client(make_client, records, monkeypatch, page_size=1000, max_incidents=100000)
+
+    async def main():
+        first = await client.incident_analytics(query='category=network', window_days=30)
+        again = await client.incident_analytics(query='category=network', window_days=30)
+        await client.close()
+        return first, again
+
+    result, cached = asyncio.run(main())
+    assert result['incidents_scanned'] == 2500 and not result['truncated']
+    assert sum(g['open'] for g in result['backlog_by_group']) == 2500
+    assert len(queries) == 3  # 1000 + 1000 + 500; the second call was served from cache
+    assert cached == result
+    # keyset condition goes into both ^NQ branches, and the caller's query is ANDed onto both
+    branches = queries[1].removesuffix('^ORDERBYsys_id').split('^NQ')
+    assert all(b.startswith('category=network^') and f'sys_id>{999:032x}' in b for b in branches)
+
+
+def test_scan_stops_at_row_cap(make_client, monkeypatch):
+    records = [
+        {'sys_id': f'{i:032x}', 'opened_at': _ts(1), 'resolved_at': '', 'active': 'true',
+         'priority': '3', 'assignment_group.name': 'Network'}
+        for i in range(3000)
+    ]
+    client, queries = _client(make_client, records, monkeypatch, page_size=1000, max_incidents=1500)
+
+    async def main():
+        result = await client.incident_analytics(window_days=7)
+        await client.close()
+        return result
+
+    result = asyncio.run(main())
+    assert result['incidents_scanned'] == 1500 and result['truncated']
+    assert len(queries) == 2
+
+
+def test_row_cap_flags_truncation_only_when_rows_are_left_out():
+    async def load(pages, max_rows):
+        async def gen():
+            for page in pages:
+                yield page
+        return await analytics.load_columns(gen(), max_rows)
+
+    rows = _rows()[:3]
+    exact = asyncio.run(load([rows], 3))
+    assert len(exact) == 3 and not exact.truncated
+    full_then_more = asyncio.run(load([rows, rows[:1]], 3))
+    assert len(full_then_more) == 3 and full_then_more.truncated
+    assert asyncio.run(load([rows + rows[:1]], 3)).truncated
@@ -0,0 +1,79 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.servicenow_client import ServiceNowClient, get_client
+from app.utils.exceptions import raise_deadline_exceeded
+from app.services.resolution_cache import get_incident_sys_id_cache, get_assignee_cache
+import pytest
+
+INCIDENT_SYS_ID = "0123456789abcdef0123456789abcdef"
+USER_SYS_ID = "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"
+
+class CountingClient(ServiceNowClient):  # type: ignore
+    def __init__(self):
+        self.calls: list[str] = []
+
+    async def get_incident(self, number: str, fields=None):  # type: ignore
+        self.calls.append('get_incident')
+        return {"sys_id": INCIDENT_SYS_ID, "number": number} if number == 'INC0000042' else {}
+
+    async def search_users(self, term: str, limit: int = 20, fields=None):  # type: ignore
+        self.calls.append('search_users')
+        users = [
+            {"sys_id": USER_SYS_ID, "name": "Renukumar P", "user_name": "renukumar.p"},
+            {"sys_id": "b"*32, "name": "John Smith", "user_name": "jsmith"},
+        ]
+        return [u for u in users if term.lower() in u['name'].lower() or term.lower() in u['user_name'].lower()]
+
+    async def update_incident(self, sys_id: str, payload):  # type: ignore
+        self.calls.append('update_incident')
+        return {"sys_id": sys_id, "assigned_to": payload.get("assigned_to"), "number": "INC0000042"}
+
+@pytest.fixture
+def mock_client():
+    mock = CountingClient()
+    async def _override():
+        return mock
+    get_incident_sys_id_cache().clear()
+    get_assignee_cache().clear()
+    previous = app.dependency_overrides.get(get_client)
+    app.dependency_overrides[get_client] = _override
+    yield mock
+    if previous is None:
+        app.dependency_overrides.pop(get_client, None)
+    else:
+        app.dependency_overrides[get_client] = previous
+
+def test_cold_then_warm_assignment(mock_client):
+    client = TestClient(app)
+    cold = client.put("/api/v1/incidents/INC0000042/assignee", json={"assigned_to": "Renukumar P"})
+    assert cold.status_code == 200
+    assert cold.headers["X-Served-Locally"] == "none"
+    assert sorted(mock_client.calls) == ['get_incident', 'search_users', 'update_incident']
+
+    mock_client.calls.clear()
+    warm = client.put("/api/v1/incidents/INC0000042/assignee", json={"assigned_to": "renukumar p"})
+    assert warm.status_code == 200
+    assert warm.json()["assigned_to"] == USER_SYS_ID
+    assert warm.headers["X-Served-Locally"] == "assignee,incident_sys_id"
+    assert mock_client.calls == ['update_incident']
+
+def test_partial_match_not_cached(mock_client):
+    client = TestClient(app)
+    for _ in range(2):
+        r = client.put(f"/api/v1/incidents/{INCIDENT_SYS_ID}/assignee", json={"assigned_to": "renu"})
+        assert r.status_code == 200
+    assert mock_client.calls.count('search_users') == 2
+
+def test_unknown_number_404(mock_client):
+    client = TestClient(app)
+    r = client.put("/api/v1/incidents/INC9999999/assignee", json={"assigned_to": "Renukumar P"})
+    assert r.status_code == 404
+
+def test_search_deadline_stays_504(mock_client, monkeypatch):
+    async def out_of_time(term, limit=20, fields=None):
+        raise_deadline_exceeded("Request deadline exceeded before calling ServiceNow")
+    monkeypatch.setattr(mock_client, 'search_users', out_of_time)
+    client = TestClient(app)
+    r = client.put(f"/api/v1/incidents/{INCIDENT_SYS_ID}/assignee", json={"assigned_to": "Renukumar P"})
+    assert r.status_code == 504
+    assert r.json()['detail']['error'] == 'DeadlineExceeded'
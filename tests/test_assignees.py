@@ -51,3 +51,8 @@ def test_assignees_field_filter():
     assert 'name' in res[0]
     # optional email may be omitted if not requested
     assert 'email' not in res[0] or res[0]['email'] is None
+
+
+def test_assignees_term_length_capped():
+    r = client.get('/api/v1/search/assignees', params={'q': 'a' * 101, 'assignment_group': 'dummy'})
+    assert r.status_code == 422
@@ -0,0 +1,112 @@
+import asyncio
+import httpx
+from app.services.cache import MemoryCache, SQLiteCache, TieredCache, MISSING
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=60)
+    cache.get('a')
+    cache.set('c', 3, ttl=60)  # evicts least recently used ('b')
+    assert cache.get('b') is MISSING
+    assert cache.get('a') == 1
+    cache.set('d', 4, ttl=-1)
+    assert cache.get('d') is MISSING
+
+
+def test_shared_tier_single_fill_across_workers(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    # Two "workers": each has its own memory tier and its own connection to the shared file.
+    workers = [TieredCache([MemoryCache(), SQLiteCache(path)], namespace='t', poll_interval=0.01) for _ in range(2)]
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'value': 42}
+
+    async def main():
+        return await asyncio.gather(*(w.get_or_set('k', 60, loader) for w in workers for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert all(r == {'value': 42} for r in results)
+    assert len(calls) == 1
+
+
+def test_counts_served_from_cache(make_client):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, headers={'X-Total-Count': '7'}, json={'result': []})
+
+    client = make_client(handler)
+
+    async def main():
+        first = await client.get_dashboard_counts()
+        upstream = len(requests)
+        second = await client.get_dashboard_counts()
+        return first, second, upstream
+
+    first, second, upstream = asyncio.run(main())
+    assert first == second
+    assert first['open_p1'] == 7
+    assert upstream == 5
+    assert len(requests) == 5
+
+
+def test_update_invalidates_incident_reads(make_client):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.method)
+        if request.method == 'PATCH':
+            return httpx.Response(200, json={'result': {'number': 'INC1', 'sys_id': 'x'}})
+        return httpx.Response(200, json={'result': [{'number': 'INC1', 'sys_id': 'x'}]})
+
+    client = make_client(handler)
+
+    async def main():
+        await client.get_incident('INC1')
+        await client.get_incident('INC1')
+        await client.update_incident('x', {'state': '2'})
+        await client.get_incident('INC1')
+
+    asyncio.run(main())
+    assert requests == ['GET', 'PATCH', 'GET']
+
+
+def test_generation_bumps_seen_across_workers(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    a, b = (TieredCache([MemoryCache(), SQLiteCache(path)], namespace='t', generation_ttl=0.05) for _ in range(2))
+
+    async def main():
+        await a.generation('incidents')
+        await b.bump_generation('incidents')
+        await a.bump_generation('incidents')
+        latest = await a.generation('incidents')
+        await asyncio.sleep(0.06)
+        return latest, await b.generation('incidents')
+
+    latest, seen = asyncio.run(main())
+    assert seen == latest != 0
+
+
+def test_per_call_fill_lease_outlasts_default(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    # Default lease far shorter than the load: only the per-call lease keeps the second worker waiting.
+    workers = [TieredCache([MemoryCache(), SQLiteCache(path)], namespace='t', fill_lease=0.05, poll_interval=0.01)
+               for _ in range(2)]
+    calls = []
+
+    async def slow_scan():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {'scanned': 1}
+
+    async def main():
+        return await asyncio.gather(*(w.get_or_set('scan', 60, slow_scan, fill_lease=2.0) for w in workers))
+
+    assert asyncio.run(main()) == [{'scanned': 1}] * 2
+    assert len(calls) == 1
@@ -0,0 +1,63 @@
+import json
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.compression import CompressionMiddleware, compression_stats, negotiate, FAST
+
+ROWS = [{"number": f"INC{i:07d}", "short_description": "Printer on fire"} for i in range(200)]
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500, route_levels={"/fast": FAST})
+
+@app.get("/big")
+async def big():
+    return {"result": ROWS}
+
+@app.get("/small")
+async def small():
+    return {"status": "ok"}
+
+@app.get("/stream")
+async def stream():
+    async def gen():
+        for row in ROWS:
+            yield (json.dumps(row) + "\n").encode()
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+client = TestClient(app)
+
+
+def test_negotiate_prefers_server_order_and_respects_q():
+    codings = ['zstd', 'br', 'gzip']
+    assert negotiate('gzip, br', codings) == 'br'
+    assert negotiate('zstd;q=0, gzip', codings) == 'gzip'
+    assert negotiate('*', codings) == 'zstd'
+    assert negotiate('identity', codings) is None
+
+
+def test_small_response_not_compressed():
+    r = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+
+
+def test_gzip_whole_body_has_length_and_vary():
+    compression_stats.reset()
+    r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert int(r.headers["content-length"]) < len(json.dumps({"result": ROWS}))
+    assert r.json()["result"][5]["number"] == "INC0000005"
+    stats = compression_stats.snapshot()["codings"]["gzip"]
+    assert stats["responses"] == 1 and stats["ratio"] > 1
+
+
+def test_zstd_stream_compressed_incrementally():
+    compression_stats.reset()
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "zstd"}) as r:
+        assert r.headers["content-encoding"] == "zstd"
+        assert "content-length" not in r.headers
+        raw = b"".join(r.iter_raw())
+    lines = zstandard.ZstdDecompressor().decompressobj().decompress(raw).decode().splitlines()
+    assert len(lines) == 200
+    assert compression_stats.snapshot()["codings"]["zstd"]["streamed"] == 1
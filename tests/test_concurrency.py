@@ -0,0 +1,132 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from app.services import concurrency
+from app.services.concurrency import AdaptiveLimiter, get_limiter, is_overload, probe_once
+from app.services.scheduler import BACKGROUND, BULK, INTERACTIVE, UpstreamScheduler
+
+
+def test_limit_grows_while_rtt_is_flat_and_in_use():
+    limiter = AdaptiveLimiter(initial=10, min_limit=2, max_limit=40)
+    for _ in range(50):
+        limiter.observe(0.1, in_flight=int(limiter.limit))
+    assert limiter.limit > 20 and limiter.gradient == 1.0
+
+
+def test_limit_does_not_grow_when_app_limited():
+    limiter = AdaptiveLimiter(initial=10, min_limit=2, max_limit=40)
+    for _ in range(50):
+        limiter.observe(0.1, in_flight=1)
+    assert int(limiter.limit) == 10
+
+
+def test_limit_shrinks_when_latency_rises():
+    limiter = AdaptiveLimiter(initial=30, min_limit=2, max_limit=40)
+    for _ in range(100):
+        limiter.observe(0.1, in_flight=30)
+    grown = limiter.limit
+    for _ in range(40):
+        limiter.observe(0.6, in_flight=30)
+    assert limiter.gradient < 1.0
+    assert limiter.limit < grown * 0.6
+
+
+def test_errors_back_off_once_per_burst():
+    limiter = AdaptiveLimiter(initial=20, min_limit=2, max_limit=40, backoff=0.5)
+    assert limiter.observe(0.1, in_flight=20, overload=True) == 10
+    assert limiter.observe(0.1, in_flight=20, overload=True) == 10  # same burst
+    assert limiter.stats['errors'] == 2 and limiter.stats['decreases'] == 1
+    assert is_overload(httpx.Response(503), None) and is_overload(None, httpx.ReadTimeout('slow'))
+    assert not is_overload(httpx.Response(404), None)
+
+
+def test_scheduler_applies_limiter_decisions():
+    limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=16, backoff=0.5)
+    scheduler = UpstreamScheduler(8, weights={}, limiter=limiter)
+
+    async def main():
+        async def timeout():
+            raise httpx.ReadTimeout('upstream slow')
+
+        with pytest.raises(httpx.ReadTimeout):
+            await scheduler.run(INTERACTIVE, timeout)
+
+        async def ok():
+            return httpx.Response(200)
+
+        await scheduler.run(BACKGROUND, ok)
+
+    asyncio.run(main())
+    assert scheduler.limit == 4
+    assert limiter.stats['samples'] == 2
+
+
+def test_probe_feeds_limiter_and_health_state(make_client, monkeypatch):
+    limiter = AdaptiveLimiter(initial=10, min_limit=2, max_limit=40)
+    monkeypatch.setattr(concurrency, '_limiter', limiter)
+    monkeypatch.setattr(concurrency, 'probe_state', concurrency.ProbeState())
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(dict(request.url.params))
+        return httpx.Response(200, json={'result': [{'sys_id': 'a' * 32}]})
+
+    client = make_client(handler)
+
+    async def main():
+        state = await probe_once(client)
+        await client.close()
+        return state
+
+    state = asyncio.run(main())
+    assert state.status == 'reachable' and state.code == 200 and state.rtt_ms is not None
+    assert seen[0]['sysparm_limit'] == '1'
+    assert get_limiter().stats['probes'] == 1 and get_limiter().rtt_long is not None
+
+
+def test_bulk_page_latency_does_not_shrink_the_limit():
+    limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=16)
+    scheduler = UpstreamScheduler(8, weights={}, limiter=limiter)
+
+    async def main():
+        async def slow_page():
+            await asyncio.sleep(0.05)
+            return httpx.Response(200)
+
+        async def failing_page():
+            return httpx.Response(503)
+
+        await scheduler.run(BULK, slow_page)
+        await scheduler.run(BULK, failing_page)
+
+    asyncio.run(main())
+    assert limiter.rtt_short is None
+    assert limiter.stats['samples'] == 1 and limiter.stats['errors'] == 1
+
+
+def test_calls_that_never_reached_upstream_are_not_samples():
+    limiter = AdaptiveLimiter(initial=8, min_limit=1, max_limit=16)
+    scheduler = UpstreamScheduler(8, weights={}, limiter=limiter)
+
+    async def main():
+        async def ok():
+            await asyncio.sleep(0.02)
+            return httpx.Response(200)
+
+        async def out_of_budget():
+            raise HTTPException(504, {'error': 'DeadlineExceeded'})
+
+        async def short_budget_timeout():
+            raise httpx.ReadTimeout('deadline-shortened timeout')
+
+        await scheduler.run(INTERACTIVE, ok)
+        for _ in range(20):
+            with pytest.raises(HTTPException):
+                await scheduler.run(INTERACTIVE, out_of_budget)
+        with pytest.raises(httpx.ReadTimeout):
+            await scheduler.run(INTERACTIVE, short_budget_timeout)
+
+    asyncio.run(main())
+    assert limiter.rtt_short >= 0.02 and limiter.rtt_long >= 0.02
+    assert limiter.stats['samples'] == 2 and limiter.stats['errors'] == 1
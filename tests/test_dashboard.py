@@ -0,0 +1,64 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.servicenow_client import ServiceNowClient, get_client
+from app.utils.exceptions import raise_gateway_error
+import pytest
+
+class MockDashboardClient(ServiceNowClient):  # type: ignore
+    def __init__(self, slow_query: str = '', failing_query: str = ''):
+        self.calls: list[tuple] = []
+        self.slow_query = slow_query
+        self.failing_query = failing_query
+
+    async def list_incidents(self, limit: int = 20, offset: int = 0, query=None, fields=None, with_total: bool = False):  # type: ignore
+        self.calls.append(('list', query))
+        if self.slow_query and query.startswith(self.slow_query):
+            await asyncio.sleep(5)
+        if self.failing_query and query.startswith(self.failing_query):
+            raise_gateway_error("Unable to connect to ServiceNow (list incidents)")
+        return {'result': [{'number': 'INC0000001', 'priority': '1'}], 'total': 11}
+
+    async def count_incidents(self, key: str, query: str):  # type: ignore
+        self.calls.append(('count', key))
+        return 3
+
+@pytest.fixture
+def use_client():
+    def install(mock):
+        async def _override():
+            return mock
+        app.dependency_overrides[get_client] = _override
+        return TestClient(app)
+    previous = app.dependency_overrides.get(get_client)
+    yield install
+    if previous is None:
+        app.dependency_overrides.pop(get_client, None)
+    else:
+        app.dependency_overrides[get_client] = previous
+
+def test_dashboard_dedupes_counts_from_list_totals(use_client):
+    mock = MockDashboardClient()
+    r = use_client(mock).get('/api/v1/dashboard', params={'assignee': 'jsmith'})
+    assert r.status_code == 200
+    body = r.json()
+    assert body['counts']['status'] == 'ok'
+    assert body['counts']['data']['open_p1'] == 11  # reused from the P1 list total
+    assert body['counts']['data']['sla_breached'] == 3
+    assert body['p1']['total'] == 11 and body['mine']['status'] == 'ok'
+    counted = sorted(k for kind, k in mock.calls if kind == 'count')
+    assert counted == ['not_updated_24h', 'sla_at_risk', 'sla_breached']
+    assert len([c for c in mock.calls if c[0] == 'list']) == 3
+
+def test_dashboard_partial_failure_and_timeout(use_client):
+    mock = MockDashboardClient(slow_query='assigned_toISEMPTY', failing_query='priority=1')
+    r = use_client(mock).get('/api/v1/dashboard', params={'section_timeout': 0.2})
+    assert r.status_code == 200
+    body = r.json()
+    assert body['p1']['status'] == 'error'
+    assert body['unassigned']['status'] == 'timeout'
+    assert body['mine']['status'] == 'skipped'
+    # counts fall back to count queries for the failed and the slow list
+    assert body['counts']['status'] == 'ok'
+    assert body['counts']['data']['open_p1'] == 3 and body['counts']['data']['unassigned'] == 3
+    assert body['unassigned']['elapsed_ms'] < 2000
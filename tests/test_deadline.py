@@ -0,0 +1,152 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import deadline
+from app.core.deadline import DeadlineMiddleware
+from app.services.servicenow_client import ServiceNowClient, get_client
+
+
+class SlowClient(ServiceNowClient):  # type: ignore
+    def __init__(self):
+        self.cancelled = False
+
+    async def get_incident(self, number: str, fields=None):  # type: ignore
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {'number': number}
+
+
+@pytest.fixture
+def use_client():
+    def install(mock):
+        async def _override():
+            return mock
+        app.dependency_overrides[get_client] = _override
+        return TestClient(app)
+    previous = app.dependency_overrides.get(get_client)
+    yield install
+    if previous is None:
+        app.dependency_overrides.pop(get_client, None)
+    else:
+        app.dependency_overrides[get_client] = previous
+
+
+def test_header_deadline_returns_504_and_cancels_work(use_client):
+    mock = SlowClient()
+    r = use_client(mock).get('/api/v1/incidents/INC0000001', headers={'X-Request-Timeout': '0.2'})
+    assert r.status_code == 504
+    assert r.json()['detail']['error'] == 'DeadlineExceeded'
+    assert mock.cancelled
+
+
+def test_budget_selection():
+    mw = DeadlineMiddleware(None, default=30.0, maximum=60.0, route_defaults={'/api/v1/search': 5.0})
+
+    def scope(path, headers=()):
+        return {'type': 'http', 'path': path, 'headers': [(k.encode(), v.encode()) for k, v in headers]}
+
+    assert mw.budget_for(scope('/api/v1/incidents/')) == 30.0
+    assert mw.budget_for(scope('/api/v1/search/users')) == 5.0
+    assert mw.budget_for(scope('/api/v1/search/users', [('x-request-timeout', '1.5')])) == 1.5
+    assert mw.budget_for(scope('/api/v1/incidents/', [('x-request-timeout', '999')])) == 60.0
+    assert mw.budget_for(scope('/api/v1/incidents/', [('x-request-timeout', 'soon')])) == 30.0
+
+
+def test_upstream_timeout_uses_remaining_budget(make_client):
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.extensions['timeout']['read'])
+        return httpx.Response(200, json={'result': [{'number': 'INC0000001', 'sys_id': 'a' * 32}]})
+
+    client = make_client(handler)
+
+    async def main():
+        token = deadline.set_deadline(2.0)
+        try:
+            await client.get_incident('INC0000001')
+            await asyncio.sleep(0.3)
+            await client.get_incident('INC0000002')
+        finally:
+            deadline.reset_deadline(token)
+        token = deadline.set_deadline(0.0)
+        try:
+            with pytest.raises(HTTPException) as exc:
+                await client.get_incident('INC0000003')
+            assert exc.value.status_code == 504
+        finally:
+            deadline.reset_deadline(token)
+        await client.close()
+
+    asyncio.run(main())
+    assert len(seen) == 2  # the expired call never reached the upstream
+    assert seen[0] <= 2.0 and seen[1] <= seen[0] - 0.25
+
+
+def test_short_deadline_does_not_fail_shared_reads(make_client):
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        # MockTransport ignores timeouts: honour the one the client computed from the deadline.
+        budget = request.extensions['timeout']['read']
+        seen.append(budget)
+        await asyncio.sleep(min(budget, 0.2))
+        if budget < 0.2:
+            raise httpx.ReadTimeout('upstream slow', request=request)
+        return httpx.Response(200, json={'result': [{'number': 'INC0000001', 'sys_id': 'a' * 32}]})
+
+    client = make_client(handler)
+
+    async def read(budget):
+        token = deadline.set_deadline(budget)
+        try:
+            return await client.get_incident('INC0000001')
+        finally:
+            deadline.reset_deadline(token)
+
+    async def main():
+        impatient = asyncio.create_task(read(0.1))
+        await asyncio.sleep(0.01)
+        patient = asyncio.create_task(read(5.0))
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(main())
+    assert isinstance(impatient, HTTPException) and impatient.status_code == 504
+    assert patient['number'] == 'INC0000001'
+    assert len(seen) == 2  # the waiter loaded it again under its own budget
+
+
+def test_client_disconnect_cancels_request():
+    cancelled = []
+    sent = []
+
+    async def app_(scope, receive, send):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}, {'type': 'http.disconnect'}]
+
+        async def receive():
+            if len(messages) == 1:
+                await asyncio.sleep(0.05)
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        mw = DeadlineMiddleware(app_, default=10.0)
+        await asyncio.wait_for(mw({'type': 'http', 'path': '/x', 'method': 'GET', 'headers': []}, receive, send), timeout=1)
+
+    asyncio.run(main())
+    assert cancelled == [True]
+    assert sent == []  # nobody to answer
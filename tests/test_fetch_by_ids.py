@@ -0,0 +1,55 @@
+import asyncio
+import httpx
+
+MEMBER_IDS = [f"{i:032x}" for i in range(250)]
+
+
+def _user_handler(seen: list, in_flight: list):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if request.url.path.endswith('/sys_user_grmember'):
+            return httpx.Response(200, json={'result': [{'user': i} for i in MEMBER_IDS]})
+        seen.append(params)
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        ids = params['sysparm_query'].split('^')[0][len('sys_idIN'):].split(',')
+        # Names descend as ids ascend, so unordered chunks would return the wrong users.
+        rows = [{'sys_id': i, 'name': f'User {999 - int(i, 16):03d}'} for i in ids]
+        if params['sysparm_query'].endswith('^ORDERBYname'):
+            rows.sort(key=lambda r: r['name'])
+        return httpx.Response(200, json={'result': rows[:int(params['sysparm_limit'])]})
+    return handler
+
+
+def test_fetch_by_ids_chunks_within_budget_and_dedupes(make_client, monkeypatch):
+    seen, in_flight = [], [0, 0]
+    client = make_client(_user_handler(seen, in_flight))
+    monkeypatch.setattr(client.settings, 'fetch_ids_max_query_chars', 400)
+    term = 'nameLIKE' + 'x' * 60
+
+    async def main():
+        return [row async for row in client.fetch_by_ids('sys_user', MEMBER_IDS + MEMBER_IDS[:10], fields=['name'],
+                                                         query=term, order_by='name')]
+
+    rows = asyncio.run(main())
+    assert sorted(r['sys_id'] for r in rows) == MEMBER_IDS
+    # The whole query (ids, ANDed term and ORDERBY) fits the budget, not just the sys_idIN clause.
+    assert all(len(p['sysparm_query']) <= 400 for p in seen)
+    assert all(p['sysparm_query'].endswith(f'^{term}^ORDERBYname') for p in seen)
+    assert len(seen) > 1
+    assert in_flight[1] <= client.settings.fetch_ids_concurrency
+    assert seen[0]['sysparm_fields'] == 'name,sys_id'
+
+
+def test_assignable_users_large_group_uses_chunks_and_term(make_client):
+    seen, in_flight = [], [0, 0]
+    client = make_client(_user_handler(seen, in_flight))
+    users = asyncio.run(client.search_assignable_users(term='jo', assignment_group='g' * 32, limit=5))
+    assert len(users) == 5
+    # The overall first five by name, whichever chunks they came from.
+    assert [u['name'] for u in users] == [f'User {n}' for n in range(750, 755)]
+    assert all('^NQ' not in p['sysparm_query'] for p in seen)
+    assert all(p['sysparm_query'].endswith('^nameLIKEjo^ORuser_nameLIKEjo^ORDERBYname') for p in seen)
+    assert all(p['sysparm_limit'] == '5' for p in seen)
@@ -0,0 +1,124 @@
+import asyncio
+import httpx
+from app.services.hedging import Hedger
+from app.services.scheduler import BULK, INTERACTIVE, UpstreamScheduler, priority
+
+
+def _hedger(**overrides) -> Hedger:
+    options = dict(enabled=True, percentile=0.9, min_delay=0.01, max_delay=0.05, min_samples=3, budget_ratio=1.0)
+    options.update(overrides)
+    return Hedger(**options)
+
+
+def test_slow_first_attempt_is_hedged_and_loser_cancelled():
+    hedger = _hedger()
+    delays = [0.5, 0.001]
+    cancelled = []
+
+    async def send(dispatched):
+        dispatched()
+        delay = delays.pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return delay
+
+    result = asyncio.run(hedger.run('/table/incident', send))
+    assert result == 0.001
+    assert hedger.stats['hedged'] == 1 and hedger.stats['hedge_wins'] == 1
+    assert cancelled == [0.5]
+
+
+def test_fast_reply_not_hedged_and_delay_adapts():
+    hedger = _hedger()
+
+    async def send(dispatched):
+        dispatched()
+        await asyncio.sleep(0.001)
+        return 'ok'
+
+    async def main():
+        for _ in range(5):
+            assert await hedger.run('k', send) == 'ok'
+
+    asyncio.run(main())
+    assert hedger.stats['hedged'] == 0
+    assert hedger.delay_for('k') == 0.01  # recent p90 is below the floor, so the min delay applies
+
+
+def test_budget_caps_hedges():
+    hedger = _hedger(budget_ratio=0.0)
+    hedger.budget.tokens = 1.0
+
+    async def send(dispatched):
+        dispatched()
+        await asyncio.sleep(0.08)
+        return 'slow'
+
+    async def main():
+        await asyncio.gather(*(hedger.run('k', send) for _ in range(3)))
+
+    asyncio.run(main())
+    assert hedger.stats['hedged'] == 1
+    assert hedger.stats['budget_denied'] == 2
+
+
+def test_failed_first_attempt_falls_back_to_hedge():
+    hedger = _hedger()
+    calls = []
+
+    async def send(dispatched):
+        dispatched()
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(0.06)
+            raise RuntimeError('node busy')
+        await asyncio.sleep(0.02)
+        return 'ok'
+
+    assert asyncio.run(hedger.run('k', send)) == 'ok'
+
+
+def test_client_keys_latency_by_call_site_and_skips_bulk(make_client):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={'X-Total-Count': '1'}, json={'result': [{'number': 'INC1', 'sys_id': 'x'}]})
+
+    client = make_client(handler)
+    client._hedger = _hedger()
+
+    async def main():
+        await client.get_incident('INC1')
+        await client.count_incidents_uncached('open', 'active=true')
+        with priority(BULK):
+            await client._get('/table/incident', {'sysparm_limit': '2000'}, site='incident analytics page')
+        await client.close()
+
+    asyncio.run(main())
+    assert set(client._hedger.windows) == {'get incident', 'count incidents'}
+    assert client._hedger.stats['requests'] == 2
+
+
+def test_locally_queued_attempt_is_not_hedged_or_timed():
+    hedger = _hedger()
+    scheduler = UpstreamScheduler(1, weights={})
+
+    async def main():
+        async def hold():
+            await asyncio.sleep(0.2)
+
+        async def upstream():
+            await asyncio.sleep(0.005)
+            return 'ok'
+
+        holder = asyncio.ensure_future(scheduler.run(INTERACTIVE, hold))
+        await asyncio.sleep(0)
+        # Queued behind `hold` for longer than max_delay, but answers fast once dispatched.
+        result = await hedger.run('k', lambda dispatched: scheduler.run(INTERACTIVE, upstream, on_start=dispatched))
+        await holder
+        return result
+
+    assert asyncio.run(main()) == 'ok'
+    assert hedger.stats['hedged'] == 0
+    assert max(hedger.windows['k'].samples) < 0.1
@@ -0,0 +1,95 @@
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import history as history_module
+from app.services.history import CounterHistory
+from app.services.servicenow_client import ServiceNowClient
+
+
+def test_ring_wraps_and_downsamples():
+    h = CounterHistory(['open_p1', 'unassigned'], capacity=4)
+    for i, ts in enumerate([100, 110, 120, 130, 140, 150]):
+        h.record({'open_p1': i, 'unassigned': None}, ts=ts)
+    assert len(h) == 4
+    points = h.query('open_p1', window=1000, step=20, now=150)
+    # Oldest two samples were overwritten; remaining ts 120,130 | 140,150
+    assert points == [
+        {'ts': 120, 'min': 2, 'max': 3, 'avg': 2.5, 'samples': 2},
+        {'ts': 140, 'min': 4, 'max': 5, 'avg': 4.5, 'samples': 2},
+    ]
+    assert h.query('open_p1', window=15, step=20, now=150) == [{'ts': 140, 'min': 4, 'max': 5, 'avg': 4.5, 'samples': 2}]
+    # NaN (failed) samples are skipped entirely
+    assert h.query('unassigned', window=1000, step=20, now=150) == []
+
+
+def test_mapped_history_persists_and_is_shared(tmp_path):
+    path = str(tmp_path / 'history.bin')
+    writer = CounterHistory(['open_p1'], capacity=8, path=path)
+    writer.record({'open_p1': 7}, ts=1000)
+    reader = CounterHistory(['open_p1'], capacity=8, path=path)
+    assert reader.writable is False
+    writer.record({'open_p1': 9}, ts=1010)
+    assert reader.query('open_p1', window=100, step=100, now=1010)[0]['max'] == 9
+    reader.close()
+    writer.close()
+
+    reopened = CounterHistory(['open_p1'], capacity=8, path=path)
+    assert len(reopened) == 2
+    reopened.close()
+    # Different layout -> starts fresh instead of misreading
+    resized = CounterHistory(['open_p1'], capacity=16, path=path)
+    assert len(resized) == 0
+    resized.close()
+
+
+def test_history_endpoint(monkeypatch):
+    h = CounterHistory(['open_p1'], capacity=16)
+    h.record({'open_p1': 3})
+    monkeypatch.setattr(history_module, '_history', h)
+    client = TestClient(app)
+    r = client.get('/api/v1/metrics/history', params={'counter': 'open_p1', 'window': 600, 'step': 60})
+    assert r.status_code == 200
+    assert r.json()['points'][0]['avg'] == 3
+    assert client.get('/api/v1/metrics/history', params={'counter': 'bogus'}).status_code == 400
+
+
+@pytest.mark.skipif(history_module.fcntl is None, reason='flock is POSIX-only')
+def test_reader_does_not_wait_for_owner_to_size_file(tmp_path):
+    path = str(tmp_path / 'history.bin')
+    open(path, 'wb').close()
+    # Hold the owner's flock without sizing the file.
+    fd = history_module.os.open(path, history_module.os.O_RDWR)
+    history_module.fcntl.flock(fd, history_module.fcntl.LOCK_EX)
+    try:
+        reader = CounterHistory(['open_p1'], capacity=8, path=path)
+        assert reader.writable is False
+        assert len(reader) == 0 and reader.query('open_p1', window=100, step=10) == []
+        history_module.os.ftruncate(fd, reader._size)
+        assert len(reader) == 0 and reader._buf is not None  # mapped on first use once sized
+        reader.close()
+    finally:
+        history_module.os.close(fd)
+
+
+def test_history_samples_bypass_count_cache(make_client):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, headers={'X-Total-Count': str(len(calls))}, json={'result': []})
+
+    client = make_client(handler)
+    queries = len(ServiceNowClient.DASHBOARD_COUNT_QUERIES)
+
+    async def main():
+        await client.get_dashboard_counts()
+        first = await client.collect_dashboard_counts(fresh=True)
+        second = await client.collect_dashboard_counts(fresh=True)
+        await client.close()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert len(calls) == 3 * queries
+    assert first != second
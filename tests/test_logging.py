@@ -0,0 +1,54 @@
+import logging
+import queue
+import time
+import httpx
+import orjson
+from app.core.logging_config import DroppingQueueHandler, JsonFormatter, RateLimitFilter, body_preview
+
+
+def _record(msg='ServiceNow connection error %s: %s', args=('counts', 'timeout'), level=logging.ERROR, name='app.test'):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_per_template_reports_suppressed():
+    f = RateLimitFilter(limit=3, window=0.05)
+    passed = [f.filter(_record(args=('counts', i))) for i in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+    assert f.filter(_record(msg='other template %s', args=(1,)))  # separate budget
+    time.sleep(0.06)
+    record = _record()
+    assert f.filter(record) and record.suppressed == 7
+    assert f.filter(_record(level=logging.CRITICAL))
+
+
+def test_debug_sampling():
+    f = RateLimitFilter(limit=0, window=1, debug_sample_rate=0.0)
+    assert not f.filter(_record(level=logging.DEBUG))
+    assert f.filter(_record(level=logging.INFO))
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    class Lazy:
+        formatted = 0
+
+        def __str__(self):
+            Lazy.formatted += 1
+            return 'lazy'
+
+    q: queue.Queue = queue.Queue(maxsize=1)
+    handler = DroppingQueueHandler(q)
+    handler.handle(_record(msg='value %s', args=(Lazy(),)))
+    handler.handle(_record(msg='value %s', args=(Lazy(),)))  # queue full: dropped, not blocking
+    assert Lazy.formatted == 0 and handler.dropped == 1
+    queued = q.get_nowait()
+    line = orjson.loads(JsonFormatter().format(queued))
+    assert line['msg'] == 'value lazy' and line['level'] == 'ERROR'
+    handler.handle(_record(msg='next'))
+    assert q.get_nowait().dropped == 1
+
+
+def test_body_preview_truncates():
+    response = httpx.Response(500, content=b'x' * 5000)
+    text = str(body_preview(response, limit=100))
+    assert text.startswith('x' * 100) and text.endswith('... [5000 bytes]') and len(text) < 130
+    assert str(body_preview(httpx.Response(404, content=b'{"error": "nope"}'), limit=100)) == '{"error": "nope"}'
@@ -0,0 +1,53 @@
+import asyncio
+import gzip
+import importlib.util
+import json
+import httpx
+from app.schemas.search import User
+from app.services.payload import model_fields_for, payload_stats
+
+
+def test_model_fields_for():
+    assert model_fields_for(User) == ['sys_id', 'name', 'user_name', 'email']
+    assert model_fields_for(User, ['*']) is None
+    assert model_fields_for(User, ['email']) == ['email', 'sys_id']
+
+
+def test_search_requests_minimal_fields(make_client):
+    seen, codings = [], []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.params)
+        codings.append(request.headers['accept-encoding'])
+        return httpx.Response(200, json={'result': [{'sys_id': '1', 'name': 'John'}]})
+
+    client = make_client(handler)
+    asyncio.run(client.search_users('jo'))
+    asyncio.run(client.search_users('jo', fields=['*']))
+    default, everything = seen
+    assert default['sysparm_fields'] == 'sys_id,name,user_name,email'
+    assert default['sysparm_exclude_reference_link'] == 'true'
+    assert default['sysparm_no_count'] == 'true'
+    assert 'sysparm_fields' not in everything
+    # httpx's own Accept-Encoding: every coding it can decode here, zstd included.
+    offered = codings[0].split(', ')
+    assert {'gzip', 'deflate'} <= set(offered)
+    assert ('zstd' in offered) == (importlib.util.find_spec('zstandard') is not None)
+
+
+def test_counts_fetch_single_row_and_wire_stats_recorded(make_client):
+    seen = []
+    body = gzip.compress(json.dumps({'result': [{'sys_id': 'x' * 32}] * 50}).encode())
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.params)
+        return httpx.Response(200, headers={'X-Total-Count': '4', 'Content-Encoding': 'gzip'}, stream=httpx.ByteStream(body))
+
+    payload_stats.reset()
+    client = make_client(handler)
+    asyncio.run(client.get_dashboard_counts())
+    assert all(p['sysparm_limit'] == '1' and p['sysparm_fields'] == 'sys_id' for p in seen)
+    stats = payload_stats.snapshot()['GET /table/incident']
+    assert stats['requests'] == 5
+    assert stats['wire_bytes'] == 5 * len(body)
+    assert stats['saved_bytes'] > 0
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from app.services.scheduler import BACKGROUND, BULK, INTERACTIVE, UpstreamScheduler, current_priority, priority
+
+
+def _scheduler(limit=1, **overrides) -> UpstreamScheduler:
+    options = dict(weights={INTERACTIVE: 8, BACKGROUND: 2, BULK: 1}, preemption=True, max_preemptions=2)
+    options.update(overrides)
+    return UpstreamScheduler(limit, **options)
+
+
+def test_weighted_fair_queuing_order():
+    scheduler = _scheduler(preemption=False)
+    served = []
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        first = asyncio.ensure_future(scheduler.run(BULK, blocker))
+        await asyncio.sleep(0)
+
+        def call(cls):
+            async def send():
+                served.append(cls)
+            return scheduler.run(cls, send)
+
+        tasks = [asyncio.ensure_future(call(BACKGROUND)) for _ in range(4)]
+        tasks += [asyncio.ensure_future(call(BULK)) for _ in range(4)]
+        await asyncio.sleep(0)
+        assert scheduler.queued() == 8
+        gate.set()
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(main())
+    # weight 2 vs 1: background gets two slots for each bulk one until it runs dry
+    assert served[:6].count(BACKGROUND) == 4 and served[:6].count(BULK) == 2
+    assert scheduler.in_flight == 0
+    stats = scheduler.snapshot()['classes']
+    assert stats[BACKGROUND]['requests'] == 4 and stats[BACKGROUND]['queued'] == 4
+    assert stats[BULK]['wait_max_ms'] > 0
+
+
+def test_interactive_preempts_bulk_which_is_retried():
+    scheduler = _scheduler()
+    order = []
+    attempts = {'bulk': 0}
+
+    async def main():
+        async def bulk_send():
+            attempts['bulk'] += 1
+            await asyncio.sleep(0.2)
+            order.append('bulk')
+            return 'bulk-done'
+
+        async def interactive_send():
+            order.append('interactive')
+            return 'ok'
+
+        bulk = asyncio.ensure_future(scheduler.run(BULK, bulk_send))
+        await asyncio.sleep(0.01)
+        result = await asyncio.wait_for(scheduler.run(INTERACTIVE, interactive_send), timeout=0.1)
+        assert result == 'ok'
+        assert await bulk == 'bulk-done'
+
+    asyncio.run(main())
+    assert order == ['interactive', 'bulk']
+    assert attempts['bulk'] == 2
+    assert scheduler.preemptions == 1 and scheduler.snapshot()['classes'][BULK]['preempted'] == 1
+    assert scheduler.in_flight == 0
+
+
+def test_writes_are_not_preempted_and_cancelled_waiters_free_their_place():
+    scheduler = _scheduler()
+
+    async def main():
+        async def slow():
+            await asyncio.sleep(0.05)
+            return 'written'
+
+        write = asyncio.ensure_future(scheduler.run(BACKGROUND, slow, preemptible=False))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(scheduler.run(INTERACTIVE, slow))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        assert await write == 'written'
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    assert scheduler.preemptions == 0 and scheduler.queued() == 0 and scheduler.in_flight == 0
+
+
+def test_priority_context():
+    assert current_priority() == INTERACTIVE
+    with priority(BULK):
+        assert current_priority() == BULK
+    assert current_priority() == INTERACTIVE
+    with pytest.raises(ValueError):
+        with priority('urgent'):
+            pass
@@ -0,0 +1,104 @@
+import asyncio
+import re
+import time
+import httpx
+import pytest
+from app.services.search_cache import SearchRefinementCache, can_refine, get_search_refinements
+
+USERS = [
+    {'sys_id': 'a' * 32, 'name': 'John Smith', 'user_name': 'jsmith', 'email': 'john@example.com'},
+    {'sys_id': 'b' * 32, 'name': 'Joanna Lee', 'user_name': 'jlee', 'email': 'joanna@example.com'},
+    {'sys_id': 'c' * 32, 'name': 'Ben Johnson', 'user_name': 'bjohnson', 'email': 'ben@example.com'},
+    {'sys_id': 'd' * 32, 'name': 'Ann Doe', 'user_name': 'adoe', 'email': 'ann@example.com'},
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_refinements():
+    get_search_refinements().clear()
+    yield
+    get_search_refinements().clear()
+
+
+def _client(make_client):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        query = request.url.params.get('sysparm_query', '')
+        calls.append((request.url.path, query))
+        limit = int(request.url.params.get('sysparm_limit', '100'))
+        if request.url.path.endswith('/table/incident'):
+            return httpx.Response(200, json={'result': []})
+        term = re.match(r'nameLIKE([^^]*)', query).group(1).lower()
+        rows = [u for u in USERS if term in u['name'].lower() or term in u['user_name'].lower()]
+        return httpx.Response(200, json={'result': rows[:limit]})
+
+    return make_client(handler), calls
+
+
+def test_longer_terms_filtered_from_complete_prefix(make_client):
+    client, calls = _client(make_client)
+
+    async def main():
+        results = {}
+        for term in ('j', 'jo', 'joh', 'JOHN'):
+            results[term] = await client.search_users(term=term, limit=20)
+        await client.close()
+        return results
+
+    results = asyncio.run(main())
+    assert len(calls) == 1  # only "j" went upstream
+    assert {u['user_name'] for u in results['jo']} == {'jsmith', 'jlee', 'bjohnson'}
+    assert {u['user_name'] for u in results['JOHN']} == {'jsmith', 'bjohnson'}
+
+
+def test_truncated_prefix_is_not_reused(make_client):
+    client, calls = _client(make_client)
+
+    async def main():
+        await client.search_users(term='o', limit=2)  # 4 matches, only 2 returned: incomplete
+        narrowed = await client.search_users(term='oh', limit=2)
+        await client.close()
+        return narrowed
+
+    narrowed = asyncio.run(main())
+    assert len(calls) == 2
+    assert {u['user_name'] for u in narrowed} == {'jsmith', 'bjohnson'}
+
+
+def test_assignee_refinement_scoped_by_group_and_fields(make_client):
+    client, calls = _client(make_client)
+
+    async def main():
+        await client.search_assignable_users(term='jo', limit=20)
+        await client.search_assignable_users(term='joa', limit=20)
+        await client.search_assignable_users(term='joa', limit=20, fields=['sys_id', 'email'])
+        await client.close()
+
+    asyncio.run(main())
+    # the narrower term is served locally; the email-only projection cannot be filtered on name
+    assert len(calls) == 2
+    assert not can_refine('joa', ['sys_id', 'email'])
+
+
+def test_unknown_incident_number_is_negatively_cached(make_client):
+    client, calls = _client(make_client)
+
+    async def main():
+        first = await client.get_incident('INC9999999')
+        second = await client.get_incident('INC9999999')
+        await client._cache.bump_generation('incidents')  # what create/update does
+        third = await client.get_incident('INC9999999')
+        await client.close()
+        return first, second, third
+
+    assert asyncio.run(main()) == ({}, {}, {})
+    assert len(calls) == 2
+
+
+def test_refinement_entries_expire():
+    cache = SearchRefinementCache(ttl_seconds=0.01)
+    cache.store('users', 'j', USERS[:1], limit=20)
+    assert cache.lookup('users', 'jo', 20) == USERS[:1]
+    time.sleep(0.02)
+    assert cache.lookup('users', 'jo', 20) is None
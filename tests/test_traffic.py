@@ -0,0 +1,177 @@
+import asyncio
+import gzip
+import time
+import httpx
+import orjson
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.config import get_settings
+from app.services import traffic
+from app.services.traffic import (
+    ArchiveWriter, ReplayTransport, RecordingTransport, RouteRecordMiddleware, drive, get_archive_writer, main,
+    read_archive, summarize_archive, traffic_stats,
+)
+
+INCIDENT = {'result': [{'sys_id': 'a' * 32, 'number': 'INC0010001', 'short_description': 'Printer on fire'}]}
+
+
+def _record(make_client, monkeypatch, tmp_path, handler):
+    settings = get_settings()
+    monkeypatch.setattr(settings, 'upstream_record_path', str(tmp_path / 'capture.jsonl.gz'))
+    monkeypatch.setattr(settings, 'upstream_replay_path', '')
+    client = make_client(handler)
+    assert isinstance(client._client._transport, RecordingTransport)
+    return client, settings.upstream_record_path
+
+
+def test_record_scrubs_credentials_and_keeps_wire_bytes(make_client, monkeypatch, tmp_path):
+    traffic_stats.reset()
+    seen_auth = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_auth.append(request.headers.get('authorization'))
+        body = gzip.compress(orjson.dumps(INCIDENT))
+        return httpx.Response(200, content=body, headers={'Content-Encoding': 'gzip', 'Set-Cookie': 'JSESSIONID=secret'})
+
+    client, path = _record(make_client, monkeypatch, tmp_path, handler)
+
+    async def main_():
+        resp = await client._client.get('/table/incident', params={'sysparm_query': 'number=INC0010001', 'user_token': 'xyz'})
+        await client.close()
+        return resp
+
+    resp = asyncio.run(main_())
+    assert resp.json() == INCIDENT and resp.num_bytes_downloaded < len(resp.content) + 100
+    assert seen_auth[0] and seen_auth[0].startswith('Basic ')
+
+    raw = gzip.decompress(open(path, 'rb').read()).decode()
+    assert 'Basic ' not in raw and 'JSESSIONID' not in raw and 'xyz' not in raw
+    header, entries = read_archive(path)
+    entry = next(entries)
+    assert header['base_path'] and entry['endpoint'] == 'GET /table/incident'
+    assert orjson.loads(entry['body']) == INCIDENT and entry['status'] == 200
+    assert 'user_token=%2A%2A%2A' in entry['query'] and entry['elapsed'] >= 0
+    assert traffic_stats.snapshot()['recorded'] == 1
+
+
+def _replay(entries, scale=0.0) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url='https://x.service-now.com/api/now',
+                             transport=ReplayTransport(entries, '/api/now', latency_scale=scale))
+
+
+def _entry(query, body, elapsed=0.0, **extra):
+    return {'endpoint': 'GET /table/incident', 'method': 'GET', 'path': '/table/incident', 'query': query,
+            'request_body': None, 'status': 200, 'headers': [['content-type', 'application/json']],
+            'body': body, 'elapsed': elapsed, **extra}
+
+
+def test_replay_serves_in_order_then_repeats_and_misses():
+    traffic_stats.reset()
+    entries = [_entry('sysparm_limit=1', '{"n": 1}'), _entry('sysparm_limit=1', '{"n": 2}')]
+
+    async def main_():
+        async with _replay(entries) as client:
+            served = [(await client.get('/table/incident', params={'sysparm_limit': '1'})).json()['n'] for _ in range(3)]
+            with pytest.raises(httpx.ConnectError):
+                await client.get('/table/incident', params={'sysparm_limit': '2'})
+        return served
+
+    assert asyncio.run(main_()) == [1, 2, 2]
+    stats = traffic_stats.snapshot()
+    assert (stats['replayed'], stats['repeated'], stats['misses']) == (1, 2, 1)
+
+
+def test_replay_latency_scale_and_recorded_errors():
+    entries = [_entry('a=1', '{}', elapsed=0.05), _entry('a=2', None, elapsed=0.0, error='ReadTimeout', message='timed out')]
+
+    async def timed(scale):
+        async with _replay(entries, scale) as client:
+            started = time.perf_counter()
+            await client.get('/table/incident', params={'a': '1'})
+            took = time.perf_counter() - started
+            with pytest.raises(httpx.ReadTimeout):
+                await client.get('/table/incident', params={'a': '2'})
+        return took
+
+    assert asyncio.run(timed(2.0)) >= 0.1
+    assert asyncio.run(timed(0.0)) < 0.05
+
+
+def test_routes_recorded_alongside_upstream_and_compared(make_client, monkeypatch, tmp_path, capsys):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=INCIDENT)
+
+    client, path = _record(make_client, monkeypatch, tmp_path, handler)
+    api = FastAPI()
+
+    @api.get('/items/{item_id}')
+    async def item(item_id: str):
+        await client.probe()
+        return {'id': item_id}
+
+    @api.post('/items')
+    async def create(payload: dict):
+        return payload
+
+    api.add_middleware(RouteRecordMiddleware, path=path, base_path='/api/now')
+    with TestClient(api) as http:
+        assert http.get('/items/1', params={'verbose': '1', 'api_key': 'k'}).status_code == 200
+        assert http.get('/items/2').status_code == 200
+        assert http.get('/missing').status_code == 404
+        assert http.post('/items', json={'name': 'x'}, headers={'X-Request-Timeout': '2'}).status_code == 200
+        http.portal.call(client.close)
+
+    summary = summarize_archive(path)
+    assert summary['routes']['GET /items/{item_id}']['calls'] == 2
+    assert summary['routes']['GET /missing']['calls'] == 1
+    assert summary['upstream']['GET /table/incident']['calls'] == 2
+    routes = {(e['method'], e['path']): e for e in read_archive(path)[1] if e.get('kind') == traffic.ROUTE}
+    assert routes[('GET', '/items/1')]['query'] == 'verbose=1&api_key=%2A%2A%2A'
+    posted = routes[('POST', '/items')]
+    assert orjson.loads(posted['request_body']) == {'name': 'x'}
+    assert posted['request_headers'] == {'content-type': 'application/json', 'x-request-timeout': '2'}
+    # Route entries are not upstream responses: replay ignores them.
+    replay = ReplayTransport.from_archive(path, '/api/now')
+    assert sum(len(queue) for queue in replay._recorded.values()) == 2
+
+    assert main([path, path]) == 0
+    out = capsys.readouterr().out
+    routes, upstream = out.split('\n\n')
+    assert routes.startswith('route\tcalls[0]') and 'p50_delta_ms' in routes
+    assert 'GET /items/{item_id}\t2\t' in routes and routes.splitlines()[1].split('\t')[-3:] == ['+0', '+0.0', '+0.0']
+    assert upstream.splitlines()[1].split('\t')[:2] == ['GET /table/incident', '2']
+
+    # The recorded requests drive another build of the API.
+    seen = []
+    target = FastAPI()
+
+    @target.api_route('/{rest:path}', methods=['GET', 'POST'])
+    async def echo(rest: str, request: Request):
+        seen.append((request.method, request.url.path, request.url.query, await request.body(),
+                     request.headers.get('x-request-timeout')))
+        return {}
+
+    outcomes = asyncio.run(drive(path, 'http://api', speed=0, transport=httpx.ASGITransport(app=target)))
+    assert outcomes == {'200': 4}
+    assert sorted(seen) == sorted([
+        ('GET', '/items/1', 'verbose=1&api_key=%2A%2A%2A', b'', None), ('GET', '/items/2', '', b'', None),
+        ('GET', '/missing', '', b'', None), ('POST', '/items', '', b'{"name": "x"}', '2'),
+    ])
+
+
+@pytest.mark.skipif(traffic.fcntl is None, reason="flock is POSIX-only")
+def test_second_worker_does_not_truncate_or_interleave(monkeypatch, tmp_path):
+    path = str(tmp_path / 'capture.jsonl.gz')
+    monkeypatch.setattr(traffic, '_writers', {})
+    owner = ArchiveWriter(path, '/api/now')
+    owner.write({'endpoint': 'GET /table/incident', 'elapsed': 0.01})
+    # Another worker: same path, separate open file; it must leave the archive alone.
+    with pytest.raises(OSError):
+        ArchiveWriter(path, '/api/now')
+    owner.close()
+    header, entries = read_archive(path)
+    assert header['base_path'] == '/api/now' and [e['endpoint'] for e in entries] == ['GET /table/incident']
+    # A worker refused the lock records nothing (and does not retry per request).
+    monkeypatch.setattr(traffic, '_writers', {path: None})
+    assert get_archive_writer(path, '/api/now') is None
@@ -0,0 +1,50 @@
+import asyncio
+import httpx
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import get_settings
+from app.services import warmup
+from app.services.servicenow_client import ServiceNowClient
+
+
+def _mock_client(make_client, requests: list) -> ServiceNowClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, headers={'X-Total-Count': '3'}, json={'result': []})
+    return make_client(handler)
+
+
+def test_ready_reports_503_until_warm(monkeypatch):
+    monkeypatch.setattr(warmup, 'readiness', warmup.ReadinessState())
+    monkeypatch.setattr('app.main.readiness', warmup.readiness)
+    client = TestClient(app)
+    resp = client.get('/ready')
+    assert resp.status_code == 503
+    assert resp.json()['status'] == 'starting'
+
+
+def test_warmup_opens_connections_and_preloads(make_client, monkeypatch):
+    requests: list = []
+    sn_client = _mock_client(make_client, requests)
+
+    async def fake_get_client():
+        return sn_client
+
+    settings = get_settings()
+    monkeypatch.setattr(settings, 'servicENow_instance', 'example.service-now.com')
+    monkeypatch.setattr(settings, 'startup_warm_connections', 3)
+    monkeypatch.setattr(settings, 'startup_preload', 'counts,bogus')
+    monkeypatch.setattr(warmup, 'get_client', fake_get_client)
+    monkeypatch.setattr(warmup, 'readiness', warmup.ReadinessState())
+
+    asyncio.run(warmup.run_warmup())
+
+    state = warmup.readiness.as_dict()
+    assert state['ready'] is True
+    assert state['status'] == 'ready'
+    assert state['warm_connections'] == 3
+    assert {'client', 'connections', 'preload_counts', 'total'} <= set(state['phases_ms'])
+    # 3 probes + 5 count queries; counts are now served from cache
+    assert len(requests) == 8
+    asyncio.run(sn_client.get_dashboard_counts())
+    assert len(requests) == 8